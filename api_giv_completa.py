@@ -20,10 +20,9 @@ import polars as pl
 import plotly.graph_objects as go
 import plotly.express as px
 from fastapi import FastAPI, Query, Depends, HTTPException, status, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional, Dict, Any
-import glob
 from datetime import datetime, timedelta
 try:
     import jwt
@@ -31,11 +30,22 @@ except ImportError:
     # Fallback para PyJWT
     import PyJWT as jwt
 import json
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+import threading
 import warnings
+from carregador_dados import (
+    carregar_dados, consultar_parquet, contem, escanear_procedimentos, escanear_solicitacoes,
+    montar_filtros, total_registros, cache_ativo, info_carga, CHAVE_PROCEDIMENTO,
+    iniciar_monitoramento, parar_monitoramento
+)
+import cubo_kpis
+from modelo_ml_saude import modelo_ativo, carregar_modelo_ativo, LIMIAR_ALTO_RISCO, LIMIAR_MEDIO_RISCO
+from cache_resultados import CacheResultados
+import executor_cpu
+from executor_cpu import no_pool
+import predicao_lote
+import scores_ml
+import retreino
+from serializacao_json import resposta_json
 warnings.filterwarnings('ignore')
 
 # ===== CONFIGURAÇÃO DA APLICAÇÃO =====
@@ -53,6 +63,12 @@ SECRET_KEY = os.getenv("GIV_SECRET_KEY", "chave-secreta-padrao-dev")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("GIV_ACCESS_TOKEN_EXPIRE", "30"))
 
+# Colunas declaradas por endpoint (o carregador materializa só esse recorte)
+COLUNAS_KPIS = ["solicitacao_risco", "procedimento_especialidade", "solicitacao_status"]
+
+# Cache de respostas por (versão do snapshot, endpoint, filtros normalizados)
+cache_api = CacheResultados("api")
+
 # Usuários válidos
 USUARIOS_VALIDOS = {
     "admin": "admin123",
@@ -61,277 +77,20 @@ USUARIOS_VALIDOS = {
     "gestor": "gestor456"
 }
 
-# ===== MODELO DE MACHINE LEARNING =====
-class ModeloPredicaoAgravamento:
-    """Modelo de ML integrado para predição de agravamentos"""
-    
-    def __init__(self):
-        self.modelo = None
-        self.encoders = {}
-        self.feature_importance = None
-        self.metricas = {}
-        self.treinado = False
-        
-    def preparar_features(self, df):
-        """Feature Engineering otimizado"""
-        df_features = df.clone()
-        
-        # Feature 1: Risco
-        if 'solicitacao_risco' in df_features.columns:
-            df_features = df_features.with_columns(
-                pl.col('solicitacao_risco').fill_null("DESCONHECIDO")
-            )
-            risco_map = {'VERMELHO': 4, 'AMARELO': 3, 'VERDE': 2, 'AZUL': 1, 'DESCONHECIDO': 0}
-            df_features = df_features.with_columns(
-                pl.col('solicitacao_risco').replace(risco_map, default=0).alias('risco_numerico')
-            )
-        
-        # Feature 2: Tempo de espera
-        if 'data_solicitacao' in df_features.columns:
-            hoje = datetime.now()
-            df_features = df_features.with_columns(
-                (hoje - pl.col('data_solicitacao')).dt.total_seconds() / 86400
-                .alias('tempo_espera_dias')
-            )
-        else:
-            np.random.seed(42)
-            df_features = df_features.with_columns(
-                pl.lit(np.random.randint(1, 120, len(df_features))).alias('tempo_espera_dias')
-            )
-        
-        # Feature 3: Faixa Etária
-        if 'paciente_faixa_etaria' in df_features.columns:
-            df_features = df_features.with_columns(
-                pl.col('paciente_faixa_etaria').str.extract(r'(\d+)', 1)
-                .cast(pl.Int32, strict=False)
-                .fill_null(40)
-                .alias('idade_aproximada')
-            )
-        else:
-            df_features = df_features.with_columns(pl.lit(40).alias('idade_aproximada'))
-        
-        # Feature 4: Especialidade
-        if 'procedimento_especialidade' in df_features.columns:
-            df_features = df_features.with_columns(
-                pl.col('procedimento_especialidade').fill_null("DESCONHECIDA")
-            )
-            especialidades_unicas = df_features['procedimento_especialidade'].unique().to_list()
-            esp_map = {esp: idx for idx, esp in enumerate(especialidades_unicas)}
-            df_features = df_features.with_columns(
-                pl.col('procedimento_especialidade').replace(esp_map).alias('especialidade_codigo')
-            )
-            self.encoders['especialidade'] = esp_map
-        
-        # Feature 5: Status crítico
-        if 'solicitacao_status' in df_features.columns:
-            df_features = df_features.with_columns(
-                pl.col('solicitacao_status')
-                .str.contains('CRITICO|URGENTE|GRAVE')
-                .fill_null(False)
-                .cast(pl.Int32)
-                .alias('status_critico')
-            )
-        else:
-            df_features = df_features.with_columns(pl.lit(0).alias('status_critico'))
-        
-        return df_features
-    
-    def criar_target(self, df):
-        """Criar variável target baseada em regras de negócio"""
-        df_target = df.clone()
-        np.random.seed(42)
-        
-        prob_agravamento = []
-        for i in range(len(df_target)):
-            row = df_target.row(i, named=True)
-            risco = row.get('solicitacao_risco', 'AZUL')
-            tempo = row.get('tempo_espera_dias', 0)
-            
-            if risco == 'VERMELHO':
-                prob = 0.7 + (tempo / 100) * 0.2
-            elif risco == 'AMARELO':
-                prob = 0.4 + (tempo / 150) * 0.2
-            elif risco == 'VERDE':
-                prob = 0.15 + (tempo / 200) * 0.1
-            elif risco == 'AZUL':
-                prob = 0.05 + (tempo / 250) * 0.05
-            else:
-                prob = 0.1 + (tempo / 300) * 0.05
-            
-            prob = min(prob + np.random.normal(0, 0.1), 1.0)
-            prob = max(prob, 0.0)
-            agravou = 1 if np.random.random() < prob else 0
-            prob_agravamento.append(agravou)
-        
-        df_target = df_target.with_columns(
-            pl.Series('agravamento', prob_agravamento)
-        )
-        return df_target
-    
-    def treinar(self, df):
-        """Treinar modelo de ML"""
-        print("🤖 INICIANDO TREINAMENTO DO MODELO DE ML")
-        
-        # Preparar features
-        df_prep = self.preparar_features(df)
-        df_prep = self.criar_target(df_prep)
-        
-        feature_cols = ['risco_numerico', 'tempo_espera_dias', 'idade_aproximada', 
-                       'especialidade_codigo', 'status_critico']
-        feature_cols_existentes = [col for col in feature_cols if col in df_prep.columns]
-        
-        X = df_prep.select(feature_cols_existentes).to_numpy()
-        y = df_prep['agravamento'].to_numpy()
-        
-        # Split treino/teste
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
-        
-        # Treinamento
-        self.modelo = RandomForestClassifier(
-            n_estimators=100, max_depth=10, min_samples_split=20,
-            min_samples_leaf=10, random_state=42, n_jobs=-1
-        )
-        
-        self.modelo.fit(X_train, y_train)
-        
-        # Avaliação
-        y_pred = self.modelo.predict(X_test)
-        y_pred_proba = self.modelo.predict_proba(X_test)[:, 1]
-        
-        acuracia = accuracy_score(y_test, y_pred)
-        precisao = precision_score(y_test, y_pred, zero_division=0)
-        recall = recall_score(y_test, y_pred, zero_division=0)
-        f1 = f1_score(y_test, y_pred, zero_division=0)
-        
-        self.metricas = {
-            'acuracia': acuracia, 'precisao': precisao, 'recall': recall,
-            'f1_score': f1, 'total_treino': len(X_train), 'total_teste': len(X_test)
-        }
-        
-        self.feature_importance = {
-            'features': feature_cols_existentes,
-            'importances': self.modelo.feature_importances_.tolist()
-        }
-        
-        self.treinado = True
-        print("✅ MODELO TREINADO COM SUCESSO!")
-        
-        return self.metricas
-    
-    def predizer_agravamentos(self, df_sem_agendamento):
-        """Prediz probabilidade de agravamento"""
-        if not self.treinado:
-            self.treinar(df_sem_agendamento)
-        
-        df_pred = self.preparar_features(df_sem_agendamento)
-        feature_cols = ['risco_numerico', 'tempo_espera_dias', 'idade_aproximada', 
-                       'especialidade_codigo', 'status_critico']
-        feature_cols_existentes = [col for col in feature_cols if col in df_pred.columns]
-        
-        X = df_pred.select(feature_cols_existentes).to_numpy()
-        probabilidades = self.modelo.predict_proba(X)[:, 1]
-        predicoes = self.modelo.predict(X)
-        
-        df_pred = df_pred.with_columns([
-            pl.Series('probabilidade_agravamento', probabilidades),
-            pl.Series('predicao_agravamento', predicoes)
-        ])
-        
-        return df_pred
-    
-    def calcular_metricas_predicao(self, df_predicoes):
-        """Calcula métricas de predição"""
-        total = len(df_predicoes)
-        
-        alto_risco = df_predicoes.filter(pl.col('probabilidade_agravamento') > 0.7).height
-        medio_risco = df_predicoes.filter(
-            (pl.col('probabilidade_agravamento') > 0.4) & 
-            (pl.col('probabilidade_agravamento') <= 0.7)
-        ).height
-        baixo_risco = df_predicoes.filter(pl.col('probabilidade_agravamento') <= 0.4).height
-        
-        agravamentos_30_dias = int(alto_risco * 0.9)
-        agravamentos_60_dias = int(medio_risco * 0.5)
-        agravamentos_90_dias = int(baixo_risco * 0.1)
-        
-        custo_unitario = 5000
-        custo_30_dias = agravamentos_30_dias * custo_unitario
-        custo_total = (agravamentos_30_dias + agravamentos_60_dias + agravamentos_90_dias) * custo_unitario
-        
-        internacoes = int((agravamentos_30_dias + agravamentos_60_dias + agravamentos_90_dias) * 0.30)
-        
-        df_esp = df_predicoes.group_by('procedimento_especialidade').agg([
-            pl.count().alias('total'),
-            pl.col('probabilidade_agravamento').mean().alias('prob_media'),
-            (pl.col('probabilidade_agravamento') > 0.7).sum().alias('alto_risco_count')
-        ]).sort('prob_media', descending=True).head(10)
-        
-        especialidades_criticas = df_esp.to_dicts() if len(df_esp) > 0 else []
-        
-        return {
-            'total_sem_agendamento': total,
-            'alto_risco_ml': alto_risco,
-            'medio_risco_ml': medio_risco,
-            'baixo_risco_ml': baixo_risco,
-            'agravamento_30_dias': agravamentos_30_dias,
-            'agravamento_60_dias': agravamentos_60_dias,
-            'agravamento_90_dias': agravamentos_90_dias,
-            'custo_estimado_30_dias': custo_30_dias,
-            'custo_estimado_total': custo_total,
-            'internacoes_projetadas': internacoes,
-            'especialidades_criticas_ml': especialidades_criticas,
-            'probabilidade_media': df_predicoes['probabilidade_agravamento'].mean(),
-            'modelo_metricas': self.metricas
-        }
-
 # ===== INSTÂNCIAS GLOBAIS =====
-modelo_global = ModeloPredicaoAgravamento()
-_dados_cache = None
+# O modelo de ML é treinado offline por treinar_modelo.py (ou pelo retreino
+# em segundo plano, retreino.py) e carregado do artefato versionado; cada
+# requisição usa a referência de modelo_ativo() que pegou ao começar
 security = HTTPBearer()
 
-# ===== FUNÇÕES UTILITÁRIAS =====
-def carregar_dados():
-    """Carrega os dados da pasta db com cache"""
-    global _dados_cache
-    
-    if _dados_cache is not None:
-        return _dados_cache
-    
-    try:
-        print("Carregando dados da pasta db...")
-        
-        # Carregar solicitações
-        solicitacao_files = glob.glob("db/solicitacao-*.parquet")
-        if solicitacao_files:
-            df_solicitacao = pl.concat([pl.read_parquet(f) for f in solicitacao_files])
-            print(f"OK: {len(solicitacao_files)} arquivos de solicitacao carregados")
-        else:
-            raise FileNotFoundError("Arquivos de solicitacao nao encontrados")
-        
-        # Carregar procedimentos
-        procedimento_files = glob.glob("db/procedimento-*.parquet")
-        if procedimento_files:
-            df_procedimento = pl.concat([pl.read_parquet(f) for f in procedimento_files])
-            print(f"OK: {len(procedimento_files)} arquivo(s) de procedimento carregados")
-            
-            # Join
-            df_completo = df_solicitacao.join(
-                df_procedimento, on="procedimento_sisreg_id", how="left"
-            )
-        else:
-            df_completo = df_solicitacao
-        
-        print(f"OK: Total: {len(df_completo):,} registros")
-        
-        _dados_cache = df_completo
-        return df_completo
-        
-    except Exception as e:
-        print(f"ERRO ao carregar dados: {e}")
-        raise
+# Respostas de ML em cache foram calculadas com o modelo anterior
+retreino.ao_publicar(cache_api.limpar)
 
+# Endpoints em cache (kpis, dados, predicao) repetem o corpo guardado: em vez
+# de `timestamp` (que seria o da 1ª resposta, até GIV_CACHE_TTL atrás) levam
+# `calculado_em`, o momento em que o resultado foi calculado
+
+# ===== FUNÇÕES UTILITÁRIAS =====
 def criar_token_jwt(username: str) -> str:
     """Cria token JWT para autenticação"""
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -359,21 +118,23 @@ def verificar_token_jwt(credentials: HTTPAuthorizationCredentials = Depends(secu
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def analisar_predicao_sem_agendamento(df_sem_agendamento):
+def analisar_predicao_sem_agendamento(df_sem_agendamento, limiar=None, modelo=None):
     """Análise preditiva do impacto de não agendar pacientes"""
     if df_sem_agendamento.is_empty():
         return None
     
     try:
-        if not modelo_global.treinado:
-            modelo_global.treinar(df_sem_agendamento)
+        # Scores pré-calculados (scores_ml); sem modelo carregado não há
+        # coluna de score e a análise cai nas regras abaixo
+        if "probabilidade_agravamento" not in df_sem_agendamento.columns:
+            raise RuntimeError("modelo não carregado (rode treinar_modelo.py)")
         
-        df_predicoes = modelo_global.predizer_agravamentos(df_sem_agendamento)
-        metricas_ml = modelo_global.calcular_metricas_predicao(df_predicoes)
+        modelo = modelo or modelo_ativo()
+        metricas_ml = modelo.calcular_metricas_predicao(df_sem_agendamento, limiar)
         
         metricas_ml["usa_ml"] = True
-        metricas_ml["algoritmo"] = "Random Forest Classifier"
-        metricas_ml["num_arvores"] = 100
+        metricas_ml["algoritmo"] = modelo.nome_algoritmo()
+        metricas_ml["num_arvores"] = modelo.num_arvores()
         
         return metricas_ml
         
@@ -519,18 +280,27 @@ async def login(username: str, password: str):
 # ===== ENDPOINTS PRINCIPAIS =====
 
 @app.get("/api/v1/status")
-async def get_status():
+@no_pool()
+def get_status():
     """Status da API e informações básicas"""
     try:
-        df = carregar_dados()
+        total = total_registros()
+        carga = info_carga()
         return {
             "status": "OK",
             "versao": "1.0.0",
             "nome": "API REST - Gestão Inteligente de Vagas (GIV-Saúde)",
-            "total_registros": len(df),
+            "total_registros": total,
             "timestamp": datetime.now().isoformat(),
-            "modelo_ml_treinado": modelo_global.treinado,
-            "cache_ativado": _dados_cache is not None
+            "modelo_ml_treinado": modelo_ativo().treinado,
+            "modelo_ml_versao": modelo_ativo().versao,
+            "scores_ml": scores_ml.info(),
+            "cache_ativado": cache_ativo(),
+            "versao_snapshot": carga["versao_snapshot"],
+            "snapshot_carregado_em": carga["carregado_em"],
+            "carga": carga,
+            "cache_resultados": cache_api.estatisticas(),
+            "pool_cpu": executor_cpu.estatisticas()
         }
     except Exception as e:
         return {
@@ -540,25 +310,20 @@ async def get_status():
         }
 
 @app.get("/api/v1/dashboard/kpis")
-async def get_dashboard_kpis(
+@cache_api.em_cache("kpis")
+@no_pool()
+def get_dashboard_kpis(
     risco: Optional[List[str]] = Query(None),
     especialidade: Optional[List[str]] = Query(None),
     current_user: str = Depends(verificar_token_jwt)
 ):
-    """KPIs do dashboard com filtros"""
+    """KPIs do dashboard com filtros (respondidos pelo cubo pré-agregado)"""
     try:
-        df_completo = carregar_dados()
-        df_filtrado = df_completo
-        
-        # Aplicar filtros
-        if risco:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_risco").is_in(risco))
-        if especialidade:
-            df_filtrado = df_filtrado.filter(pl.col("procedimento_especialidade").is_in(especialidade))
+        contagens = cubo_kpis.kpis(risco, especialidade)
         
         # Métricas
-        total = len(df_filtrado)
-        total_sistema = len(df_completo)
+        total = contagens["total"]
+        total_sistema = total_registros()
         
         # KPIs
         taxa_conf = 0
@@ -567,19 +332,10 @@ async def get_dashboard_kpis(
         sem_agendamento_total = 0
         
         if total > 0:
-            confirmados = df_filtrado.filter(
-                pl.col("solicitacao_status").str.contains("CONFIRMADO")
-            ).height
-            taxa_conf = confirmados / total * 100
-            
-            criticos = df_filtrado.filter(
-                pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])
-            ).height
-            risco_critico = criticos / total * 100
+            taxa_conf = contagens["confirmados"] / total * 100
+            risco_critico = contagens["criticos"] / total * 100
             
-            nao_agendados = df_filtrado.filter(
-                ~pl.col("solicitacao_status").str.contains("AGENDAMENTO")
-            ).height
+            nao_agendados = contagens["sem_agendamento"]
             sem_agendamento = nao_agendados / total * 100
             sem_agendamento_total = nao_agendados
         
@@ -597,14 +353,16 @@ async def get_dashboard_kpis(
                 "sem_agendamento": round(sem_agendamento, 2),
                 "sem_agendamento_total": sem_agendamento_total
             },
-            "timestamp": datetime.now().isoformat()
+            "calculado_em": datetime.now().isoformat()
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao calcular KPIs: {str(e)}")
 
 @app.get("/api/v1/dashboard/dados")
-async def get_dashboard_dados(
+@cache_api.em_cache("dados")
+@no_pool()
+def get_dashboard_dados(
     risco: Optional[List[str]] = Query(None),
     especialidade: Optional[List[str]] = Query(None),
     limit: int = Query(1000, ge=1, le=10000),
@@ -612,57 +370,48 @@ async def get_dashboard_dados(
 ):
     """Dados do dashboard com filtros e paginação"""
     try:
-        df_completo = carregar_dados()
-        df_filtrado = df_completo
-        
-        # Aplicar filtros
-        if risco:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_risco").is_in(risco))
-        if especialidade:
-            df_filtrado = df_filtrado.filter(pl.col("procedimento_especialidade").is_in(especialidade))
+        filtros = montar_filtros(risco, especialidade)
         
-        # Limitar resultados
-        df_limitado = df_filtrado.head(limit)
+        # Contagem no conjunto de trabalho; linhas completas lidas do disco
+        total_filtrado = total_registros(filtros)
+        df_limitado = consultar_parquet(filtros=filtros, limit=limit)
         
-        # Converter para dict
-        dados = df_limitado.to_dicts()
-        
-        return {
+        # Linhas serializadas direto do DataFrame (datas em ISO)
+        return resposta_json({
             "status": "sucesso",
             "filtros_aplicados": {
                 "risco": risco,
                 "especialidade": especialidade
             },
-            "total_registros": len(df_filtrado),
-            "registros_retornados": len(dados),
+            "total_registros": total_filtrado,
+            "registros_retornados": df_limitado.height,
             "limit": limit,
-            "dados": dados,
-            "timestamp": datetime.now().isoformat()
-        }
+            "dados": df_limitado,
+            "calculado_em": datetime.now().isoformat()
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar dados: {str(e)}")
 
 @app.get("/api/v1/analise/predicao")
-async def get_analise_predicao(
+@cache_api.em_cache("predicao")
+@no_pool()
+def get_analise_predicao(
     risco: Optional[List[str]] = Query(None),
     especialidade: Optional[List[str]] = Query(None),
+    threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="Limiar da predição de agravamento (padrão GIV_LIMIAR_ML)"),
     current_user: str = Depends(verificar_token_jwt)
 ):
     """Análise preditiva com Machine Learning"""
     try:
-        df_completo = carregar_dados()
-        df_filtrado = df_completo
-        
-        # Aplicar filtros
-        if risco:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_risco").is_in(risco))
-        if especialidade:
-            df_filtrado = df_filtrado.filter(pl.col("procedimento_especialidade").is_in(especialidade))
-        
-        # Pacientes sem agendamento
-        df_sem_agend = df_filtrado.filter(
-            ~pl.col("solicitacao_status").str.contains("AGENDAMENTO")
+        # Pacientes sem agendamento, com o score já calculado por versão
+        modelo = modelo_ativo()
+        df_sem_agend = scores_ml.carregar_pontuados(
+            COLUNAS_KPIS,
+            montar_filtros(risco, especialidade)
+            + [pl.col("is_sem_agendamento")],
+            threshold,
+            modelo
         )
         
         if len(df_sem_agend) == 0:
@@ -670,11 +419,11 @@ async def get_analise_predicao(
                 "status": "sucesso",
                 "mensagem": "Nenhum paciente sem agendamento encontrado",
                 "predicao": None,
-                "timestamp": datetime.now().isoformat()
+                "calculado_em": datetime.now().isoformat()
             }
         
         # Análise preditiva
-        predicao = analisar_predicao_sem_agendamento(df_sem_agend)
+        predicao = analisar_predicao_sem_agendamento(df_sem_agend, threshold, modelo)
         
         return {
             "status": "sucesso",
@@ -684,7 +433,7 @@ async def get_analise_predicao(
             },
             "total_sem_agendamento": len(df_sem_agend),
             "predicao": predicao,
-            "timestamp": datetime.now().isoformat()
+            "calculado_em": datetime.now().isoformat()
         }
         
     except Exception as e:
@@ -693,7 +442,8 @@ async def get_analise_predicao(
 # ===== ENDPOINTS DE CONSULTA =====
 
 @app.get("/api/v1/solicitacoes")
-async def get_solicitacoes(
+@no_pool()
+def get_solicitacoes(
     risco: Optional[str] = Query(None),
     especialidade: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
@@ -703,24 +453,16 @@ async def get_solicitacoes(
 ):
     """Listar solicitações com filtros"""
     try:
-        df_completo = carregar_dados()
-        df_filtrado = df_completo
-        
         # Aplicar filtros
-        if risco:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_risco") == risco)
-        if especialidade:
-            df_filtrado = df_filtrado.filter(pl.col("procedimento_especialidade") == especialidade)
+        filtros = montar_filtros(risco, especialidade)
         if status:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_status").str.contains(status))
+            filtros.append(contem("solicitacao_status", status))
         
-        # Paginação
-        total = len(df_filtrado)
-        df_paginado = df_filtrado.slice(offset, limit)
+        # Paginação: total no conjunto de trabalho, página lida do disco
+        total = total_registros(filtros)
+        df_paginado = consultar_parquet(filtros=filtros, offset=offset, limit=limit)
         
-        dados = df_paginado.to_dicts()
-        
-        return {
+        return resposta_json({
             "status": "sucesso",
             "filtros_aplicados": {
                 "risco": risco,
@@ -731,32 +473,35 @@ async def get_solicitacoes(
                 "total": total,
                 "limit": limit,
                 "offset": offset,
-                "retornados": len(dados)
+                "retornados": df_paginado.height
             },
-            "dados": dados,
+            "dados": df_paginado,
             "timestamp": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar solicitações: {str(e)}")
 
 @app.get("/api/v1/procedimentos")
-async def get_procedimentos(
+@no_pool()
+def get_procedimentos(
     especialidade: Optional[str] = Query(None),
     tipo: Optional[str] = Query(None),
     current_user: str = Depends(verificar_token_jwt)
 ):
     """Listar procedimentos com filtros"""
     try:
-        df_completo = carregar_dados()
-        
-        # Filtrar apenas procedimentos (sem duplicatas)
-        df_procedimentos = df_completo.select([
+        # Catálogo (~800 linhas) restrito aos procedimentos com solicitações;
+        # da tabela de solicitações só a coluna da chave é lida
+        df_procedimentos = escanear_procedimentos().select([
             "procedimento_sisreg_id",
             "procedimento",
             "procedimento_especialidade",
             "procedimento_tipo"
-        ]).unique()
+        ]).join(
+            escanear_solicitacoes().select(CHAVE_PROCEDIMENTO),
+            on=CHAVE_PROCEDIMENTO, how="semi"
+        ).unique()
         
         # Aplicar filtros
         if especialidade:
@@ -764,7 +509,7 @@ async def get_procedimentos(
         if tipo:
             df_procedimentos = df_procedimentos.filter(pl.col("procedimento_tipo") == tipo)
         
-        dados = df_procedimentos.to_dicts()
+        dados = df_procedimentos.collect().to_dicts()
         
         return {
             "status": "sucesso",
@@ -783,23 +528,23 @@ async def get_procedimentos(
 # ===== ENDPOINTS DE RELATÓRIOS =====
 
 @app.get("/api/v1/relatorios/resumo")
-async def get_relatorio_resumo(
+@no_pool()
+def get_relatorio_resumo(
     current_user: str = Depends(verificar_token_jwt)
 ):
-    """Relatório resumido do sistema"""
+    """Relatório resumido do sistema (a partir do cubo pré-agregado)"""
     try:
-        df_completo = carregar_dados()
+        contagens = cubo_kpis.kpis()
         
         # Estatísticas gerais
-        total_solicitacoes = len(df_completo)
+        total_solicitacoes = contagens["total"]
         
         # Por risco
-        risco_stats = df_completo.group_by("solicitacao_risco").count().to_dicts()
+        risco_stats = cubo_kpis.distribuicao("solicitacao_risco").to_dicts()
         
         # Por especialidade (top 10)
         especialidade_stats = (
-            df_completo.group_by("procedimento_especialidade")
-            .count()
+            cubo_kpis.distribuicao("procedimento_especialidade")
             .sort("count", descending=True)
             .head(10)
             .to_dicts()
@@ -807,17 +552,14 @@ async def get_relatorio_resumo(
         
         # Por status (top 10)
         status_stats = (
-            df_completo.group_by("solicitacao_status")
-            .count()
+            cubo_kpis.contagem_status()
             .sort("count", descending=True)
             .head(10)
             .to_dicts()
         )
         
         # Confirmados vs Não confirmados
-        confirmados = df_completo.filter(
-            pl.col("solicitacao_status").str.contains("CONFIRMADO")
-        ).height
+        confirmados = contagens["confirmados"]
         
         nao_confirmados = total_solicitacoes - confirmados
         
@@ -842,29 +584,24 @@ async def get_relatorio_resumo(
 
 @app.get("/api/v1/ml/modelo/info")
 async def get_modelo_info(current_user: str = Depends(verificar_token_jwt)):
-    """Informações sobre o modelo de Machine Learning"""
+    """Informações sobre o modelo de Machine Learning (ativo e candidato do retreino)"""
     try:
+        modelo = modelo_ativo()
+        estado_retreino = retreino.estado()
         return {
             "status": "sucesso",
             "modelo": {
-                "treinado": modelo_global.treinado,
-                "algoritmo": "Random Forest Classifier",
-                "parametros": {
-                    "n_estimators": 100,
-                    "max_depth": 10,
-                    "min_samples_split": 20,
-                    "min_samples_leaf": 10
-                },
-                "metricas": modelo_global.metricas if modelo_global.treinado else None,
-                "feature_importance": modelo_global.feature_importance if modelo_global.treinado else None
+                "treinado": modelo.treinado,
+                "algoritmo": modelo.nome_algoritmo(),
+                "parametros": modelo.parametros(),
+                "metricas": modelo.metricas if modelo.treinado else None,
+                "feature_importance": modelo.feature_importance if modelo.treinado else None,
+                "artefato": modelo.info_artefato()
             },
-            "features": [
-                "solicitacao_risco",
-                "procedimento_especialidade",
-                "paciente_faixa_etaria",
-                "tempo_espera_dias",
-                "status_critico"
-            ],
+            "versao_ativa": modelo.versao,
+            "candidato": estado_retreino.pop("candidato"),
+            "retreino": estado_retreino,
+            "features": modelo.features or [],
             "timestamp": datetime.now().isoformat()
         }
         
@@ -872,8 +609,10 @@ async def get_modelo_info(current_user: str = Depends(verificar_token_jwt)):
         raise HTTPException(status_code=500, detail=f"Erro ao buscar informações do modelo: {str(e)}")
 
 @app.post("/api/v1/ml/predicao")
-async def fazer_predicao_ml(
+@no_pool()
+def fazer_predicao_ml(
     dados: Dict[str, Any],
+    threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="Limiar da predição de agravamento (padrão GIV_LIMIAR_ML)"),
     current_user: str = Depends(verificar_token_jwt)
 ):
     """Fazer predição ML personalizada"""
@@ -884,41 +623,107 @@ async def fazer_predicao_ml(
             if campo not in dados:
                 raise HTTPException(status_code=400, detail=f"Campo obrigatório ausente: {campo}")
         
-                # Criar DataFrame temporário para predição
-        df_temp = pl.DataFrame([dados])
-       
-        # Treinar modelo se necessário
-        if not modelo_global.treinado:
-            df_completo = carregar_dados()
-            modelo_global.treinar(df_completo)
+        modelo = modelo_ativo()
+        if not modelo.treinado:
+            raise HTTPException(
+                status_code=503,
+                detail="Modelo de ML não carregado: rode treinar_modelo.py"
+            )
+        
+        # Criar DataFrame temporário para predição (nomes das colunas do modelo)
+        df_temp = pl.DataFrame([{
+            "solicitacao_risco": dados["risco"],
+            "procedimento_especialidade": dados["especialidade"],
+            "paciente_faixa_etaria": dados["faixa_etaria"],
+        }])
         
         # Fazer predição
-        df_pred = modelo_global.predizer_agravamentos(df_temp)
+        df_pred = modelo.predizer_agravamentos(df_temp, threshold)
 
         resultado = df_pred.to_dicts()[0]
+        probabilidade = float(resultado.get("probabilidade_agravamento", 0))
         
         return {
             "status": "sucesso",
             "entrada": dados,
             "predicao": {
-                "probabilidade_agravamento": float(resultado.get("probabilidade_agravamento", 0)),
+                "probabilidade_agravamento": probabilidade,
                 "predicao_agravamento": int(resultado.get("predicao_agravamento", 0)),
-                "classificacao": "Alto Risco" if resultado.get("probabilidade_agravamento", 0) > 0.7 else 
-                               "Médio Risco" if resultado.get("probabilidade_agravamento", 0) > 0.4 else "Baixo Risco"
+                "classificacao": "Alto Risco" if probabilidade > LIMIAR_ALTO_RISCO else 
+                               "Médio Risco" if probabilidade > LIMIAR_MEDIO_RISCO else "Baixo Risco"
             },
             "timestamp": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na predição ML: {str(e)}")
 
+@app.post("/api/v1/ml/predicao/lote")
+async def fazer_predicao_ml_lote(
+    request: Request,
+    threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="Limiar da predição de agravamento (padrão GIV_LIMIAR_ML)"),
+    current_user: str = Depends(verificar_token_jwt)
+):
+    """
+    Predição ML em lote: array JSON, NDJSON ou Arrow IPC (Content-Type)
+    com até GIV_LIMITE_LOTE linhas. Responde NDJSON na ordem de entrada;
+    linhas inválidas trazem `erro` em vez de falhar o lote.
+    """
+    modelo = modelo_ativo()
+    if not modelo.treinado:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo de ML não carregado: rode treinar_modelo.py"
+        )
+    
+    corpo = await request.body()
+    resultado = await executor_cpu.executar(
+        predicao_lote.processar_lote, corpo, request.headers.get("content-type"), threshold, modelo
+    )
+    invalidas = resultado["erro"].is_not_null().sum()
+    
+    return StreamingResponse(
+        predicao_lote.gerar_ndjson(resultado),
+        media_type="application/x-ndjson",
+        headers={
+            "X-Total-Linhas": str(resultado.height),
+            "X-Linhas-Invalidas": str(invalidas),
+        }
+    )
+
+@app.post("/api/v1/ml/modelo/retreinar", status_code=202)
+async def retreinar_modelo_ml(
+    todos: bool = Query(False, description="Treinar com todas as solicitações (padrão: só as sem agendamento)"),
+    current_user: str = Depends(verificar_token_jwt)
+):
+    """
+    Dispara o retreino em segundo plano (processo separado) e responde na
+    hora; o novo modelo só entra em serviço se passar na validação.
+    Acompanhe por /api/v1/ml/modelo/info.
+    """
+    if current_user != "admin":
+        raise HTTPException(status_code=403, detail="Apenas o usuário admin pode retreinar o modelo")
+    
+    if not retreino.solicitar_retreino(f"manual ({current_user})", todos=todos):
+        raise HTTPException(status_code=409, detail="Já existe um retreino em andamento")
+    
+    return {
+        "status": "aceito",
+        "versao_ativa": modelo_ativo().versao,
+        "retreino": retreino.estado(),
+        "timestamp": datetime.now().isoformat()
+    }
+
 # ===== ENDPOINTS DE FILTROS E OPÇÕES =====
 
 @app.get("/api/v1/filtros/opcoes")
-async def get_filtros_opcoes(current_user: str = Depends(verificar_token_jwt)):
+@no_pool()
+def get_filtros_opcoes(current_user: str = Depends(verificar_token_jwt)):
     """Obter opções disponíveis para filtros"""
     try:
-        df_completo = carregar_dados()
+        df_completo = carregar_dados(COLUNAS_KPIS)
         
         # Opções de risco
         riscos = df_completo["solicitacao_risco"].unique().drop_nulls().sort().to_list()
@@ -961,6 +766,34 @@ async def health_check():
 
 # ===== INICIALIZAÇÃO =====
 
+@app.on_event("startup")
+async def iniciar_recarga_dados():
+    """Novas partições em db/ entram no cache sem reiniciar a API"""
+    iniciar_monitoramento()
+
+@app.on_event("startup")
+async def carregar_modelo_ml():
+    """Carrega o artefato ativo do modelo; sem ele a predição usa regras"""
+    try:
+        if carregar_modelo_ativo():
+            print(f"🤖 Modelo de ML carregado: versão {modelo_ativo().versao}")
+            # Pontua o snapshot em segundo plano: a 1ª análise já encontra os scores
+            threading.Thread(target=scores_ml.obter_pontuado, name="giv-scores", daemon=True).start()
+        else:
+            print("⚠️ Nenhum artefato de modelo encontrado: rode treinar_modelo.py")
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar modelo de ML: {e}")
+
+@app.on_event("startup")
+async def iniciar_retreino_agendado():
+    """Retreino periódico em segundo plano (GIV_INTERVALO_RETREINO)"""
+    retreino.iniciar_agendamento()
+
+@app.on_event("shutdown")
+async def parar_recarga_dados():
+    parar_monitoramento()
+    retreino.parar_agendamento()
+
 if __name__ == "__main__":
     import uvicorn
     
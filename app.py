@@ -1,9 +1,14 @@
 ﻿import jwt
 import datetime
 from functools import wraps
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, url_for
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
+import ingerir_datasets
 try:
     import polars as pl
 except Exception as e:
@@ -43,75 +48,304 @@ def token_required(f):
 
 
 # ------------------------------------------------------------
-# Função de processamento de solicitações
+# Tabela de solicitações em memória
 # ------------------------------------------------------------
-def processar_solicitacoes(status_alvo: str):
-    caminho_solic = os.path.join("datasets", "solicitacao.csv")
-    caminho_proc = os.path.join("datasets", "procedimento.csv")
-
-    if not os.path.exists(caminho_solic):
-        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_solic}")
-    if not os.path.exists(caminho_proc):
-        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_proc}")
-
-    df = pl.read_csv(caminho_solic)
-    proce = pl.read_csv(caminho_proc)
-
+# Fonte preferida: o Parquet tipado gerado por `python ingerir_datasets.py`
+# (datasets/parquet/), varrido sob demanda: o filtro por status lê só a
+# partição daquele status. Sem Parquet, ou se um CSV mudou depois da
+# ingestão, solicitacao.csv e procedimento.csv são lidos, tipados e unidos
+# uma única vez em memória.
+# A tabela só é refeita quando o mtime/tamanho de um dos CSVs (ou o
+# manifesto do Parquet) muda, verificado no máximo a cada
+# INTERVALO_VERIFICACAO_CSV segundos.
+# O resultado de cada status_alvo (DataFrame e corpo JSON da resposta de
+# /task) fica memorizado até a próxima recarga ou a virada do dia
+# (dias_desde_solicitacao é contado a partir de "hoje").
+CAMINHO_SOLICITACOES = os.path.join("datasets", "solicitacao.csv")
+CAMINHO_PROCEDIMENTOS = os.path.join("datasets", "procedimento.csv")
+CAMINHO_SAIDA = os.path.join("dado_minerado", "pessoas_pacientes.csv")
+INTERVALO_VERIFICACAO_CSV = float(os.getenv("APP_INTERVALO_VERIFICACAO_CSV", "2"))
+
+COLUNAS_SAIDA = [
+    'solicitacao_id',
+    'data_solicitacao',
+    'solicitacao_status',
+    'solicitacao_risco',
+    'procedimento_sisreg_id',
+    'tempo_teorico_max_espera_dias',
+    'dias_desde_solicitacao',
+    'procedimento',
+    'procedimento_especialidade'
+]
+
+_tabela = None            # (assinatura da fonte, DataFrame unido ou LazyFrame do Parquet)
+_verificado_em = 0.0      # time.monotonic() da última verificação de mtime
+_resultados = {}          # (assinatura, status_alvo, data de hoje) -> (DataFrame, corpo JSON)
+_chave_no_csv = None      # chave de _resultados gravada por último em CAMINHO_SAIDA
+_lock_tabela = threading.Lock()   # _tabela, _verificado_em e _resultados
+_lock_saida = threading.Lock()    # escrita de CAMINHO_SAIDA e _chave_no_csv
+
+
+def _assinatura_parquet():
+    """Assinatura do Parquet ingerido, ou None se ausente/desatualizado"""
+    manifesto = ingerir_datasets.ler_manifesto()
+    if manifesto is None or not ingerir_datasets.parquet_atualizado(
+        manifesto, tabelas=("solicitacao", "procedimento")
+    ):
+        return None
+    return ("parquet", manifesto["gerado_em"])
+
+
+def _assinatura_csvs():
+    assinatura = []
+    for caminho in (CAMINHO_SOLICITACOES, CAMINHO_PROCEDIMENTOS):
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
+        info = os.stat(caminho)
+        assinatura.append((info.st_mtime_ns, info.st_size))
+    return tuple(assinatura)
+
+
+def _com_derivadas(df, proce):
     proce_sel = proce.select(
         ["procedimento_sisreg_id", "procedimento", "procedimento_especialidade"]
     )
-
-    df_filtrado = df.filter(pl.col("solicitacao_status") == status_alvo)
-
-    df_filtrado = df_filtrado.with_columns(
-        pl.col("procedimento_sisreg_id").cast(pl.Int64)
-    )
-
-    df_merged = df_filtrado.join(
+    risco = pl.col("solicitacao_risco").cast(pl.String).str.to_lowercase()
+    return df.join(
         proce_sel,
-        left_on="procedimento_sisreg_id",
-        right_on="procedimento_sisreg_id",
+        on="procedimento_sisreg_id",
         how="left"
+    ).with_columns(
+        pl.when(risco == "vermelho").then(30)
+         .when(risco == "amarelo").then(90)
+         .when(risco == "verde").then(180)
+         .alias("tempo_teorico_max_espera_dias")
     )
 
-    df_merged = df_merged.with_columns(
-        pl.when(pl.col("solicitacao_risco").str.to_lowercase() == "vermelho").then(30)
-         .when(pl.col("solicitacao_risco").str.to_lowercase() == "amarelo").then(90)
-         .when(pl.col("solicitacao_risco").str.to_lowercase() == "verde").then(180)
-         .alias("tempo_teorico_max_espera_dias")
+
+def _varrer_parquet():
+    """LazyFrame do Parquet tipado (nada é lido até o filtro por status)"""
+    destino = ingerir_datasets.DIRETORIO_PARQUET
+    df = pl.scan_parquet(
+        os.path.join(destino, "solicitacao", "**", "*.parquet"),
+        hive_partitioning=True,
+        hive_schema={"solicitacao_status": pl.String},
     )
+    proce = pl.read_parquet(os.path.join(destino, "procedimento.parquet"))
+    return _com_derivadas(df, proce.lazy())
+
 
-    df_merged = df_merged.with_columns([
+def _ler_tabela():
+    """Lê os CSVs e devolve a tabela unida, já com as colunas derivadas fixas"""
+    df = pl.read_csv(CAMINHO_SOLICITACOES, schema_overrides={"procedimento_sisreg_id": pl.Int64})
+    proce = pl.read_csv(CAMINHO_PROCEDIMENTOS, schema_overrides={"procedimento_sisreg_id": pl.Int64})
+
+    df = df.with_columns(
         pl.col("data_solicitacao")
-        .str.strptime(pl.Datetime, format="%Y-%m-%d %H:%M:%S%.f %Z", strict=False)
+        .str.strptime(pl.Datetime, format=ingerir_datasets.FORMATO_DATA, strict=False)
         .alias("solicitacao_dt")
-    ])
+    )
+    return _com_derivadas(df, proce).rechunk()
+
+
+def carregar_tabela():
+    """(assinatura da fonte, tabela), refeita só se a fonte mudou"""
+    global _tabela, _verificado_em
+
+    with _lock_tabela:
+        agora = time.monotonic()
+        if _tabela is not None and agora - _verificado_em < INTERVALO_VERIFICACAO_CSV:
+            return _tabela
+
+        assinatura = _assinatura_parquet() or _assinatura_csvs()
+        _verificado_em = agora
+        if _tabela is None or _tabela[0] != assinatura:
+            inicio = time.perf_counter()
+            if assinatura[0] == "parquet":
+                _tabela = (assinatura, _varrer_parquet())
+                print(f"OK: Parquet de {ingerir_datasets.DIRETORIO_PARQUET} ({assinatura[1]})")
+            else:
+                _tabela = (assinatura, _ler_tabela())
+                print(f"OK: {_tabela[1].height:,} solicitações carregadas em {time.perf_counter() - inicio:.2f}s")
+            _resultados.clear()
+        return _tabela
+
+
+def _gravar_saida(chave, df_saida):
+    """Grava o resultado de `chave` em CAMINHO_SAIDA, se ainda não for ele"""
+    global _chave_no_csv
+    with _lock_saida:
+        if _chave_no_csv == chave:
+            return
+        os.makedirs(os.path.dirname(CAMINHO_SAIDA), exist_ok=True)
+        df_saida.write_csv(CAMINHO_SAIDA)
+        _chave_no_csv = chave
 
-    hoje = dt.now()
-    df_merged = df_merged.with_columns([
+
+# ------------------------------------------------------------
+# Função de processamento de solicitações
+# ------------------------------------------------------------
+def _calcular_resultado(df, status_alvo, hoje):
+    lf = df.lazy().filter(pl.col("solicitacao_status") == status_alvo).with_columns([
         (
             (pl.lit(hoje).cast(pl.Datetime) - pl.col("solicitacao_dt"))
             .dt.total_seconds() / 86400
         ).cast(pl.Int64).alias("dias_desde_solicitacao")
     ])
+    colunas = lf.collect_schema().names()
+    return lf.select([c for c in COLUNAS_SAIDA if c in colunas]).collect()
 
-    colunas_desejadas = [
-        'solicitacao_id',
-        'data_solicitacao',
-        'solicitacao_status',
-        'solicitacao_risco',
-        'procedimento_sisreg_id',
-        'tempo_teorico_max_espera_dias',
-        'dias_desde_solicitacao',
-        'procedimento',
-        'procedimento_especialidade'
-    ]
-    df_saida = df_merged.select([c for c in colunas_desejadas if c in df_merged.columns])
 
-    os.makedirs(os.path.join("dado_minerado"), exist_ok=True)
-    df_saida.write_csv(os.path.join("dado_minerado", "pessoas_pacientes.csv"))
+def _corpo_resposta(status_alvo, df_saida):
+    """Corpo JSON de sucesso do /task, serializado uma vez por resultado"""
+    registros = df_saida.to_dicts()
+    return app.json.dumps({
+        "status": "sucesso",
+        "filtro_status": status_alvo,
+        "quantidade": len(registros),
+        "resultado": registros,
+        "saida_csv": CAMINHO_SAIDA.replace(os.sep, "/")
+    })
 
-    return df_saida
+
+def resultado_solicitacoes(status_alvo: str):
+    """
+    (DataFrame, corpo JSON) das solicitações com `status_alvo`, memorizados
+    por status; o CSV de saída só é regravado quando o resultado muda.
+
+    Os locks cobrem só o acesso ao memo e a escrita do CSV: o cálculo roda
+    fora deles, sem travar o carregar_tabela dos outros pedidos (dois
+    pedidos simultâneos do mesmo status podem calcular em dobro; fica o
+    primeiro).
+    """
+    assinatura, df = carregar_tabela()
+    hoje = dt.now()
+    chave = (assinatura, status_alvo, hoje.date())
+
+    with _lock_tabela:
+        resultado = _resultados.get(chave)
+    if resultado is None:
+        df_saida = _calcular_resultado(df, status_alvo, hoje)
+        resultado = (df_saida, _corpo_resposta(status_alvo, df_saida))
+        with _lock_tabela:
+            # A tabela pode ter sido recarregada durante o cálculo: aí o
+            # resultado vale só para este pedido
+            if _tabela[0] == assinatura:
+                # Memo de outra versão dos CSVs ou de dias anteriores não serve mais
+                for antiga in [c for c in _resultados if c[0] != assinatura or c[2] != chave[2]]:
+                    del _resultados[antiga]
+                resultado = _resultados.setdefault(chave, resultado)
+    _gravar_saida(chave, resultado[0])
+    return resultado
+
+
+def processar_solicitacoes(status_alvo: str):
+    return resultado_solicitacoes(status_alvo)[0]
+
+
+# ------------------------------------------------------------
+# Modo assíncrono do /task (jobs)
+# ------------------------------------------------------------
+# `/task?assincrono=1` devolve um job_id na hora e o processamento roda no
+# pool de WORKERS_TASK threads. Cada job grava o próprio arquivo em
+# dado_minerado/jobs/<job_id>.csv (nada de disputar o CSV compartilhado) e
+# o resultado é baixado em streaming, em CSV ou NDJSON, sem montar um JSON
+# com todas as linhas. Ficam guardados os MAX_JOBS jobs mais recentes; os
+# mais antigos (já concluídos) são descartados com seus arquivos.
+DIRETORIO_JOBS = os.path.join("dado_minerado", "jobs")
+WORKERS_TASK = int(os.getenv("APP_WORKERS_TASK", "2"))
+MAX_JOBS = int(os.getenv("APP_MAX_JOBS", "100"))
+LINHAS_POR_BLOCO = 10000
+BYTES_POR_BLOCO = 1024 * 1024
+
+_pool_jobs = ThreadPoolExecutor(max_workers=WORKERS_TASK, thread_name_prefix="app-task")
+_jobs = {}                # job_id -> estado do job (ordem de criação)
+_lock_jobs = threading.Lock()
+
+
+def _atualizar_job(job_id, **campos):
+    with _lock_jobs:
+        _jobs[job_id].update(campos)
+
+
+def _descartar_jobs_antigos():
+    """Mantém no máximo MAX_JOBS jobs (chamada com _lock_jobs)"""
+    concluidos = [j for j, job in _jobs.items() if job["estado"] in ("concluido", "erro")]
+    while len(_jobs) > MAX_JOBS and concluidos:
+        job = _jobs.pop(concluidos.pop(0))
+        if job["arquivo"] and os.path.exists(job["arquivo"]):
+            os.remove(job["arquivo"])
+
+
+def _executar_job(job_id, status_alvo):
+    _atualizar_job(job_id, estado="executando", iniciado_em=dt.now().isoformat())
+    try:
+        _, df = carregar_tabela()
+        df_saida = _calcular_resultado(df, status_alvo, dt.now())
+
+        os.makedirs(DIRETORIO_JOBS, exist_ok=True)
+        arquivo = os.path.join(DIRETORIO_JOBS, f"{job_id}.csv")
+        df_saida.write_csv(arquivo + ".tmp")
+        os.replace(arquivo + ".tmp", arquivo)
+
+        _atualizar_job(
+            job_id,
+            estado="concluido",
+            quantidade=df_saida.height,
+            arquivo=arquivo,
+            esquema=df_saida.schema,
+            concluido_em=dt.now().isoformat(),
+        )
+    except Exception as e:
+        _atualizar_job(job_id, estado="erro", erro=str(e), concluido_em=dt.now().isoformat())
+
+
+def submeter_job(status_alvo: str):
+    """Enfileira o processamento de `status_alvo` e retorna o job_id"""
+    job_id = uuid.uuid4().hex
+    with _lock_jobs:
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "filtro_status": status_alvo,
+            "estado": "pendente",
+            "criado_em": dt.now().isoformat(),
+            "iniciado_em": None,
+            "concluido_em": None,
+            "quantidade": None,
+            "arquivo": None,
+            "esquema": None,
+            "erro": None,
+        }
+        _descartar_jobs_antigos()
+    _pool_jobs.submit(_executar_job, job_id, status_alvo)
+    return job_id
+
+
+def obter_job(job_id: str):
+    with _lock_jobs:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _ler_em_blocos(arquivo):
+    with open(arquivo, "rb") as f:
+        while True:
+            bloco = f.read(BYTES_POR_BLOCO)
+            if not bloco:
+                return
+            yield bloco
+
+
+def _ndjson_em_blocos(arquivo, esquema):
+    # Tipos do DataFrame do job: inferidos do começo do CSV, uma coluna nula
+    # nas primeiras linhas viraria texto (e um lote seguinte poderia falhar
+    # com o download já em andamento)
+    leitor = pl.read_csv_batched(arquivo, schema_overrides=esquema, batch_size=LINHAS_POR_BLOCO)
+    while True:
+        lotes = leitor.next_batches(1)
+        if not lotes:
+            return
+        yield lotes[0].write_ndjson().encode("utf-8")
 
 
 # ------------------------------------------------------------
@@ -155,8 +389,18 @@ def task():
 
     status_alvo = status_qs or status_json or "SOLICITAÇÃO / PENDENTE / REGULADOR"
 
+    if request.args.get("assincrono", "").lower() in ("1", "true", "sim"):
+        job_id = submeter_job(status_alvo)
+        return jsonify({
+            "status": "aceito",
+            "job_id": job_id,
+            "filtro_status": status_alvo,
+            "status_url": url_for("task_job", job_id=job_id),
+            "download_url": url_for("task_job_download", job_id=job_id),
+        }), 202
+
     try:
-        df_result = processar_solicitacoes(status_alvo)
+        _, corpo = resultado_solicitacoes(status_alvo)
     except FileNotFoundError as e:
         return jsonify({"status": "erro", "mensagem": str(e)}), 400
     except Exception as e:
@@ -165,14 +409,47 @@ def task():
             "mensagem": f"Falha ao processar solicitações: {str(e)}"
         }), 500
 
-    registros = df_result.to_dicts()
-    return jsonify({
-        "status": "sucesso",
-        "filtro_status": status_alvo,
-        "quantidade": len(registros),
-        "resultado": registros,
-        "saida_csv": "dado_minerado/pessoas_pacientes.csv"
-    }), 200
+    return app.response_class(corpo, status=200, mimetype="application/json")
+
+
+@app.route('/task/<job_id>', methods=['GET'])
+@token_required
+def task_job(job_id):
+    job = obter_job(job_id)
+    if job is None:
+        return jsonify({"status": "erro", "mensagem": "Job não encontrado"}), 404
+    job.pop("arquivo")
+    job.pop("esquema")
+    if job["estado"] == "concluido":
+        job["download_url"] = url_for("task_job_download", job_id=job_id)
+    return jsonify(job), 200
+
+
+@app.route('/task/<job_id>/download', methods=['GET'])
+@token_required
+def task_job_download(job_id):
+    job = obter_job(job_id)
+    if job is None:
+        return jsonify({"status": "erro", "mensagem": "Job não encontrado"}), 404
+    if job["estado"] != "concluido":
+        return jsonify({
+            "status": "erro",
+            "mensagem": f"Job ainda não concluído (estado: {job['estado']})",
+            "erro": job["erro"],
+        }), 409
+
+    formato = request.args.get("formato", "csv").lower()
+    if formato == "csv":
+        blocos, mimetype = _ler_em_blocos(job["arquivo"]), "text/csv"
+    elif formato == "ndjson":
+        blocos, mimetype = _ndjson_em_blocos(job["arquivo"], job["esquema"]), "application/x-ndjson"
+    else:
+        return jsonify({"status": "erro", "mensagem": "Formato inválido (use csv ou ndjson)"}), 400
+
+    return Response(blocos, mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{job_id}.{formato}"',
+        "X-Total-Linhas": str(job["quantidade"]),
+    })
 
 
 @app.route("/healthz", methods=['GET'])
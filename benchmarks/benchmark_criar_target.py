@@ -0,0 +1,111 @@
+"""
+Benchmark - criar_target: laço linha a linha x versão vetorizada
+================================================================
+
+Mede o tempo de geração do target `agravamento` sobre o conjunto de dados
+completo (db/*.parquet, via carregador_dados) e confere a equivalência
+estatística: taxa de agravamento por risco nas duas implementações.
+
+Uso (na raiz do projeto):
+    python benchmarks/benchmark_criar_target.py
+    python benchmarks/benchmark_criar_target.py --linhas 200000   # laço em amostra
+
+O laço original leva minutos com milhões de linhas; `--linhas` limita a
+medição do laço e o tempo total é extrapolado linearmente.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carregador_dados import carregar_dados  # noqa: E402
+from modelo_ml_saude import ModeloPredicaoAgravamento, simular_agravamento  # noqa: E402
+
+
+def criar_target_laco(df):
+    """Implementação anterior (referência), mantida só para comparação"""
+    np.random.seed(42)
+    prob_agravamento = []
+    for i in range(len(df)):
+        row = df.row(i, named=True)
+        risco = row.get('solicitacao_risco', 'AZUL')
+        tempo = row.get('tempo_espera_dias', 0)
+
+        if risco == 'VERMELHO':
+            prob = 0.7 + (tempo / 100) * 0.2
+        elif risco == 'AMARELO':
+            prob = 0.4 + (tempo / 150) * 0.2
+        elif risco == 'VERDE':
+            prob = 0.15 + (tempo / 200) * 0.1
+        elif risco == 'AZUL':
+            prob = 0.05 + (tempo / 250) * 0.05
+        else:
+            prob = 0.1 + (tempo / 300) * 0.05
+
+        prob = min(prob + np.random.normal(0, 0.1), 1.0)
+        prob = max(prob, 0.0)
+        prob_agravamento.append(1 if np.random.random() < prob else 0)
+
+    return df.with_columns(pl.Series('agravamento', prob_agravamento))
+
+
+def taxa_por_risco(df):
+    return (
+        df.group_by('solicitacao_risco')
+        .agg(pl.len().alias('n'), pl.col('agravamento').mean().alias('taxa'))
+        .sort('solicitacao_risco')
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--linhas', type=int, default=None,
+                        help='limita o laço original a N linhas (tempo extrapolado)')
+    args = parser.parse_args()
+
+    df = ModeloPredicaoAgravamento().preparar_features(carregar_dados())
+    total = len(df)
+    print(f"Linhas: {total:,}")
+
+    inicio = time.perf_counter()
+    df_vet = simular_agravamento(df, seed=42)
+    t_vet = time.perf_counter() - inicio
+    print(f"Vetorizado: {t_vet:.3f}s")
+
+    amostra = df if args.linhas is None else df.head(args.linhas)
+    inicio = time.perf_counter()
+    df_laco = criar_target_laco(amostra)
+    t_laco = (time.perf_counter() - inicio) * total / len(amostra)
+    rotulo = "" if len(amostra) == total else f" (extrapolado de {len(amostra):,} linhas)"
+    print(f"Laço:       {t_laco:.3f}s{rotulo}")
+    print(f"Speedup:    {t_laco / t_vet:,.0f}x")
+
+    # Reprodutibilidade: mesma semente, mesmo target
+    mesmo = simular_agravamento(df, seed=42)['agravamento'].equals(df_vet['agravamento'])
+    print(f"Reprodutível com a mesma semente: {mesmo}")
+
+    # Equivalência estatística na mesma amostra
+    comparacao = taxa_por_risco(df_laco).join(
+        taxa_por_risco(df_vet.head(len(amostra))),
+        on='solicitacao_risco', suffix='_vetorizado', how='full', coalesce=True,
+    )
+    print("\nTaxa de agravamento por risco (laço x vetorizado):")
+    for r in comparacao.iter_rows(named=True):
+        # Desvio padrão da diferença entre duas proporções independentes
+        p = r['taxa']
+        erro = (2 * p * (1 - p) / r['n']) ** 0.5 if r['n'] else 0
+        print(
+            f"   {str(r['solicitacao_risco']):<13} n={r['n']:>9,}  "
+            f"{r['taxa']:.4f} x {r['taxa_vetorizado']:.4f}  "
+            f"(dif {r['taxa_vetorizado'] - r['taxa']:+.4f}, 3σ={3 * erro:.4f})"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark - formatação de números no padrão brasileiro: por valor x vetorizada
+=============================================================================
+
+Mede o tempo para formatar N valores por três caminhos:
+
+- anterior: o antigo `formatar_numero_br` do dashboard (cadeia de
+  `.replace` por valor) em uma list comprehension, como nos rótulos dos
+  gráficos;
+- por valor: `formatacao_br.formatar_numero_br` (tabela de inteiros
+  pré-formatados e `str.translate`);
+- vetorizado: `formatacao_br.formatar_numeros_br` sobre a Series.
+
+Para cada tipo de coluna (inteiros pequenos, contagens grandes, decimais)
+confere também que os três caminhos produzem o mesmo texto.
+
+Uso (na raiz do projeto):
+    python benchmarks/benchmark_formatacao.py
+    python benchmarks/benchmark_formatacao.py --lotes 1000 100000 --repeticoes 3
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import polars as pl  # noqa: E402
+
+from formatacao_br import formatar_numero_br, formatar_numeros_br  # noqa: E402
+
+
+def formatar_numero_anterior(numero):
+    """Cópia do antigo formatar_numero_br do dashboard"""
+    if numero is None:
+        return "0"
+    if numero == int(numero):
+        return f"{int(numero):,}".replace(",", ".")
+    return f"{numero:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+CAMINHOS = {
+    "anterior": lambda serie: [formatar_numero_anterior(v) for v in serie.to_list()],
+    "por valor": lambda serie: [formatar_numero_br(v) for v in serie.to_list()],
+    "vetorizado": lambda serie: formatar_numeros_br(serie).to_list(),
+}
+
+COLUNAS = {
+    "inteiros < 10 mil": lambda gerador, n: pl.Series(gerador.integers(0, 10_000, n)),
+    "contagens": lambda gerador, n: pl.Series(gerador.integers(0, 10**9, n)),
+    "decimais": lambda gerador, n: pl.Series(gerador.uniform(-1e6, 1e6, n)).round(2),
+}
+
+
+def medir(func, serie, repeticoes):
+    """Mediana do tempo (s) de `func(serie)` e o último resultado"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        texto = func(serie)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), texto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lotes", type=int, nargs="+", default=[10, 1_000, 100_000],
+                        help="número de valores formatados")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    gerador = np.random.default_rng(args.seed)
+    print(f"{'Coluna':<18} {'Valores':>10} " + " ".join(f"{nome:>12}" for nome in CAMINHOS) + "   ganho")
+    for coluna, gerar in COLUNAS.items():
+        for valores in args.lotes:
+            serie = gerar(gerador, valores)
+            resultados = {nome: medir(func, serie, args.repeticoes) for nome, func in CAMINHOS.items()}
+
+            textos = [texto for _, texto in resultados.values()]
+            if any(texto != textos[0] for texto in textos):
+                print(f"ERRO: caminhos divergem em {coluna} ({valores:,} valores)")
+
+            tempos = " ".join(f"{t * 1000:>10.2f}ms" for t, _ in resultados.values())
+            ganho = resultados["anterior"][0] / resultados["vetorizado"][0]
+            print(f"{coluna:<18} {valores:>10,} {tempos} {ganho:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
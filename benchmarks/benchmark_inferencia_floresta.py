@@ -0,0 +1,85 @@
+"""
+Benchmark - inferência da floresta: scikit-learn x floresta_numpy
+=================================================================
+
+Mede a latência do `predict_proba` do RandomForestClassifier e do motor
+achatado (floresta_numpy.FlorestaVetorizada) em lotes de 1, 100, 10 mil e
+1 milhão de linhas, e confere que as probabilidades são bit a bit iguais.
+
+Usa o artefato ativo (modelos/atual.json, ver treinar_modelo.py); sem
+artefato, treina um modelo sobre os dados de db/ antes de medir. As linhas
+de cada lote são sorteadas (com reposição) das features do conjunto de
+trabalho.
+
+Uso (na raiz do projeto):
+    python benchmarks/benchmark_inferencia_floresta.py
+    python benchmarks/benchmark_inferencia_floresta.py --lotes 1 100 10000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carregador_dados import carregar_dados  # noqa: E402
+from floresta_numpy import FlorestaVetorizada  # noqa: E402
+from modelo_ml_saude import ModeloPredicaoAgravamento  # noqa: E402
+
+
+def medir(func, X, repeticoes):
+    """Mediana do tempo (s) de `func(X)` e o último resultado"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func(X)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lotes', type=int, nargs='+', default=[1, 100, 10_000, 1_000_000],
+                        help='tamanhos de lote medidos')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    modelo = ModeloPredicaoAgravamento()
+    df = carregar_dados()
+    if modelo.carregar():
+        print(f"Artefato: versão {modelo.versao}")
+    else:
+        print("Sem artefato: treinando sobre db/ ...")
+        modelo.treinar(df.filter(pl.col('is_sem_agendamento')))
+
+    X_base = modelo.preparar_features(df).select(modelo.features).to_numpy()
+
+    inicio = time.perf_counter()
+    floresta = FlorestaVetorizada(modelo.modelo)
+    print(f"Achatamento: {time.perf_counter() - inicio:.3f}s "
+          f"({len(floresta.feature):,} nós, profundidade {floresta.profundidade})")
+
+    rng = np.random.default_rng(args.seed)
+    print(f"\n{'Linhas':>10} {'sklearn':>12} {'numpy':>12} {'ganho':>8}  idêntico")
+    for linhas in args.lotes:
+        X = X_base[rng.integers(0, len(X_base), linhas)]
+        repeticoes = max(1, min(200, 20_000 // linhas))
+
+        t_sk, p_sk = medir(modelo.modelo.predict_proba, X, repeticoes)
+        t_np, p_np = medir(floresta.predict_proba, X, repeticoes)
+        identico = np.array_equal(p_sk, p_np)
+
+        print(f"{linhas:>10,} {t_sk * 1000:>10.2f}ms {t_np * 1000:>10.2f}ms "
+              f"{t_sk / t_np:>7.1f}x  {'sim' if identico else 'NÃO'}")
+        if not identico:
+            diferenca = np.abs(p_sk - p_np).max()
+            print(f"   ⚠️ diferença máxima: {diferenca:.3e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark - serialização JSON de linhas: caminhos anteriores x serializacao_json
+===============================================================================
+
+Mede o tempo para transformar N linhas em bytes JSON por três caminhos:
+
+- pandas: o antigo `preparar_dados_json` do dashboard (datas convertidas no
+  Polars, `to_pandas`, `.apply` por célula, varredura dos dicts) seguido de
+  `json.dumps`;
+- to_dicts: o antigo caminho da API (`to_dicts` + `jsonable_encoder` +
+  `json.dumps` do JSONResponse);
+- polars: `serializacao_json.linhas_json` (datas formatadas por coluna e
+  `write_json`).
+
+As linhas vêm de `consultar_parquet` (todas as colunas, como em
+/api/v1/solicitacoes), repetidas quando o lote pedido passa do disponível,
+mais uma cópia de `data_solicitacao` com fuso (UTC). Antes de medir, confere
+que cada caminho novo devolve o mesmo JSON do caminho que substituiu:
+polars x to_dicts (API) e polars (texto) x pandas (dashboard).
+
+Uso (na raiz do projeto):
+    python benchmarks/benchmark_serializacao.py
+    python benchmarks/benchmark_serializacao.py --lotes 100 10000 --repeticoes 3
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from carregador_dados import consultar_parquet  # noqa: E402
+from serializacao_json import FORMATO_TEXTO, linhas_json  # noqa: E402
+
+
+def caminho_pandas(df):
+    """Cópia do antigo preparar_dados_json do dashboard + json.dumps"""
+    for col in df.columns:
+        if df[col].dtype in [pl.Date, pl.Datetime, pl.Time]:
+            df = df.with_columns(pl.col(col).cast(pl.Utf8).alias(col))
+
+    df_pandas = df.to_pandas()
+    for col in df_pandas.columns:
+        if df_pandas[col].dtype == "object":
+            df_pandas[col] = df_pandas[col].apply(
+                lambda x: (
+                    str(x)
+                    if isinstance(x, (datetime.datetime, datetime.date, datetime.time))
+                    else x
+                )
+            )
+
+    dados = df_pandas.to_dict("records")
+    for row in dados:
+        for key, value in list(row.items()):
+            if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+                row[key] = str(value)
+            elif hasattr(value, "__dict__") and not isinstance(
+                value, (str, int, float, bool, type(None))
+            ):
+                row[key] = str(value)
+
+    return json.dumps(dados, default=str).encode("utf-8")
+
+
+def caminho_to_dicts(df):
+    """Antigo caminho da API: to_dicts + jsonable_encoder + JSONResponse.render"""
+    return json.dumps(
+        jsonable_encoder(df.to_dicts()),
+        ensure_ascii=False,
+        allow_nan=True,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+CAMINHOS = {
+    "pandas": caminho_pandas,
+    "to_dicts": caminho_to_dicts,
+    "polars": linhas_json,
+    "polars (texto)": lambda df: linhas_json(df, FORMATO_TEXTO),
+}
+
+
+# Caminho novo -> caminho anterior que ele substitui
+EQUIVALENTES = {"polars": "to_dicts", "polars (texto)": "pandas"}
+
+
+def _decodificar(corpo):
+    # O caminho pandas escreve nulos de texto como NaN; os novos, como null
+    return json.loads(corpo, parse_constant=lambda _: None)
+
+
+def conferir(df):
+    """Compara o JSON (já decodificado) de cada caminho novo com o anterior"""
+    for novo, anterior in EQUIVALENTES.items():
+        if _decodificar(CAMINHOS[novo](df)) != _decodificar(CAMINHOS[anterior](df)):
+            print(f"ERRO: {novo} difere de {anterior}")
+        else:
+            print(f"OK: {novo} == {anterior}")
+
+
+def medir(func, df, repeticoes):
+    """Mediana do tempo (s) de `func(df)` e o tamanho do último resultado"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = func(df)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lotes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000],
+                        help="número de linhas serializadas")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    base = consultar_parquet(limit=max(args.lotes))
+    if "data_solicitacao" in base.columns:
+        base = base.with_columns(
+            pl.col("data_solicitacao").dt.replace_time_zone("UTC").alias("data_solicitacao_utc")
+        )
+    print(f"{base.height:,} linhas base, {base.width} colunas")
+    conferir(base.head(1_000))
+
+    print(f"\n{'Linhas':>10} " + " ".join(f"{nome:>15}" for nome in CAMINHOS) + "   ganho")
+    for linhas in args.lotes:
+        repeticoes_base = -(-linhas // base.height)
+        df = pl.concat([base] * repeticoes_base).head(linhas)
+        repeticoes = max(1, min(args.repeticoes, 200_000 // linhas))
+
+        tempos = {nome: medir(func, df, repeticoes) for nome, func in CAMINHOS.items()}
+        colunas = " ".join(f"{t * 1000:>13.1f}ms" for t, _ in tempos.values())
+        ganho = min(tempos["pandas"][0], tempos["to_dicts"][0]) / tempos["polars"][0]
+        print(f"{linhas:>10,} {colunas} {ganho:>6.1f}x")
+
+    print(f"\nBytes (último lote): " + ", ".join(f"{nome} {b / 1e6:.1f} MB" for nome, (_, b) in tempos.items()))
+
+
+if __name__ == "__main__":
+    main()
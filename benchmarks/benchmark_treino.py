@@ -0,0 +1,101 @@
+"""
+Benchmark - configurações de treino: algoritmo x orçamento de linhas
+====================================================================
+
+Treina o modelo de agravamento com cada configuração pedida (algoritmo
+"floresta" ou "hist_gb", com ou sem amostra estratificada por risco e
+especialidade) e mostra, por configuração:
+
+- tempo de parede do `treinar()` (amostragem + features + fit + métricas);
+- pico de memória residente do processo durante o treino, acima do que os
+  dados carregados já ocupavam;
+- AUC sobre um mesmo conjunto de validação, separado antes do treino e
+  igual para todas as configurações (o AUC que o treino guarda em
+  `metricas` usa o teste de cada amostra e não é comparável entre elas).
+
+Cada configuração roda em um processo novo, para que o pico de memória de
+uma não contamine a seguinte.
+
+Uso (na raiz do projeto):
+    python benchmarks/benchmark_treino.py
+    python benchmarks/benchmark_treino.py --opcoes floresta:0 hist_gb:0 hist_gb:500000
+    python benchmarks/benchmark_treino.py --todos   # todas as solicitações
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl  # noqa: E402
+from sklearn.metrics import roc_auc_score  # noqa: E402
+
+from carregador_dados import carregar_dados  # noqa: E402
+from modelo_ml_saude import ModeloPredicaoAgravamento  # noqa: E402
+from treinar_modelo import COLUNAS_TREINO  # noqa: E402
+
+OPCOES_PADRAO = ["floresta:0", "floresta:200000", "hist_gb:0", "hist_gb:200000"]
+FRACAO_VALIDACAO = 0.2
+
+
+def _pico_mb():
+    # ru_maxrss em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir(algoritmo, limite_linhas, todos, seed):
+    """Roda em um processo próprio: treina uma configuração e mede"""
+    df = carregar_dados(COLUNAS_TREINO, None if todos else [pl.col("is_sem_agendamento")])
+    df = df.sample(fraction=1.0, shuffle=True, seed=seed)
+    n_validacao = int(df.height * FRACAO_VALIDACAO)
+    validacao, treino = df.head(n_validacao), df.slice(n_validacao)
+    memoria_base = _pico_mb()
+
+    modelo = ModeloPredicaoAgravamento()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        modelo.treinar(treino, algoritmo=algoritmo, limite_linhas=limite_linhas)
+    tempo = time.perf_counter() - inicio
+    pico = _pico_mb() - memoria_base
+
+    df_val = modelo.criar_target(modelo.preparar_features(validacao))
+    probabilidades = modelo.predict_proba(df_val.select(modelo.features).to_numpy())[:, 1]
+    auc = roc_auc_score(df_val["agravamento"].to_numpy(), probabilidades)
+
+    return {
+        "linhas": modelo.metricas["total_treino"] + modelo.metricas["total_teste"],
+        "disponiveis": treino.height,
+        "tempo_s": tempo,
+        "pico_mb": pico,
+        "auc": auc,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--opcoes", nargs="+", default=OPCOES_PADRAO,
+                        help="configurações algoritmo:limite_linhas (0 = todas as linhas)")
+    parser.add_argument("--todos", action="store_true",
+                        help="todas as solicitações (padrão: só as sem agendamento)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'Configuração':<22} {'linhas':>10} {'tempo':>9} {'pico mem':>10} {'AUC':>7}")
+    for opcao in args.opcoes:
+        algoritmo, _, limite = opcao.partition(":")
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            r = pool.submit(medir, algoritmo, int(limite or 0), args.todos, args.seed).result()
+        print(f"{opcao:<22} {r['linhas']:>10,} {r['tempo_s']:>8.1f}s "
+              f"{r['pico_mb']:>8.0f}MB {r['auc']:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
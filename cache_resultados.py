@@ -0,0 +1,198 @@
+"""
+Cache de Resultados - Gestão Inteligente de Vagas (GIV-Saúde)
+=============================================================
+
+Cache LRU com limite de memória e TTL para respostas que dependem apenas
+dos filtros da requisição e da versão do snapshot de dados.
+
+Os usuários reenviam as mesmas combinações de checkboxes de risco e
+especialidade o tempo todo; com o cache, cada combinação é calculada uma
+vez por versão do snapshot. A chave é formada por:
+
+- versão do snapshot (`carregador_dados.versao_snapshot`), de modo que uma
+  recarga a quente invalida tudo o que foi calculado com os dados antigos;
+- nome do endpoint;
+- parâmetros normalizados: listas ordenadas e sem duplicatas, para que
+  `?risco=AZUL&risco=VERDE` e `?risco=VERDE&risco=AZUL&risco=AZUL` caiam na
+  mesma entrada.
+
+Uso nos endpoints FastAPI:
+
+    cache_api = CacheResultados("api")
+
+    @app.get("/api/v1/dashboard/kpis")
+    @cache_api.em_cache("kpis")
+    async def get_dashboard_kpis(risco: Optional[List[str]] = Query(None), ...):
+        ...
+
+Exceções não são cacheadas, nem respostas HTML com status diferente de 200.
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+from carregador_dados import versao_snapshot
+
+LIMITE_MB = float(os.getenv("GIV_CACHE_MB", "256"))
+TTL_S = float(os.getenv("GIV_CACHE_TTL", "600"))
+
+
+def normalizar_filtro(valores):
+    """Lista de filtros canônica: ordenada e sem duplicatas (None/vazia = None)"""
+    if not valores:
+        return None
+    if isinstance(valores, str):
+        return [valores]
+    return sorted(set(valores))
+
+
+def _normalizar(valor):
+    return normalizar_filtro(valor) if isinstance(valor, (list, tuple, set)) else valor
+
+
+def _chave_hashavel(valor):
+    return tuple(valor) if isinstance(valor, list) else valor
+
+
+def _estimar_tamanho(valor):
+    """Tamanho aproximado em bytes (JSON serializado, para dicts de resposta)"""
+    if isinstance(valor, (bytes, str)):
+        return len(valor)
+    try:
+        return len(json.dumps(valor, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class CacheResultados:
+    """Cache LRU thread-safe com limite de memória (MB) e TTL (segundos)"""
+
+    def __init__(self, nome, limite_mb=None, ttl_s=None):
+        self.nome = nome
+        self.limite_bytes = int((LIMITE_MB if limite_mb is None else limite_mb) * 1024 * 1024)
+        self.ttl_s = TTL_S if ttl_s is None else ttl_s
+        self._entradas = OrderedDict()  # chave -> (expira_em, tamanho, valor)
+        self._uso_bytes = 0
+        self._versao = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._entradas.pop(chave)
+        self._uso_bytes -= tamanho
+
+    def _limpar_versao(self, versao):
+        """Entradas de snapshots anteriores nunca mais serão pedidas"""
+        if versao != self._versao:
+            self._entradas.clear()
+            self._uso_bytes = 0
+            self._versao = versao
+
+    def obter(self, chave):
+        """Valor cacheado para a chave na versão atual do snapshot, ou None"""
+        versao = versao_snapshot()
+        with self._lock:
+            self._limpar_versao(versao)
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return entrada[2]
+            if entrada is not None:
+                self._remover(chave)
+            self.misses += 1
+            return None
+
+    def guardar(self, chave, valor, versao, tamanho=None):
+        """Guarda o valor calculado sobre a versão `versao` do snapshot"""
+        tamanho = _estimar_tamanho(valor) if tamanho is None else tamanho
+        if tamanho > self.limite_bytes:
+            return
+
+        with self._lock:
+            # Calculado sobre um snapshot que já foi substituído: descarta
+            if versao != versao_snapshot():
+                return
+            self._limpar_versao(versao)
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (time.monotonic() + self.ttl_s, tamanho, valor)
+            self._uso_bytes += tamanho
+            while self._uso_bytes > self.limite_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.evictions += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._uso_bytes = 0
+
+    def estatisticas(self):
+        """Contadores para /status"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total * 100, 2) if total else 0,
+                "evictions": self.evictions,
+                "entradas": len(self._entradas),
+                "uso_mb": round(self._uso_bytes / 1024 / 1024, 2),
+                "limite_mb": round(self.limite_bytes / 1024 / 1024, 2),
+                "ttl_s": self.ttl_s,
+                "versao_snapshot": self._versao,
+            }
+
+    def em_cache(self, nome, ignorar=("current_user",)):
+        """
+        Decorador para endpoints FastAPI (async ou não).
+
+        Os parâmetros da requisição são normalizados e repassados já
+        normalizados ao endpoint; os listados em `ignorar` (ex.: usuário
+        autenticado) ficam fora da chave. Respostas `Response` são guardadas
+        como corpo + media type e recriadas a cada hit.
+        """
+        def decorador(func):
+            assincrono = inspect.iscoroutinefunction(func)
+
+            @functools.wraps(func)
+            async def envoltorio(**kwargs):
+                kwargs = {k: _normalizar(v) for k, v in kwargs.items()}
+                chave = (nome,) + tuple(
+                    (k, _chave_hashavel(v))
+                    for k, v in sorted(kwargs.items())
+                    if k not in ignorar
+                )
+
+                cacheado = self.obter(chave)
+                if cacheado is not None:
+                    if isinstance(cacheado, tuple):
+                        corpo, media_type = cacheado
+                        return Response(content=corpo, media_type=media_type)
+                    return cacheado
+
+                versao = versao_snapshot()
+                resultado = await func(**kwargs) if assincrono else func(**kwargs)
+
+                if isinstance(resultado, Response):
+                    if resultado.status_code == 200:
+                        self.guardar(
+                            chave, (resultado.body, resultado.media_type), versao,
+                            tamanho=len(resultado.body),
+                        )
+                else:
+                    self.guardar(chave, resultado, versao)
+                return resultado
+
+            return envoltorio
+
+        return decorador
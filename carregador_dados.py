@@ -0,0 +1,733 @@
+"""
+Carregador de Dados - Gestão Inteligente de Vagas (GIV-Saúde)
+=============================================================
+
+Camada única de acesso aos arquivos Parquet da pasta db/, usada pela API
+REST e pelos dashboards.
+
+Em vez de ler as 40 partições de `solicitacao` inteiras com `pl.read_parquet`,
+o carregador monta um plano preguiçoso (`pl.scan_parquet`) sobre o glob e
+deixa o Polars descartar colunas, row groups e partições que não interessam:
+
+- `carregar_dados()` materializa apenas o conjunto de trabalho
+  (`COLUNAS_TRABALHO`) uma única vez e o mantém em cache, acrescido dos
+  indicadores booleanos de status (`is_confirmado`, `is_sem_agendamento`,
+  `is_critico`), que substituem `str.contains` nos filtros;
+- cada endpoint declara as colunas e os predicados de que precisa e recebe
+  somente esse recorte, filtrado e projetado sobre o conjunto em memória
+  (não no disco: a projeção que chega ao leitor Parquet é a de
+  `COLUNAS_TRABALHO`, na carga e nas recargas);
+- `consultar_parquet()` atende consultas que precisam de todas as colunas
+  (listagens paginadas) direto do disco, com projeção, predicados e
+  `slice` empurrados para o leitor.
+
+Os endpoints usam o conjunto em memória em vez de um `scan_parquet` por
+requisição porque o snapshot mapeado, a recarga a quente, o cubo de KPIs
+e os scores de ML são construídos sobre ele; só `consultar_parquet()` lê
+o disco por consulta.
+
+Modos de carga (variável de ambiente GIV_MODO_CARGA):
+- "lazy" (padrão): um único `scan_parquet` sobre todas as partições;
+- "paralelo": cada partição é lida em um pool de threads limitado
+  (GIV_WORKERS_CARGA), com tempo por arquivo e quarentena de partições
+  corrompidas, que são ignoradas em vez de abortar a carga inteira.
+
+Snapshot pré-junto (warm start):
+`python carregador_dados.py --construir-snapshot` grava solicitacao ⨝
+procedimento uma única vez em Arrow IPC sem compressão, com as colunas de
+baixa cardinalidade codificadas como `pl.Categorical`. Enquanto o snapshot
+for mais novo que as partições de origem, a carga apenas mapeia o arquivo
+em memória (mmap): não há join nem decodificação de strings, e as páginas
+são compartilhadas entre os workers do uvicorn.
+
+Recarga a quente:
+O conjunto de trabalho publicado é um DataFrame imutável acompanhado de um
+manifesto (arquivo -> mtime/tamanho) das partições que o compõem. Um monitor
+em segundo plano (`iniciar_monitoramento`, intervalo GIV_INTERVALO_RECARGA)
+compara o manifesto com o disco; partições novas são lidas sozinhas (delta)
+e anexadas sem cópia, e o novo snapshot substitui o anterior com uma troca
+atômica de referência — requisições em andamento terminam sobre o antigo.
+Mudanças no catálogo de procedimentos ou em partições já incorporadas à
+carga base disparam uma recarga completa, também publicada por troca.
+"""
+
+import argparse
+from datetime import datetime
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import polars as pl
+
+# ===== CONFIGURAÇÃO =====
+PADRAO_SOLICITACAO = "db/solicitacao-*.parquet"
+PADRAO_PROCEDIMENTO = "db/procedimento-*.parquet"
+CHAVE_PROCEDIMENTO = "procedimento_sisreg_id"
+
+CAMINHO_SNAPSHOT = os.getenv("GIV_SNAPSHOT", "db/snapshot_giv.arrow")
+
+MODO_CARGA = os.getenv("GIV_MODO_CARGA", "lazy")
+WORKERS_CARGA = int(os.getenv("GIV_WORKERS_CARGA", str(min(8, os.cpu_count() or 1))))
+
+# Intervalo (s) do monitor de novas partições; 0 desliga a recarga a quente
+INTERVALO_RECARGA = float(os.getenv("GIV_INTERVALO_RECARGA", "30"))
+
+# Colunas usadas pelos KPIs, gráficos, tabelas e pelo modelo de ML.
+# As demais colunas (~20) continuam no disco e só são lidas sob demanda.
+COLUNAS_TRABALHO = [
+    "solicitacao_id",
+    "paciente_faixa_etaria",
+    "solicitacao_status",
+    "solicitacao_risco",
+    "data_solicitacao",
+    "procedimento_especialidade",
+]
+
+# Indicadores de classe de status derivados a cada carga (ver `_derivar_indicadores`):
+# coluna -> (padrão procurado em solicitacao_status, negar o resultado)
+INDICADORES_STATUS = {
+    "is_confirmado": ("CONFIRMADO", False),
+    "is_sem_agendamento": ("AGENDAMENTO", True),
+    "is_critico": ("CRITICO|URGENTE|GRAVE", False),
+}
+
+# Colunas de baixa cardinalidade gravadas como dicionário (Categorical) no snapshot
+COLUNAS_CATEGORICAS = [
+    "solicitacao_risco",
+    "solicitacao_status",
+    "procedimento_especialidade",
+    "paciente_faixa_etaria",
+]
+
+# ===== CACHE GLOBAL =====
+# Snapshot publicado: nunca é alterado no lugar, apenas substituído por inteiro
+_dados_cache = None
+
+# Composição do snapshot publicado: carga base + partições chegadas depois
+_base_cache = None
+_deltas = {}
+_arquivos_base = frozenset()
+
+# Manifesto do snapshot publicado: {"solicitacao": {arquivo: assinatura}, "procedimento": {...}}
+_manifesto = {"solicitacao": {}, "procedimento": {}}
+
+_versao_snapshot = 0
+_carregado_em = None
+
+# Serializa cargas e recargas (primeira requisição x monitor)
+_lock_carga = threading.Lock()
+
+_monitor = None
+_parar_monitor = threading.Event()
+
+# Partições que falharam na leitura: arquivo -> assinatura (mtime, tamanho) e erro.
+# Um arquivo volta a ser lido quando sua assinatura muda (ex.: reenvio corrigido).
+_particoes_quarentena = {}
+
+# Resumo da última carga (modo, tempos por arquivo, tempo total)
+_relatorio_carga = {}
+
+# Valores distintos por (versão do snapshot, coluna) do conjunto de trabalho
+# (ver `contem`). Cada publicação troca o dicionário inteiro por um vazio,
+# sem percorrer nem apagar entradas que as threads do pool estejam gravando
+_valores_distintos = {}
+
+
+# ===== PLANOS PREGUIÇOSOS =====
+def _assinatura(arquivo):
+    """(mtime, tamanho) do arquivo, usada para detectar alterações"""
+    stat = os.stat(arquivo)
+    return (stat.st_mtime, stat.st_size)
+
+
+def _em_quarentena(arquivo):
+    registro = _particoes_quarentena.get(arquivo)
+    if registro is None:
+        return False
+    try:
+        return registro["assinatura"] == _assinatura(arquivo)
+    except OSError:
+        return True
+
+
+def _arquivos(padrao):
+    """Lista ordenada de partições que casam com o padrão (fora da quarentena)"""
+    return sorted(f for f in glob.glob(padrao) if not _em_quarentena(f))
+
+
+def _manifesto_atual():
+    """Assinaturas das partições visíveis agora no disco"""
+    manifesto = {}
+    for chave, padrao in (("solicitacao", PADRAO_SOLICITACAO), ("procedimento", PADRAO_PROCEDIMENTO)):
+        manifesto[chave] = {}
+        for arquivo in _arquivos(padrao):
+            try:
+                manifesto[chave][arquivo] = _assinatura(arquivo)
+            except OSError:
+                # Removido entre o glob e o stat
+                continue
+    return manifesto
+
+
+def escanear_solicitacoes(arquivos=None):
+    """Plano preguiçoso das partições de solicitacao (todas, ou só `arquivos`)"""
+    solicitacao_files = arquivos if arquivos is not None else _arquivos(PADRAO_SOLICITACAO)
+    if not solicitacao_files:
+        raise FileNotFoundError("Arquivos de solicitacao nao encontrados")
+    return pl.scan_parquet(solicitacao_files)
+
+
+def escanear_procedimentos():
+    """Plano preguiçoso do catálogo de procedimentos (1 arquivo, ~800 linhas)"""
+    procedimento_files = _arquivos(PADRAO_PROCEDIMENTO)
+    if not procedimento_files:
+        raise FileNotFoundError("Arquivos de procedimento nao encontrados")
+    return pl.scan_parquet(procedimento_files)
+
+
+def escanear_dados(arquivos=None):
+    """
+    Plano preguiçoso de solicitacao ⨝ procedimento (LEFT JOIN).
+
+    Nada é lido do disco até o `collect()`; o otimizador do Polars empurra
+    projeção e predicados até o leitor Parquet de cada lado do join.
+    """
+    lf = escanear_solicitacoes(arquivos)
+
+    if _arquivos(PADRAO_PROCEDIMENTO):
+        lf = lf.join(escanear_procedimentos(), on=CHAVE_PROCEDIMENTO, how="left")
+
+    return lf
+
+
+# ===== FILTROS =====
+def montar_filtros(risco=None, especialidade=None):
+    """
+    Converte os filtros de query string em predicados Polars.
+
+    Aceita valor único ou lista; listas vazias/None não filtram.
+    """
+    filtros = []
+    if risco:
+        riscos = [risco] if isinstance(risco, str) else list(risco)
+        filtros.append(pl.col("solicitacao_risco").is_in(riscos))
+    if especialidade:
+        especialidades = (
+            [especialidade] if isinstance(especialidade, str) else list(especialidade)
+        )
+        filtros.append(pl.col("procedimento_especialidade").is_in(especialidades))
+    return filtros
+
+
+def contem(coluna, padrao):
+    """
+    Equivalente a `pl.col(coluna).str.contains(padrao)` para o conjunto de
+    trabalho, inclusive quando a coluna é Categorical (snapshot).
+
+    O padrão é avaliado uma vez sobre os valores distintos da coluna
+    (dezenas de status) e aplicado como `is_in`, sem decodificar milhões
+    de strings a cada requisição.
+    """
+    versao, df = snapshot_atual()
+    cache = _valores_distintos
+    chave = (versao, coluna)
+    valores = cache.get(chave)
+    if valores is None:
+        valores = df[coluna].cast(pl.String).unique().drop_nulls()
+        cache[chave] = valores
+    casados = valores.filter(valores.str.contains(padrao)).to_list()
+    return pl.col(coluna).is_in(casados)
+
+
+def _derivar_indicadores(df):
+    """
+    Acrescenta as colunas booleanas de `INDICADORES_STATUS`.
+
+    Os padrões são avaliados uma vez sobre os poucos status distintos e
+    mapeados para as linhas com `is_in`; booleanos do Polars já ficam
+    empacotados em bits (1 bit por linha). Status nulo resulta em False,
+    como no filtro com `str.contains` que os indicadores substituem.
+    """
+    valores = df["solicitacao_status"].cast(pl.String).unique().drop_nulls()
+    colunas = []
+    for coluna, (padrao, negar) in INDICADORES_STATUS.items():
+        casados = pl.col("solicitacao_status").is_in(
+            valores.filter(valores.str.contains(padrao)).to_list()
+        )
+        if negar:
+            casados = ~casados
+        colunas.append(casados.fill_null(False).alias(coluna))
+    return df.with_columns(colunas)
+
+
+def _aplicar(lf, colunas=None, filtros=None):
+    """Aplica predicados e projeção a um LazyFrame"""
+    if filtros:
+        lf = lf.filter(*filtros)
+    if colunas:
+        lf = lf.select(colunas)
+    return lf
+
+
+# ===== CARREGAMENTO =====
+def _colocar_em_quarentena(arquivo, erro):
+    """Registra uma partição ilegível para que as próximas cargas a ignorem"""
+    try:
+        assinatura = _assinatura(arquivo)
+    except OSError:
+        assinatura = None
+    _particoes_quarentena[arquivo] = {"assinatura": assinatura, "erro": str(erro)}
+    print(f"AVISO: {arquivo} em quarentena: {erro}")
+
+
+def _ler_particao(arquivo, colunas):
+    """Lê uma partição projetada nas colunas existentes; retorna (df, segundos)"""
+    inicio = time.perf_counter()
+    schema = pl.read_parquet_schema(arquivo)
+    df = pl.read_parquet(arquivo, columns=[c for c in colunas if c in schema])
+    return df, time.perf_counter() - inicio
+
+
+def _ler_particoes(arquivos, colunas, max_workers=None):
+    """Lê as partições no pool; retorna {arquivo: df} e os tempos por arquivo"""
+    max_workers = max_workers or WORKERS_CARGA
+    frames = {}
+    tempos = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="giv-carga") as pool:
+        futuros = {pool.submit(_ler_particao, f, colunas): f for f in arquivos}
+        for i, futuro in enumerate(as_completed(futuros), start=1):
+            arquivo = futuros[futuro]
+            try:
+                df, segundos = futuro.result()
+            except Exception as e:
+                _colocar_em_quarentena(arquivo, e)
+                continue
+            frames[arquivo] = df
+            tempos[arquivo] = round(segundos, 4)
+            print(
+                f"   [{i}/{len(arquivos)}] {os.path.basename(arquivo)}: "
+                f"{len(df):,} linhas em {segundos * 1000:.0f} ms"
+            )
+
+    return frames, tempos
+
+
+def ler_particoes_paralelo(arquivos, colunas, max_workers=None):
+    """
+    Lê as partições concorrentemente em um pool limitado.
+
+    Partições que falharem vão para a quarentena e são ignoradas. Retorna o
+    DataFrame concatenado (sem rechunk) e os tempos por arquivo.
+    """
+    frames, tempos = _ler_particoes(arquivos, colunas, max_workers)
+    if not frames:
+        raise FileNotFoundError("Nenhuma partição de solicitacao pôde ser lida")
+
+    # Mantém a ordem das partições; rechunk desligado evita copiar tudo de novo
+    df = pl.concat([frames[f] for f in arquivos if f in frames], rechunk=False)
+    return df, tempos
+
+
+# ===== SNAPSHOT ARROW IPC =====
+def _mtime_origem():
+    """Maior mtime entre as partições de origem (solicitacao e procedimento)"""
+    arquivos = glob.glob(PADRAO_SOLICITACAO) + glob.glob(PADRAO_PROCEDIMENTO)
+    return max((os.path.getmtime(f) for f in arquivos), default=0.0)
+
+
+def snapshot_atualizado(caminho=None):
+    """True se o snapshot existe e é mais novo que todas as partições"""
+    caminho = caminho or CAMINHO_SNAPSHOT
+    return os.path.exists(caminho) and os.path.getmtime(caminho) > _mtime_origem()
+
+
+def construir_snapshot(caminho=None):
+    """
+    Grava solicitacao ⨝ procedimento (todas as colunas) em Arrow IPC.
+
+    O arquivo fica sem compressão para poder ser mapeado em memória, e as
+    `COLUNAS_CATEGORICAS` são gravadas como dicionário. A escrita roda em
+    streaming para um arquivo temporário que depois substitui o anterior
+    atomicamente.
+    """
+    caminho = caminho or CAMINHO_SNAPSHOT
+    inicio = time.perf_counter()
+    print(f"Construindo snapshot {caminho}...")
+
+    lf = escanear_dados()
+    schema = lf.collect_schema()
+    lf = lf.with_columns(
+        [pl.col(c).cast(pl.Categorical) for c in COLUNAS_CATEGORICAS if c in schema]
+    )
+
+    temporario = caminho + ".tmp"
+    lf.sink_ipc(temporario, compression="uncompressed")
+    os.replace(temporario, caminho)
+
+    tamanho_mb = os.path.getsize(caminho) / 1024 / 1024
+    print(
+        f"OK: snapshot gravado em {time.perf_counter() - inicio:.1f}s "
+        f"({tamanho_mb:,.0f} MB)"
+    )
+    return caminho
+
+
+def _carregar_snapshot():
+    """Modo "snapshot": mapeia o Arrow IPC sem rechunk (sem cópia das colunas)"""
+    df = pl.read_ipc(
+        CAMINHO_SNAPSHOT, columns=COLUNAS_TRABALHO, memory_map=True, rechunk=False
+    )
+    return df, {}
+
+
+def _carregar_lazy(arquivos):
+    """Modo "lazy": um único plano sobre todas as partições"""
+    return escanear_dados(arquivos).select(COLUNAS_TRABALHO).collect(), {}
+
+
+def _juntar_procedimento(df):
+    """Completa partições lidas isoladamente com as colunas do catálogo"""
+    if _arquivos(PADRAO_PROCEDIMENTO):
+        colunas_proc = [c for c in COLUNAS_TRABALHO if c not in df.columns]
+        df_procedimento = escanear_procedimentos().select(
+            [CHAVE_PROCEDIMENTO] + colunas_proc
+        ).collect()
+        df = df.join(df_procedimento, on=CHAVE_PROCEDIMENTO, how="left")
+
+    return df.select([c for c in COLUNAS_TRABALHO if c in df.columns])
+
+
+def _carregar_paralelo(arquivos):
+    """Modo "paralelo": partições lidas no pool e join com o catálogo"""
+    if not arquivos:
+        raise FileNotFoundError("Arquivos de solicitacao nao encontrados")
+
+    df, tempos = ler_particoes_paralelo(
+        arquivos, COLUNAS_TRABALHO + [CHAVE_PROCEDIMENTO]
+    )
+    return _juntar_procedimento(df), tempos
+
+
+def _alinhar(df, schema):
+    """Ajusta um delta ao schema da base (ex.: String -> Categorical do snapshot)"""
+    return df.select([
+        pl.col(c).cast(tipo) if c in df.columns else pl.lit(None, dtype=tipo).alias(c)
+        for c, tipo in schema.items()
+    ])
+
+
+def _carga_completa(manifesto):
+    """Lê a base inteira para as partições do manifesto; retorna (df, tempos, modo)"""
+    arquivos = sorted(manifesto["solicitacao"])
+    modo = "snapshot" if snapshot_atualizado() else MODO_CARGA
+    print(f"Carregando dados da pasta db (modo {modo})...")
+
+    if modo == "snapshot":
+        df, tempos = _carregar_snapshot()
+    elif modo == "paralelo":
+        df, tempos = _carregar_paralelo(arquivos)
+    else:
+        try:
+            df, tempos = _carregar_lazy(arquivos)
+        except Exception as e:
+            # Uma partição corrompida derruba o scan único; o modo
+            # paralelo isola o arquivo defeituoso e segue com os demais
+            print(f"AVISO: scan preguiçoso falhou ({e}); usando leitura paralela")
+            modo = "paralelo"
+            df, tempos = _carregar_paralelo(arquivos)
+
+    return _derivar_indicadores(df), tempos, modo
+
+
+def _hash_manifesto(manifesto):
+    """Hash curto das partições (nome, tamanho, mtime) que formam o snapshot"""
+    conteudo = json.dumps(
+        {
+            chave: sorted(
+                (os.path.basename(f), tamanho, mtime) for f, (mtime, tamanho) in arquivos.items()
+            )
+            for chave, arquivos in manifesto.items()
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+def _publicar(base, deltas, manifesto, relatorio):
+    """
+    Monta o novo snapshot e o publica com uma única atribuição.
+
+    Quem já obteve a referência anterior (requisições em andamento) continua
+    com ela; as próximas chamadas recebem a nova versão.
+    """
+    global _dados_cache, _base_cache, _deltas, _manifesto
+    global _versao_snapshot, _carregado_em, _relatorio_carga, _valores_distintos
+
+    if deltas:
+        df = pl.concat([base, *(deltas[f] for f in sorted(deltas))], rechunk=False)
+    else:
+        df = base
+
+    # Partições que foram para a quarentena durante a leitura ficam fora do
+    # manifesto, para serem tentadas de novo quando o arquivo mudar
+    manifesto = {
+        chave: {f: a for f, a in arquivos.items() if not _em_quarentena(f)}
+        for chave, arquivos in manifesto.items()
+    }
+
+    print(
+        f"OK: Total: {len(df):,} registros "
+        f"({len(df.columns)} colunas, {df.estimated_size('mb'):,.0f} MB)"
+    )
+    if _particoes_quarentena:
+        print(f"AVISO: {len(_particoes_quarentena)} partição(ões) em quarentena")
+
+    _base_cache = base
+    _deltas = deltas
+    _manifesto = manifesto
+    _relatorio_carga = {
+        **relatorio,
+        "arquivos": len(manifesto["solicitacao"]),
+        "particoes_delta": len(deltas),
+        "hash_snapshot": _hash_manifesto(manifesto),
+    }
+    _carregado_em = datetime.now()
+    _versao_snapshot += 1
+    _dados_cache = df
+    _valores_distintos = {}
+    return df
+
+
+def _carregar_conjunto_trabalho():
+    """Materializa (uma vez) apenas as colunas do conjunto de trabalho"""
+    global _arquivos_base
+
+    df = _dados_cache
+    if df is not None:
+        return df
+
+    with _lock_carga:
+        if _dados_cache is not None:
+            return _dados_cache
+
+        try:
+            inicio = time.perf_counter()
+            manifesto = _manifesto_atual()
+            df, tempos, modo = _carga_completa(manifesto)
+            segundos = time.perf_counter() - inicio
+
+            print(
+                f"OK: {len(manifesto['solicitacao'])} arquivos de solicitacao "
+                f"carregados em {segundos:.2f}s"
+            )
+            _arquivos_base = frozenset(manifesto["solicitacao"])
+            return _publicar(df, {}, manifesto, {
+                "modo": modo,
+                "recarga": "inicial",
+                "tempo_total_s": round(segundos, 3),
+                "tempos_por_arquivo_s": tempos,
+            })
+
+        except Exception as e:
+            print(f"ERRO ao carregar dados: {e}")
+            raise
+
+
+# ===== RECARGA A QUENTE =====
+def recarregar_se_alterado():
+    """
+    Compara o manifesto publicado com o disco e, se algo mudou, publica um
+    novo snapshot. Retorna True quando houve troca.
+
+    Partições novas (ou reenviadas depois de entrarem como delta) são lidas
+    sozinhas e anexadas; alterações no catálogo de procedimentos ou em
+    partições da carga base exigem recarga completa.
+    """
+    global _arquivos_base
+
+    if _dados_cache is None:
+        # Nada publicado ainda: a primeira requisição fará a carga completa
+        return False
+
+    with _lock_carga:
+        atual = _manifesto_atual()
+        if atual == _manifesto:
+            return False
+
+        antigas = _manifesto["solicitacao"]
+        novas = atual["solicitacao"]
+        alteradas = [f for f, a in novas.items() if antigas.get(f) != a]
+        removidas = [f for f in antigas if f not in novas]
+
+        inicio = time.perf_counter()
+        base_mudou = any(f in _arquivos_base for f in alteradas + removidas)
+
+        if atual["procedimento"] != _manifesto["procedimento"] or base_mudou:
+            print("Partições da carga base alteradas: recarregando tudo...")
+            df, tempos, modo = _carga_completa(atual)
+            _arquivos_base = frozenset(atual["solicitacao"])
+            deltas = {}
+            tipo = "completa"
+        else:
+            print(
+                f"Recarga incremental: {len(alteradas)} partição(ões) nova(s)/alterada(s), "
+                f"{len(removidas)} removida(s)"
+            )
+            df = _base_cache
+            modo = _relatorio_carga.get("modo")
+            tipo = "incremental"
+            deltas = {
+                f: d for f, d in _deltas.items() if f not in removidas and f not in alteradas
+            }
+            frames, tempos = _ler_particoes(alteradas, COLUNAS_TRABALHO + [CHAVE_PROCEDIMENTO])
+            for arquivo, frame in frames.items():
+                deltas[arquivo] = _alinhar(
+                    _derivar_indicadores(_juntar_procedimento(frame)), df.schema
+                )
+
+        segundos = time.perf_counter() - inicio
+        _publicar(df, deltas, atual, {
+            "modo": modo,
+            "recarga": tipo,
+            "tempo_total_s": round(segundos, 3),
+            "tempos_por_arquivo_s": tempos,
+        })
+        print(f"OK: snapshot v{_versao_snapshot} publicado em {segundos:.2f}s")
+        return True
+
+
+def _monitorar(intervalo):
+    while not _parar_monitor.wait(intervalo):
+        try:
+            recarregar_se_alterado()
+        except Exception as e:
+            # Mantém o snapshot atual e tenta de novo no próximo ciclo
+            print(f"ERRO na recarga a quente: {e}")
+
+
+def iniciar_monitoramento(intervalo=None):
+    """Inicia (uma vez) a thread que procura partições novas/alteradas"""
+    global _monitor
+
+    intervalo = INTERVALO_RECARGA if intervalo is None else intervalo
+    if intervalo <= 0 or (_monitor is not None and _monitor.is_alive()):
+        return
+
+    _parar_monitor.clear()
+    _monitor = threading.Thread(
+        target=_monitorar, args=(intervalo,), name="giv-monitor", daemon=True
+    )
+    _monitor.start()
+    print(f"Monitor de partições ativo (a cada {intervalo:g}s)")
+
+
+def parar_monitoramento():
+    """Sinaliza a thread do monitor para encerrar"""
+    _parar_monitor.set()
+
+
+def carregar_dados(colunas=None, filtros=None):
+    """
+    Retorna o conjunto de trabalho em memória.
+
+    Args:
+        colunas: colunas necessárias ao chamador (None = conjunto inteiro)
+        filtros: lista de predicados Polars (ver `montar_filtros`)
+
+    A filtragem roda como consulta preguiçosa sobre o cache em memória (não
+    sobre os arquivos), de modo que só as colunas pedidas são copiadas para
+    o resultado. Para ler do disco colunas fora do conjunto de trabalho,
+    use `consultar_parquet`.
+    """
+    df = _carregar_conjunto_trabalho()
+
+    if not colunas and not filtros:
+        return df
+
+    return _aplicar(df.lazy(), colunas, filtros).collect()
+
+
+def consultar_parquet(colunas=None, filtros=None, offset=0, limit=None):
+    """
+    Consulta direto nos arquivos Parquet, para colunas fora do conjunto de
+    trabalho (ex.: listagens com todas as colunas).
+
+    Projeção, predicados e `slice` são empurrados para o leitor e o plano
+    roda no engine de streaming, evitando materializar a tabela inteira.
+    """
+    lf = _aplicar(escanear_dados(), colunas, filtros)
+    if offset or limit is not None:
+        lf = lf.slice(offset, limit)
+    return lf.collect(engine="streaming")
+
+
+def total_registros(filtros=None):
+    """Quantidade de registros do conjunto de trabalho (opcionalmente filtrado)"""
+    df = _carregar_conjunto_trabalho()
+    if not filtros:
+        return len(df)
+    return df.lazy().filter(*filtros).select(pl.len()).collect().item()
+
+
+def versao_snapshot():
+    """Versão do snapshot publicado (0 enquanto nada foi carregado)"""
+    return _versao_snapshot
+
+
+def hash_snapshot():
+    """Identifica os dados do snapshot publicado (carimbado nos artefatos de ML)"""
+    _carregar_conjunto_trabalho()
+    return _relatorio_carga["hash_snapshot"]
+
+
+def snapshot_atual():
+    """
+    (versão, DataFrame) do snapshot publicado, para caches derivados.
+
+    A versão é lida antes do DataFrame: numa troca concorrente o pior caso é
+    um dado novo rotulado com a versão anterior, que só força um recálculo.
+    A carga inicial acontece antes, para a primeira leitura não sair como 0.
+    """
+    _carregar_conjunto_trabalho()
+    versao = _versao_snapshot
+    return versao, _carregar_conjunto_trabalho()
+
+
+def cache_ativo():
+    """Indica se o conjunto de trabalho já está em memória"""
+    return _dados_cache is not None
+
+
+def info_carga():
+    """Resumo da última carga e das partições em quarentena (para /status)"""
+    return {
+        **_relatorio_carga,
+        "versao_snapshot": _versao_snapshot,
+        "carregado_em": _carregado_em.isoformat() if _carregado_em else None,
+        "recarga_automatica": _monitor is not None and _monitor.is_alive(),
+        "quarentena": {
+            arquivo: registro["erro"]
+            for arquivo, registro in _particoes_quarentena.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carregador de dados GIV")
+    parser.add_argument(
+        "--construir-snapshot",
+        action="store_true",
+        help="grava o snapshot Arrow IPC pré-junto (GIV_SNAPSHOT)",
+    )
+    args = parser.parse_args()
+
+    if args.construir_snapshot:
+        construir_snapshot()
+    else:
+        df = carregar_dados()
+        print(info_carga())
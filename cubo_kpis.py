@@ -0,0 +1,179 @@
+"""
+Cubo de KPIs - Gestão Inteligente de Vagas (GIV-Saúde)
+======================================================
+
+Agregado pré-calculado do conjunto de trabalho, usado pelos KPIs da API e
+do dashboard no lugar de varrer milhões de linhas a cada requisição.
+
+O cubo guarda a contagem de solicitações por
+(risco, especialidade, faixa etária, classe de status), em que a classe de
+status é o par de indicadores `is_confirmado` / `is_sem_agendamento`. São
+poucos milhares de células, e qualquer combinação de filtros de risco e
+especialidade (os mesmos predicados de `montar_filtros`) é respondida
+somando células: as medidas ficam em uma matriz NumPy e cada valor de
+risco/especialidade aponta para as suas células, de modo que um filtro é
+só uma máscara booleana sobre alguns milhares de posições.
+
+O cubo é reconstruído uma vez por versão do snapshot de dados (ver
+recarga a quente em `carregador_dados`).
+"""
+
+import threading
+
+import numpy as np
+import polars as pl
+
+from carregador_dados import montar_filtros, snapshot_atual
+
+DIMENSOES = [
+    "solicitacao_risco",
+    "procedimento_especialidade",
+    "paciente_faixa_etaria",
+    "is_confirmado",
+    "is_sem_agendamento",
+]
+
+RISCOS_CRITICOS = ["VERMELHO", "AMARELO"]
+
+# ===== CACHE POR VERSÃO DO SNAPSHOT =====
+# (versão, cubo, contagem por status, índice), substituído por inteiro a cada versão
+_cubo = (None, None, None, None)
+_lock_cubo = threading.Lock()
+
+
+def construir_cubo(df):
+    """
+    Agrega o conjunto de trabalho em células (DIMENSOES -> n).
+
+    Retorna também a contagem por `solicitacao_status`, usada no ranking de
+    status do relatório resumido.
+    """
+    cubo = (
+        df.lazy()
+        .group_by(
+            pl.col("solicitacao_risco").cast(pl.String),
+            pl.col("procedimento_especialidade").cast(pl.String),
+            pl.col("paciente_faixa_etaria").cast(pl.String),
+            "is_confirmado",
+            "is_sem_agendamento",
+        )
+        .agg(pl.len().alias("n"))
+        .collect()
+    )
+    contagem_status = (
+        df.lazy()
+        .group_by(pl.col("solicitacao_status").cast(pl.String))
+        .agg(pl.len().alias("count"))
+        .collect()
+    )
+    return cubo, contagem_status
+
+
+def _indexar(cubo):
+    """Matriz de medidas (total, confirmados, criticos, sem_agendamento) e
+    posições das células por valor de risco e de especialidade"""
+    n = cubo["n"].to_numpy().astype(np.int64)
+    medidas = np.vstack([
+        n,
+        n * cubo["is_confirmado"].to_numpy(),
+        n * cubo["solicitacao_risco"].is_in(RISCOS_CRITICOS).fill_null(False).to_numpy(),
+        n * cubo["is_sem_agendamento"].to_numpy(),
+    ])
+
+    posicoes = {}
+    for coluna in ("solicitacao_risco", "procedimento_especialidade"):
+        grupos = cubo.with_row_index("pos").group_by(coluna).agg(pl.col("pos"))
+        posicoes[coluna] = {
+            valor: np.asarray(pos, dtype=np.int64)
+            for valor, pos in grupos.iter_rows()
+            if valor is not None
+        }
+    return {"medidas": medidas, "posicoes": posicoes}
+
+
+def _obter():
+    global _cubo
+
+    versao, df = snapshot_atual()
+    atual = _cubo
+    if atual[0] == versao:
+        return atual
+
+    with _lock_cubo:
+        if _cubo[0] != versao:
+            cubo, contagem_status = construir_cubo(df)
+            _cubo = (versao, cubo, contagem_status, _indexar(cubo))
+        return _cubo
+
+
+def obter_cubo():
+    """Cubo da versão atual do snapshot (reconstruído quando a versão muda)"""
+    return _obter()[1]
+
+
+def _selecionar(risco=None, especialidade=None, sem_agendamento=False):
+    cubo = obter_cubo()
+    filtros = montar_filtros(risco, especialidade)
+    if sem_agendamento:
+        filtros.append(pl.col("is_sem_agendamento"))
+    return cubo.filter(*filtros) if filtros else cubo
+
+
+def _mascara(posicoes, valores, tamanho):
+    """Células cujo valor está em `valores` (None/vazio = todas)"""
+    if not valores:
+        return None
+    valores = [valores] if isinstance(valores, str) else valores
+    mascara = np.zeros(tamanho, dtype=bool)
+    for valor in valores:
+        pos = posicoes.get(valor)
+        if pos is not None:
+            mascara[pos] = True
+    return mascara
+
+
+def kpis(risco=None, especialidade=None):
+    """
+    Contagens dos KPIs para os filtros informados.
+
+    Retorna dict com total, confirmados, criticos (VERMELHO/AMARELO) e
+    sem_agendamento.
+    """
+    indice = _obter()[3]
+    medidas = indice["medidas"]
+    tamanho = medidas.shape[1]
+
+    mascara = None
+    for coluna, valores in (
+        ("solicitacao_risco", risco),
+        ("procedimento_especialidade", especialidade),
+    ):
+        m = _mascara(indice["posicoes"][coluna], valores, tamanho)
+        if m is not None:
+            mascara = m if mascara is None else mascara & m
+
+    somas = medidas.sum(axis=1) if mascara is None else medidas[:, mascara].sum(axis=1)
+    total, confirmados, criticos, sem_agendamento = (int(v) for v in somas)
+    return {
+        "total": total,
+        "confirmados": confirmados,
+        "criticos": criticos,
+        "sem_agendamento": sem_agendamento,
+    }
+
+
+def distribuicao(coluna, risco=None, especialidade=None, sem_agendamento=False):
+    """
+    Contagem por uma dimensão do cubo (coluna `count`, como em
+    `group_by(coluna).count()` sobre as linhas).
+    """
+    return (
+        _selecionar(risco, especialidade, sem_agendamento)
+        .group_by(coluna)
+        .agg(pl.col("n").sum().alias("count"))
+    )
+
+
+def contagem_status():
+    """Contagem por `solicitacao_status` do snapshot atual (sem filtros)"""
+    return _obter()[2]
@@ -1,61 +1,101 @@
-﻿import polars as pl
-import plotly.express as px
-import plotly.graph_objects as go
+﻿import json
+import polars as pl
+import plotly.io as pio
+from plotly.colors import get_colorscale
+from plotly.offline import get_plotlyjs_version
 from fastapi import FastAPI, Query, Depends, Form, Request, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from typing import List, Optional
-import glob
 from datetime import datetime, timedelta
-from modelo_ml_saude import modelo_global
+from modelo_ml_saude import modelo_ativo, carregar_modelo_ativo, ao_trocar_modelo
+from carregador_dados import carregar_dados, montar_filtros, snapshot_atual, total_registros, versao_snapshot
+import cubo_kpis
+import scores_ml
+from cache_resultados import CacheResultados, normalizar_filtro
+import executor_cpu
+from executor_cpu import no_pool
+from serializacao_json import resposta_json, FORMATO_TEXTO
+from formatacao_br import (
+    formatar_numero_br,
+    formatar_moeda_br,
+    formatar_numeros_br,
+    formatar_decimais_br,
+)
 
 # Configuração
 USUARIOS_VALIDOS = {"admin": "senha123", "tou": "hackathon"}
 
 app = FastAPI(title="Gestão Inteligente de Vagas - GIV-Saúde", version="2.0.0")
 
-# Cache de dados
-_dados_cache = None
-
-
-def formatar_numero_br(numero):
-    """
-    Formata números no padrão brasileiro:
-    - Ponto para separar milhares
-    - Vírgula para separar decimais
-    """
-    if numero is None:
-        return "0"
-    
-    # Converter para float se for string
-    try:
-        if isinstance(numero, str):
-            numero = float(numero)
-    except (ValueError, TypeError):
-        return str(numero)
-    
-    # Se for inteiro, não mostrar decimais
-    if numero == int(numero):
-        return f"{int(numero):,}".replace(",", ".")
-    else:
-        # Formatar com 1 casa decimal
-        return f"{numero:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-
-def formatar_moeda_br(valor):
-    """
-    Formata valores monetários no padrão brasileiro:
-    - R$ 1.000,00
-    """
-    if valor is None:
-        return "R$ 0,00"
-    
+# Páginas já renderizadas por (versão do snapshot, usuário, filtros normalizados)
+cache_dashboard = CacheResultados("dashboard")
+# O fragmento de predição foi calculado com o modelo anterior
+ao_trocar_modelo(cache_dashboard.limpar)
+
+# Specs JSON dos gráficos por (versão do snapshot, filtros normalizados),
+# compartilhadas entre usuários; desenhadas no navegador com Plotly.newPlot
+cache_graficos = CacheResultados("graficos")
+
+PLOTLY_JS_CDN = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+# Template padrão do plotly.py (o que o to_html embutia em cada figura),
+# enviado uma vez por página
+TEMPLATE_GRAFICOS_JSON = json.dumps(
+    pio.templates[pio.templates.default].to_plotly_json(), separators=(",", ":")
+)
+
+# Conteúdo provisório dos fragmentos e gráficos enquanto carregam
+CARREGANDO_HTML = (
+    '<div class="text-center text-muted p-5">'
+    '<div class="spinner-border" role="status"></div>'
+    '<p class="mt-2 mb-0">Carregando...</p></div>'
+)
+
+# Cores e ordem FIXA de criticidade: Vermelho > Amarelo > Verde > Azul
+CORES_RISCO = {
+    "AZUL": "#007bff",
+    "VERDE": "#28a745",
+    "AMARELO": "#ffc107",
+    "VERMELHO": "#dc3545",
+}
+ORDEM_RISCOS = ["VERMELHO", "AMARELO", "VERDE", "AZUL"]
+
+# Tabelas de dados detalhados (servidas em páginas por /api/tabela/{secao})
+COLUNAS_TABELA = [
+    "solicitacao_id",
+    "paciente_faixa_etaria",
+    "solicitacao_risco",
+    "solicitacao_status",
+    "procedimento_especialidade",
+    "data_solicitacao",
+]
+NOMES_COLUNAS = {
+    "solicitacao_id": "ID Solicitação",
+    "paciente_faixa_etaria": "Faixa Etária",
+    "solicitacao_risco": "Risco",
+    "solicitacao_status": "Status",
+    "procedimento_especialidade": "Especialidade",
+    "data_solicitacao": "Data Solicitação",
+}
+FILTROS_SECAO = {
+    "geral": [],
+    "confirmados": [pl.col("is_confirmado")],
+    "criticos": [pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])],
+    "sem-agendamento": [pl.col("is_sem_agendamento")],
+}
+TAMANHO_MAXIMO_PAGINA = 500
+
+
+@app.on_event("startup")
+async def carregar_modelo_ml():
+    """Carrega o artefato ativo do modelo de ML (gerado por treinar_modelo.py)"""
     try:
-        if isinstance(valor, str):
-            valor = float(valor)
-    except (ValueError, TypeError):
-        return str(valor)
-    
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        if carregar_modelo_ativo():
+            print(f"🤖 Modelo de ML carregado: versão {modelo_ativo().versao}")
+        else:
+            print("⚠️ Nenhum artefato de modelo: predições usarão regras")
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar modelo de ML: {e}")
 
 
 def formatar_template_grafico(texto_template):
@@ -69,52 +109,7 @@ def formatar_template_grafico(texto_template):
     return texto_template
 
 
-def carregar_dados():
-    """Carrega os dados da pasta db com cache"""
-    global _dados_cache
-
-    if _dados_cache is not None:
-        return _dados_cache
-
-    try:
-        print("Carregando dados da pasta db...")
-
-        # Carregar solicitações
-        solicitacao_files = glob.glob("db/solicitacao-*.parquet")
-        if solicitacao_files:
-            df_solicitacao = pl.concat([pl.read_parquet(f) for f in solicitacao_files])
-            print(f"OK: {len(solicitacao_files)} arquivos de solicitacao carregados")
-        else:
-            raise FileNotFoundError("Arquivos de solicitacao nao encontrados")
-
-        # Carregar procedimentos
-        procedimento_files = glob.glob("db/procedimento-*.parquet")
-        if procedimento_files:
-            df_procedimento = pl.concat(
-                [pl.read_parquet(f) for f in procedimento_files]
-            )
-            print(
-                f"OK: {len(procedimento_files)} arquivo(s) de procedimento carregados"
-            )
-
-            # Join
-            df_completo = df_solicitacao.join(
-                df_procedimento, on="procedimento_sisreg_id", how="left"
-            )
-        else:
-            df_completo = df_solicitacao
-
-        print(f"OK: Total: {len(df_completo):,} registros")
-
-        _dados_cache = df_completo
-        return df_completo
-
-    except Exception as e:
-        print(f"ERRO ao carregar dados: {e}")
-        raise
-
-
-def analisar_predicao_sem_agendamento(df_sem_agendamento):
+def analisar_predicao_sem_agendamento(df_sem_agendamento, modelo=None):
     """
     Análise preditiva do impacto de não agendar pacientes
     AGORA COM MACHINE LEARNING! 🤖
@@ -127,23 +122,21 @@ def analisar_predicao_sem_agendamento(df_sem_agendamento):
 
     print("\n🤖 Executando predição com Machine Learning...")
 
-    # 🔥 MACHINE LEARNING: Treinar modelo e fazer predições
+    # 🔥 MACHINE LEARNING: predições com o artefato treinado offline
     try:
-        # Se o modelo ainda não foi treinado, treina com os dados completos
-        if not modelo_global.treinado:
-            print("   📚 Treinando modelo pela primeira vez...")
-            modelo_global.treinar(df_sem_agendamento)
-
-        # Fazer predições ML
-        df_predicoes = modelo_global.predizer_agravamentos(df_sem_agendamento)
+        # Scores pré-calculados por versão de dados/modelo (scores_ml); sem
+        # artefato (treinar_modelo.py) não há score e vale o fallback
+        if "probabilidade_agravamento" not in df_sem_agendamento.columns:
+            raise RuntimeError("modelo não carregado (rode treinar_modelo.py)")
 
         # Calcular métricas baseadas em ML
-        metricas_ml = modelo_global.calcular_metricas_predicao(df_predicoes)
+        modelo = modelo or modelo_ativo()
+        metricas_ml = modelo.calcular_metricas_predicao(df_sem_agendamento)
 
         # Adicionar informações do modelo
         metricas_ml["usa_ml"] = True
-        metricas_ml["algoritmo"] = "Random Forest Classifier"
-        metricas_ml["num_arvores"] = 100
+        metricas_ml["algoritmo"] = modelo.nome_algoritmo()
+        metricas_ml["num_arvores"] = modelo.num_arvores()
 
         print("   ✅ Predição ML concluída com sucesso!")
 
@@ -216,6 +209,702 @@ def analisar_predicao_sem_agendamento(df_sem_agendamento):
         }
 
 
+# Gráficos: specs no formato do Plotly.js montadas à mão (sem os validadores
+# do go.Figure), serializadas uma vez por (snapshot, filtros)
+def _titulo(texto):
+    return {"text": texto}
+
+
+def _ordenar_por_risco(df):
+    """Contagens por risco na ordem de criticidade (só os riscos presentes)"""
+    ordem = {r: i for i, r in enumerate(ORDEM_RISCOS)}
+    df = df.with_columns(
+        pl.col("solicitacao_risco").cast(pl.String).replace_strict(ordem, default=len(ordem)).alias("ordem")
+    ).sort("ordem")
+    return df["solicitacao_risco"].cast(pl.String).to_list(), df["count"].to_list()
+
+
+def _pizza_risco(riscos, valores, titulo, altura):
+    contagens = pl.Series(valores)
+    percentuais = formatar_decimais_br(contagens / contagens.sum() * 100)
+    return {
+        "data": [
+            {
+                "type": "pie",
+                "labels": riscos,
+                "values": valores,
+                "marker": {"colors": [CORES_RISCO.get(r, "#6c757d") for r in riscos]},
+                "textinfo": "value+percent",
+                "texttemplate": (
+                    formatar_numeros_br(contagens) + "<br>(" + percentuais + "%)"
+                ).to_list(),
+                "hole": 0.3,  # Donut chart
+                "sort": False,  # Manter a ordem de criticidade
+            }
+        ],
+        "layout": {
+            "title": _titulo(titulo),
+            "height": altura,
+            "showlegend": True,
+            "legend": {
+                "orientation": "v",
+                "yanchor": "middle",
+                "y": 0.5,
+                "xanchor": "right",
+                "x": -0.05,  # Posicionar à esquerda
+                "traceorder": "normal",
+            },
+            "margin": {"l": 150},  # Margem esquerda para acomodar a legenda
+        },
+    }
+
+
+def _barras(x, y, titulo, altura, titulo_x, titulo_y, marker, com_texto=True, **layout):
+    barra = {"type": "bar", "x": x, "y": y, "marker": marker}
+    if com_texto:
+        barra.update(
+            text=[str(val) for val in y],
+            textposition="auto",
+            texttemplate=formatar_numeros_br(y).to_list(),
+        )
+    return {
+        "data": [barra],
+        "layout": {
+            "title": _titulo(titulo),
+            "height": altura,
+            "xaxis": {"title": _titulo(titulo_x), **layout.pop("xaxis", {})},
+            "yaxis": {"title": _titulo(titulo_y)},
+            **layout,
+        },
+    }
+
+
+def _especialidade_unica(especialidade):
+    """A especialidade filtrada, quando o filtro tem exatamente uma"""
+    return especialidade[0] if especialidade and len(especialidade) == 1 else None
+
+
+def _sem_agendamento(risco, especialidade):
+    return carregar_dados(
+        ["solicitacao_risco", "solicitacao_status"],
+        montar_filtros(risco, especialidade) + [pl.col("is_sem_agendamento")],
+    )
+
+
+def _grafico_risco(risco, especialidade):
+    """Distribuição por Risco (PIZZA)"""
+    df_risco = cubo_kpis.distribuicao("solicitacao_risco", risco, especialidade)
+    if len(df_risco) == 0:
+        return None
+    riscos, valores = _ordenar_por_risco(df_risco)
+    return _pizza_risco(riscos, valores, "Distribuição por Nível de Risco", 400)
+
+
+def _grafico_especialidade(risco, especialidade):
+    """Especialidades (limite de 10 principais)"""
+    df_esp = (
+        cubo_kpis.distribuicao("procedimento_especialidade", risco, especialidade)
+        .sort("count", descending=True)
+        .head(10)
+    )
+    if len(df_esp) == 0:
+        return None
+
+    num_esp = len(df_esp)
+    # Título dinâmico que mostra a quantidade real de especialidades no gráfico
+    if num_esp == 1:
+        titulo_esp = "Especialidades (1 especialidade)"
+    else:
+        titulo_esp = f"Especialidades ({num_esp} especialidades)"
+
+    grafico = _barras(
+        df_esp["count"].to_list(),
+        df_esp["procedimento_especialidade"].cast(pl.String).to_list(),
+        titulo_esp, 450, "Número de Solicitações", "Especialidade",
+        {"color": "#003087"}, com_texto=False,
+    )
+    grafico["data"][0]["orientation"] = "h"
+    return grafico
+
+
+def _grafico_sem_agendamento(risco, especialidade):
+    """Pacientes SEM Agendamento - Distribuição por Risco"""
+    df_sem_agend = _sem_agendamento(risco, especialidade)
+    if len(df_sem_agend) == 0:
+        return None
+    riscos_sem, valores_sem = _ordenar_por_risco(
+        df_sem_agend.group_by("solicitacao_risco").len("count")
+    )
+    return _barras(
+        riscos_sem, valores_sem,
+        f"Sem Agendamento por Risco ({formatar_numero_br(len(df_sem_agend))} pacientes)",
+        400, "Nível de Risco", "Quantidade de Pacientes",
+        {"color": [CORES_RISCO.get(r, "#6c757d") for r in riscos_sem]},
+        showlegend=False,
+    )
+
+
+def _grafico_status_sem_agendamento(risco, especialidade):
+    """Top 8 Status de Pacientes SEM Agendamento"""
+    df_status_sem = (
+        _sem_agendamento(risco, especialidade)
+        .group_by("solicitacao_status")
+        .len("count")
+        .sort("count", descending=True)
+        .head(8)
+    )
+    if len(df_status_sem) == 0:
+        return None
+    contagens = df_status_sem["count"].to_list()
+    return _barras(
+        df_status_sem["solicitacao_status"].cast(pl.String).to_list(), contagens,
+        "Top 8 Status - Pacientes SEM Agendamento", 450, "Status", "Número de Pacientes",
+        {"color": contagens, "colorscale": get_colorscale("Reds"), "showscale": False},
+        xaxis={"tickangle": -45},
+    )
+
+
+def _contagens_especialidade(risco, especialidade, coluna, limite):
+    """Contagens (top `limite`, se dado) de `coluna` na especialidade única"""
+    especialidade_unica = _especialidade_unica(especialidade)
+    if not especialidade_unica:
+        return None, None
+    df = carregar_dados([coluna], montar_filtros(risco, especialidade))
+    if coluna not in df.columns or len(df) == 0:
+        return especialidade_unica, None
+    contagens = df.group_by(coluna).len("count").sort("count", descending=True)
+    return especialidade_unica, contagens.head(limite) if limite else contagens
+
+
+def _grafico_esp_risco(risco, especialidade):
+    """Distribuição por Risco da especialidade única (PIZZA)"""
+    especialidade_unica, df_esp_risco = _contagens_especialidade(
+        risco, especialidade, "solicitacao_risco", None
+    )
+    if df_esp_risco is None:
+        return None
+    riscos_esp, valores_esp = _ordenar_por_risco(df_esp_risco)
+    return _pizza_risco(
+        riscos_esp, valores_esp, f"Distribuição por Risco - {especialidade_unica}", 350
+    )
+
+
+def _grafico_esp_status(risco, especialidade):
+    """Top 10 Status da especialidade única"""
+    especialidade_unica, df_esp_status = _contagens_especialidade(
+        risco, especialidade, "solicitacao_status", 10
+    )
+    if df_esp_status is None:
+        return None
+    contagens = df_esp_status["count"].to_list()
+    return _barras(
+        df_esp_status["solicitacao_status"].cast(pl.String).to_list(), contagens,
+        f"Top 10 Status - {especialidade_unica}", 450, "Status", "Quantidade de Pacientes",
+        {"color": contagens, "colorscale": get_colorscale("Viridis"), "showscale": False},
+        xaxis={"tickangle": -45},
+        margin={"b": 120},  # Margem inferior para labels rotacionados
+    )
+
+
+def _grafico_esp_faixa_etaria(risco, especialidade):
+    """Distribuição por Faixa Etária da especialidade única"""
+    especialidade_unica, df_esp_idade = _contagens_especialidade(
+        risco, especialidade, "paciente_faixa_etaria", 10
+    )
+    if df_esp_idade is None:
+        return None
+    return _barras(
+        df_esp_idade["paciente_faixa_etaria"].cast(pl.String).to_list(),
+        df_esp_idade["count"].to_list(),
+        f"Distribuição por Faixa Etária - {especialidade_unica}", 350,
+        "Faixa Etária", "Quantidade de Pacientes", {"color": "#17a2b8"},
+    )
+
+
+# Gráficos servidos um a um em /dashboard/grafico/{nome}
+GRAFICOS = {
+    "risco": _grafico_risco,
+    "especialidade": _grafico_especialidade,
+    "sem_agendamento": _grafico_sem_agendamento,
+    "status_sem_agendamento": _grafico_status_sem_agendamento,
+    "esp_risco": _grafico_esp_risco,
+    "esp_status": _grafico_esp_status,
+    "esp_faixa_etaria": _grafico_esp_faixa_etaria,
+}
+
+
+def grafico_json(nome, risco, especialidade):
+    """
+    Spec do gráfico `nome` serializada ("null" sem dados), em cache por
+    versão do snapshot e filtros normalizados.
+    """
+    chave = (
+        nome,
+        tuple(normalizar_filtro(risco) or ()),
+        tuple(normalizar_filtro(especialidade) or ()),
+    )
+    corpo = cache_graficos.obter(chave)
+    if corpo is not None:
+        return corpo
+
+    versao = versao_snapshot()
+    spec = GRAFICOS[nome](risco, especialidade)
+    corpo = json.dumps(spec, ensure_ascii=False, separators=(",", ":"))
+    cache_graficos.guardar(chave, corpo, versao)
+    return corpo
+
+
+def div_grafico(nome, vazio="Nenhum dado disponível", icone=""):
+    """Contêiner que o navegador preenche com /dashboard/grafico/{nome}"""
+    return (
+        f'<div data-grafico="{nome}" data-vazio="{vazio}" data-icone="{icone}">'
+        f"{CARREGANDO_HTML}</div>"
+    )
+
+
+# Fragmentos HTML servidos em /dashboard/fragmento/{nome}
+def indicadores(risco, especialidade):
+    """KPIs (cubo pré-agregado): total, taxas e pacientes sem agendamento"""
+    contagens = cubo_kpis.kpis(risco, especialidade)
+    total = contagens["total"]
+    base = total or 1
+    return {
+        **contagens,
+        "taxa_conf": contagens["confirmados"] / base * 100,
+        "risco_critico": contagens["criticos"] / base * 100,
+        # Pacientes sem agendamento (status que não contém "AGENDAMENTO")
+        "taxa_sem_agendamento": contagens["sem_agendamento"] / base * 100,
+    }
+
+
+def fragmento_kpis(risco, especialidade):
+    """Cards de KPI (clicáveis: abrem as tabelas de dados)"""
+    kpis = indicadores(risco, especialidade)
+    total = kpis["total"]
+    taxa_conf = kpis["taxa_conf"]
+    risco_critico = kpis["risco_critico"]
+    sem_agendamento = kpis["taxa_sem_agendamento"]
+    sem_agendamento_total = kpis["sem_agendamento"]
+    # Totais dos cabeçalhos das tabelas (copiados pelo carregarFragmentos)
+    totais_html = "".join(
+        f'<span class="d-none" data-total="{secao}">{formatar_numero_br(kpis[chave])}</span>'
+        for secao, chave in [
+            ("geral", "total"),
+            ("confirmados", "confirmados"),
+            ("criticos", "criticos"),
+            ("sem-agendamento", "sem_agendamento"),
+        ]
+    )
+    return f"""
+        {totais_html}
+        <!-- KPIs Clicáveis -->
+        <div class="row mb-4">
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="kpi-card" onclick="toggleDataSection('geral')" data-table="geral">
+                    <i class="fas fa-file-medical kpi-icon"></i>
+                    <div class="kpi-value">{formatar_numero_br(total)}</div>
+                    <div class="kpi-label">Solicitações Filtradas</div>
+                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="kpi-card" onclick="toggleDataSection('confirmados')" data-table="confirmados">
+                    <i class="fas fa-check-circle kpi-icon"></i>
+                    <div class="kpi-value">{formatar_numero_br(taxa_conf)}%</div>
+                    <div class="kpi-label">Taxa Confirmação</div>
+                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="kpi-card" onclick="toggleDataSection('criticos')" data-table="criticos">
+                    <i class="fas fa-exclamation-triangle kpi-icon"></i>
+                    <div class="kpi-value">{formatar_numero_br(risco_critico)}%</div>
+                    <div class="kpi-label">Risco Crítico</div>
+                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="kpi-card" style="background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%);" onclick="toggleDataSection('sem-agendamento')" data-table="sem-agendamento">
+                    <i class="fas fa-calendar-times kpi-icon"></i>
+                    <div class="kpi-value">{formatar_numero_br(sem_agendamento_total)}</div>
+                    <div class="kpi-label">Sem Agendamento ({formatar_numero_br(sem_agendamento)}%)</div>
+                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
+                </div>
+            </div>
+        </div>
+
+"""
+
+
+def fragmento_especialidade(risco, especialidade):
+    """Estatísticas e gráficos da especialidade única"""
+    especialidade_unica = _especialidade_unica(especialidade)
+    if not especialidade_unica:
+        return ""
+
+    df_esp_unica = carregar_dados(
+        ["solicitacao_risco", "is_confirmado", "is_sem_agendamento"],
+        montar_filtros(risco, especialidade),
+    )
+    total_esp = len(df_esp_unica)
+    if total_esp == 0:
+        return ""
+
+    confirmados_esp = df_esp_unica.filter(pl.col("is_confirmado")).height
+    criticos_esp = df_esp_unica.filter(
+        pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])
+    ).height
+    sem_agend_esp = df_esp_unica.filter(pl.col("is_sem_agendamento")).height
+
+    estatisticas_especialidade = {
+        "total": total_esp,
+        "confirmados": confirmados_esp,
+        "taxa_confirmacao": confirmados_esp / total_esp * 100,
+        "criticos": criticos_esp,
+        "taxa_critico": criticos_esp / total_esp * 100,
+        "sem_agendamento": sem_agend_esp,
+        "taxa_sem_agendamento": sem_agend_esp / total_esp * 100,
+    }
+    return f'''
+        <div class="especialidade-detalhada">
+            <div class="alert alert-primary" role="alert" style="background: linear-gradient(135deg, #003087 0%, #764ba2 100%); border: none; color: white;">
+                <h5 class="alert-heading"><i class="fas fa-microscope me-2"></i>Análise Detalhada: {especialidade_unica}</h5>
+                <p class="mb-0">Detalhamento completo dos dados da especialidade selecionada.</p>
+            </div>
+        
+        <!-- KPIs da Especialidade -->
+        <div class="row mb-4">
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #003087 0%, #764ba2 100%); color: white;">
+                    <i class="fas fa-list-alt" style="font-size: 2rem; margin-bottom: 10px;"></i>
+                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['total'])}</h3>
+                    <p class="mb-0">Total de Solicitações</p>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white;">
+                    <i class="fas fa-check-circle" style="font-size: 2rem; margin-bottom: 10px;"></i>
+                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['taxa_confirmacao'])}%</h3>
+                    <p class="mb-0">Taxa de Confirmação</p>
+                    <small>({formatar_numero_br(estatisticas_especialidade['confirmados'])} confirmados)</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #ffc107 0%, #ff9800 100%); color: white;">
+                    <i class="fas fa-exclamation-triangle" style="font-size: 2rem; margin-bottom: 10px;"></i>
+                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['taxa_critico'])}%</h3>
+                    <p class="mb-0">Risco Crítico</p>
+                    <small>({formatar_numero_br(estatisticas_especialidade['criticos'])} pacientes)</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #dc3545 0%, #c82333 100%); color: white;">
+                    <i class="fas fa-calendar-times" style="font-size: 2rem; margin-bottom: 10px;"></i>
+                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['sem_agendamento'])}</h3>
+                    <p class="mb-0">Sem Agendamento</p>
+                    <small>({formatar_numero_br(estatisticas_especialidade['taxa_sem_agendamento'])}%)</small>
+                </div>
+            </div>
+        </div>
+        
+        <!-- Gráficos Detalhados da Especialidade -->
+        <!-- Linha 1: Risco e Faixa Etária -->
+        <div class="row mb-4">
+            <div class="col-lg-6 mb-3">
+                <div class="chart-card">
+                    <h6 class="mb-3">Distribuição por Risco</h6>
+                    {div_grafico("esp_risco")}
+                </div>
+            </div>
+            <div class="col-lg-6 mb-3">
+                <div class="chart-card">
+                    <h6 class="mb-3">Faixa Etária</h6>
+                    {div_grafico("esp_faixa_etaria")}
+                </div>
+            </div>
+        </div>
+        
+        <!-- Linha 2: Status dos Pacientes (linha exclusiva) -->
+        <div class="row mb-4">
+            <div class="col-12">
+                <div class="chart-card">
+                    <h6 class="mb-3">Status dos Pacientes</h6>
+                    {div_grafico("esp_status")}
+                </div>
+            </div>
+        </div>
+        </div>
+'''
+
+
+def fragmento_sem_agendamento(risco, especialidade):
+    """Seção de pacientes sem agendamento (a predição vem em fragmento próprio)"""
+    kpis = indicadores(risco, especialidade)
+    sem_agendamento = kpis["taxa_sem_agendamento"]
+    sem_agendamento_total = kpis["sem_agendamento"]
+    if sem_agendamento_total == 0:
+        return ""
+    return f'''
+        <div class="alert alert-danger" role="alert">
+            <h5 class="alert-heading"><i class="fas fa-calendar-times me-2"></i>Pacientes SEM Agendamento</h5>
+            <p class="mb-0">Atenção: <strong>{formatar_numero_br(sem_agendamento_total)} pacientes ({formatar_numero_br(sem_agendamento)}%)</strong> não tiveram agendamento marcado.</p>
+        </div>
+        
+        <!-- Análise Preditiva: O que acontece se nada for feito? (fragmento próprio: não atrasa os gráficos) -->
+        <div data-fragmento="predicao">{CARREGANDO_HTML}</div>
+        
+        <div class="row mb-4">
+            <div class="col-lg-6 mb-3">
+                <div class="chart-card">
+                    <h6 class="mb-3">Sem Agendamento - Distribuição por Risco</h6>
+                    {div_grafico("sem_agendamento", "Nenhum paciente sem agendamento", "fa-chart-column")}
+                </div>
+            </div>
+            <div class="col-lg-6 mb-3">
+                <div class="chart-card">
+                    <h6 class="mb-3">Sem Agendamento - Status</h6>
+                    {div_grafico("status_sem_agendamento", "Nenhum paciente sem agendamento", "fa-chart-bar")}
+                </div>
+            </div>
+        </div>
+'''
+
+
+def fragmento_predicao(risco, especialidade):
+    """Análise preditiva (ML) dos pacientes sem agendamento"""
+    modelo = modelo_ativo()
+    df_sem_agend = scores_ml.carregar_pontuados(
+        filtros=montar_filtros(risco, especialidade) + [pl.col("is_sem_agendamento")],
+        modelo=modelo,
+    )
+    if len(df_sem_agend) == 0:
+        return ""
+    predicao_sem_agendamento = analisar_predicao_sem_agendamento(df_sem_agend, modelo)
+    return f"""
+        <div class="alert alert-warning" role="alert" style="background: linear-gradient(135deg, #003087 0%, #764ba2 100%); border: none; color: white; margin-bottom: 30px;">
+            <h5 class="alert-heading">
+                <i class="fas fa-brain me-2"></i>🤖 Análise Preditiva com Machine Learning
+            </h5>
+            <p class="mb-2">
+                <strong>Algoritmo:</strong> {predicao_sem_agendamento.get('algoritmo', 'Random Forest Classifier')} 
+                {f"({predicao_sem_agendamento.get('num_arvores', 100)} árvores de decisão)" if predicao_sem_agendamento.get('usa_ml') else ''}
+            </p>
+            <p class="mb-0">
+                <strong>Projeção:</strong> Impacto estimado se nenhum agendamento for realizado para os {formatar_numero_br(predicao_sem_agendamento['total_sem_agendamento'])} pacientes sem atendimento.
+            </p>
+        </div>
+        
+        <!-- Métricas do Modelo ML -->
+        {f'''
+        <div class="row mb-4">
+            <div class="col-12">
+                <div class="alert alert-info" role="alert">
+                    <h6><i class="fas fa-chart-line me-2"></i>Performance do Modelo de Machine Learning</h6>
+                    <div class="row">
+                        <div class="col-md-3">
+                            <strong>Acurácia:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('acuracia', 0) * 100)}%
+                        </div>
+                        <div class="col-md-3">
+                            <strong>Precisão:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('precisao', 0) * 100)}%
+                        </div>
+                        <div class="col-md-3">
+                            <strong>Recall:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('recall', 0) * 100)}%
+                        </div>
+                        <div class="col-md-3">
+                            <strong>F1-Score:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('f1_score', 0) * 100)}%
+                        </div>
+                    </div>
+                    <small class="text-muted mt-2 d-block">
+                        <i class="fas fa-info-circle me-1"></i>
+                        Modelo treinado com {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('total_treino', 0))} amostras | 
+                        Testado com {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('total_teste', 0))} amostras
+                    </small>
+                </div>
+            </div>
+        </div>
+        ''' if predicao_sem_agendamento.get('usa_ml') and 'modelo_metricas' in predicao_sem_agendamento else ''}
+        
+        
+        <!-- KPIs de Predição -->
+        <div class="row mb-4">
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%); color: white; border-left: 5px solid #c0392b;">
+                    <i class="fas fa-user-injured" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
+                    <h2 class="mb-2">{formatar_numero_br(predicao_sem_agendamento['agravamento_30_dias'])}</h2>
+                    <p class="mb-1"><strong>Agravamentos em 30 dias</strong></p>
+                    <small style="opacity: 0.8;">Baseado em {formatar_numero_br(predicao_sem_agendamento.get('alto_risco_ml', 0))} pacientes de alto risco (ML)</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #f39c12 0%, #e67e22 100%); color: white; border-left: 5px solid #d35400;">
+                    <i class="fas fa-bed" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
+                    <h2 class="mb-2">{formatar_numero_br(predicao_sem_agendamento['internacoes_projetadas'])}</h2>
+                    <p class="mb-1"><strong>Internações Projetadas</strong></p>
+                    <small style="opacity: 0.8;">30% dos agravamentos resultam em internação hospitalar</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%); color: white; border-left: 5px solid #a93226;">
+                    <i class="fas fa-dollar-sign" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
+                    <h2 class="mb-2">{formatar_moeda_br(predicao_sem_agendamento['custo_estimado_30_dias'])}</h2>
+                    <p class="mb-1"><strong>Custo Estimado (30 dias)</strong></p>
+                    <small style="opacity: 0.8;">R$ 5.000/agravamento em média</small>
+                </div>
+            </div>
+            <div class="col-lg-3 col-md-6 mb-3">
+                <div class="chart-card text-center" style="background: linear-gradient(135deg, #8e44ad 0%, #6c3483 100%); color: white; border-left: 5px solid #5b2c6f;">
+                    <i class="fas fa-chart-line" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
+                    <h2 class="mb-2">{formatar_moeda_br(predicao_sem_agendamento['custo_estimado_total'])}</h2>
+                    <p class="mb-1"><strong>Custo Total Projetado</strong></p>
+                    <small style="opacity: 0.8;">Impacto financeiro total estimado em 90 dias</small>
+                </div>
+            </div>
+        </div>
+        
+        <!-- Timeline de Agravamento -->
+        <div class="chart-card mb-4">
+            <h5 class="mb-3"><i class="fas fa-clock me-2"></i>Linha do Tempo de Agravamentos Projetados</h5>
+            <div class="row">
+                <div class="col-md-4">
+                    <div class="alert alert-danger">
+                        <h6><i class="fas fa-calendar-day me-2"></i>30 Dias</h6>
+                        <h3>{formatar_numero_br(predicao_sem_agendamento['agravamento_30_dias'])} pacientes</h3>
+                        <p class="mb-0 small">Principalmente riscos <strong>VERMELHO</strong> (80% de chance)</p>
+                    </div>
+                </div>
+                <div class="col-md-4">
+                    <div class="alert alert-warning">
+                        <h6><i class="fas fa-calendar-week me-2"></i>60 Dias</h6>
+                        <h3>{formatar_numero_br(predicao_sem_agendamento['agravamento_60_dias'])} pacientes</h3>
+                        <p class="mb-0 small">Riscos <strong>AMARELO</strong> e <strong>VERDE</strong> (20-50% de chance)</p>
+                    </div>
+                </div>
+                <div class="col-md-4">
+                    <div class="alert alert-info">
+                        <h6><i class="fas fa-calendar-alt me-2"></i>90 Dias</h6>
+                        <h3>{formatar_numero_br(predicao_sem_agendamento['agravamento_90_dias'])} pacientes</h3>
+                        <p class="mb-0 small">Riscos <strong>AZUL</strong> (5% de chance)</p>
+                    </div>
+                </div>
+            </div>
+        </div>
+        
+        <!-- Top 10 Especialidades Mais Críticas sem Agendamento -->
+        {f'''
+        <div class="chart-card mb-4">
+            <h5 class="mb-3">
+                <i class="fas fa-list-ol me-2"></i>Top 10 Especialidades Mais Críticas sem Agendamento
+                {' <span class="badge bg-primary">🤖 ML</span>' if predicao_sem_agendamento.get('usa_ml') else ''}
+            </h5>
+            <div class="table-responsive">
+                <table class="table table-hover">
+                    <thead class="table-danger">
+                        <tr>
+                            <th>#</th>
+                            <th>Especialidade</th>
+                            <th>Total sem Agendamento</th>
+                            {f'<th>Prob. Média Agravamento (ML)</th>' if predicao_sem_agendamento.get('usa_ml') else '<th>Pacientes Críticos</th>'}
+                            <th>Alto Risco ML</th>
+                            <th>Classificação</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {"".join([
+                            f'''<tr class="{'table-danger' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.6 else 'table-warning' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.4 else ''}">
+                                <td><strong>{idx + 1}</strong></td>
+                                <td><strong>{esp['procedimento_especialidade']}</strong></td>
+                                <td>{formatar_numero_br(esp['total'])}</td>
+                                <td>
+                                    {f"{formatar_numero_br(esp.get('prob_media', 0) * 100)}%" if predicao_sem_agendamento.get('usa_ml') else f"{formatar_numero_br(esp.get('criticos', 0))}"}
+                                </td>
+                                <td>{formatar_numero_br(esp.get('alto_risco_count', esp.get('criticos', 0)))}</td>
+                                <td>
+                                    {('<span class="badge bg-danger">🔴 CRÍTICO</span>' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.6 else 
+                                     '<span class="badge bg-warning text-dark">🟡 ALTO</span>' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.4 else 
+                                     '<span class="badge bg-info">🟢 MÉDIO</span>')}
+                                </td>
+                            </tr>'''
+                            for idx, esp in enumerate(predicao_sem_agendamento.get('especialidades_criticas_ml', predicao_sem_agendamento.get('especialidades_criticas', [])))
+                        ])}
+                    </tbody>
+                </table>
+            </div>
+            {f'''<small class="text-muted">
+                <i class="fas fa-lightbulb me-1"></i>
+                <strong>ML:</strong> Probabilidades calculadas pelo modelo Random Forest considerando múltiplas variáveis (risco, tempo espera, idade, especialidade).
+            </small>''' if predicao_sem_agendamento.get('usa_ml') else ''}
+        </div>
+        ''' if len(predicao_sem_agendamento.get('especialidades_criticas_ml', predicao_sem_agendamento.get('especialidades_criticas', []))) > 0 else ''}
+        
+        <!-- Informações sobre o Modelo -->
+        <div class="alert alert-light border" role="alert">
+            {f'''
+            <h6><i class="fas fa-brain me-2"></i>Como Funciona o Machine Learning</h6>
+            <div class="row">
+                <div class="col-md-6">
+                    <h6 class="text-primary mt-2">🎯 Algoritmo</h6>
+                    <ul class="small mb-3">
+                        <li><strong>{predicao_sem_agendamento['algoritmo']}</strong> com {predicao_sem_agendamento['num_arvores']} árvores de decisão</li>
+                        <li>Treinado com {formatar_numero_br(predicao_sem_agendamento['modelo_metricas']['total_treino'])} amostras</li>
+                        <li>Validado com {formatar_numero_br(predicao_sem_agendamento['modelo_metricas']['total_teste'])} amostras</li>
+                        <li>Acurácia: {formatar_numero_br(predicao_sem_agendamento['modelo_metricas']['acuracia'] * 100)}%</li>
+                    </ul>
+                    
+                    <h6 class="text-primary">🔍 Features Utilizadas</h6>
+                    <ul class="small mb-0">
+                        <li><strong>Risco do Paciente:</strong> Vermelho, Amarelo, Verde, Azul</li>
+                        <li><strong>Tempo de Espera:</strong> Dias aguardando atendimento</li>
+                        <li><strong>Idade:</strong> Faixa etária do paciente</li>
+                        <li><strong>Especialidade:</strong> Tipo de procedimento solicitado</li>
+                        <li><strong>Status Crítico:</strong> Indicadores de urgência</li>
+                    </ul>
+                </div>
+                <div class="col-md-6">
+                    <h6 class="text-success mt-2">✅ Vantagens do ML</h6>
+                    <ul class="small mb-3">
+                        <li>Aprende padrões complexos dos dados históricos</li>
+                        <li>Predições personalizadas para cada paciente</li>
+                        <li>Considera múltiplas variáveis simultaneamente</li>
+                        <li>Se adapta automaticamente a novos dados</li>
+                    </ul>
+                    
+                    <h6 class="text-info">💰 Premissas Financeiras</h6>
+                    <ul class="small mb-0">
+                        <li><strong>Custo por Agravamento:</strong> R$ 5.000,00 (média hospitalar)</li>
+                        <li><strong>Taxa de Internação:</strong> 30% dos casos graves</li>
+                        <li><strong>Classificação de Risco:</strong>
+                            <ul>
+                                <li>Alto: Probabilidade > 70%</li>
+                                <li>Médio: Probabilidade 40-70%</li>
+                                <li>Baixo: Probabilidade < 40%</li>
+                            </ul>
+                        </li>
+                    </ul>
+                </div>
+            </div>
+            ''' if predicao_sem_agendamento.get('usa_ml') else '''
+            <h6><i class="fas fa-info-circle me-2"></i>Premissas do Modelo Baseado em Regras</h6>
+            <ul class="mb-0 small">
+                <li><strong>Risco VERMELHO:</strong> 80% de chance de agravamento em 30 dias</li>
+                <li><strong>Risco AMARELO:</strong> 50% de chance de agravamento em 60 dias</li>
+                <li><strong>Risco VERDE:</strong> 20% de chance de agravamento em 90 dias</li>
+                <li><strong>Risco AZUL:</strong> 5% de chance de agravamento em 120 dias</li>
+                <li><strong>Taxa de Internação:</strong> 30% dos agravamentos resultam em internação hospitalar</li>
+                <li><strong>Custo Médio:</strong> R$ 5.000,00 por agravamento (baseado em custos médios hospitalares)</li>
+            </ul>
+            '''}
+        </div>
+"""
+
+
+FRAGMENTOS = {
+    "kpis": fragmento_kpis,
+    "especialidade": fragmento_especialidade,
+    "sem-agendamento": fragmento_sem_agendamento,
+    "predicao": fragmento_predicao,
+}
+
+
 # Autenticação
 async def get_current_user(request: Request):
     username = request.cookies.get("session_user")
@@ -323,410 +1012,28 @@ async def logout():
 
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(
+@cache_dashboard.em_cache("dashboard", ignorar=())
+@no_pool()
+def dashboard(
     risco: Optional[List[str]] = Query(None),
     especialidade: Optional[List[str]] = Query(None),
     current_user: str = Depends(get_current_user),
 ):
     try:
-        # Carregar dados
-        df_completo = carregar_dados()
-        df_filtrado = df_completo
-
-        # Aplicar filtros
-        if risco:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_risco").is_in(risco))
-        if especialidade:
-            df_filtrado = df_filtrado.filter(
-                pl.col("procedimento_especialidade").is_in(especialidade)
-            )
-
-        # Métricas
-        total = len(df_filtrado)
-        total_sistema = len(df_completo)
-
-        # KPIs
-        taxa_conf = 0
-        risco_critico = 0
-        sem_agendamento = 0
-        sem_agendamento_total = 0
-
-        if total > 0:
-            confirmados = df_filtrado.filter(
-                pl.col("solicitacao_status").str.contains("CONFIRMADO")
-            ).height
-            taxa_conf = confirmados / total * 100
-
-            criticos = df_filtrado.filter(
-                pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])
-            ).height
-            risco_critico = criticos / total * 100
-
-            # Pacientes sem agendamento (status que não contém "AGENDAMENTO")
-            nao_agendados = df_filtrado.filter(
-                ~pl.col("solicitacao_status").str.contains("AGENDAMENTO")
-            ).height
-            sem_agendamento = nao_agendados / total * 100
-            sem_agendamento_total = nao_agendados
-
-        # Gráficos
-        grafico_risco_html = ""
-        grafico_especialidade_html = ""
-        grafico_sem_agendamento_html = ""
-        grafico_status_sem_agendamento_html = ""
-
-        # Área de detalhamento de especialidade única
-        especialidade_unica = None
-        grafico_esp_risco_html = ""
-        grafico_esp_status_html = ""
-        grafico_esp_faixa_etaria_html = ""
-        estatisticas_especialidade = None
-
-        # Detectar se apenas 1 especialidade está selecionada
-        if especialidade and len(especialidade) == 1:
-            especialidade_unica = especialidade[0]
-
-        if total > 0:
-            # Gráfico 1: Distribuição por Risco (PIZZA)
-            # Mapeamento correto de cores por risco
-            color_map = {
-                "AZUL": "#007bff",  # Azul
-                "VERDE": "#28a745",  # Verde
-                "AMARELO": "#ffc107",  # Amarelo
-                "VERMELHO": "#dc3545",  # Vermelho
-            }
-
-            # Ordem FIXA de criticidade: Vermelho > Amarelo > Verde > Azul
-            riscos_ordem_fixa = ["VERMELHO", "AMARELO", "VERDE", "AZUL"]
-            ordem_map = {risco: idx for idx, risco in enumerate(riscos_ordem_fixa)}
-
-            df_risco = df_filtrado.group_by("solicitacao_risco").count()
-            if len(df_risco) > 0:
-                # Adicionar coluna de ordem para manter a sequência de criticidade
-                df_risco_ordenado = df_risco.with_columns(
-                    [pl.col("solicitacao_risco").replace(ordem_map).alias("ordem")]
-                ).sort("ordem")
-
-                # Pegar apenas os riscos que EXISTEM nos dados (count > 0)
-                riscos = df_risco_ordenado["solicitacao_risco"].to_list()
-                valores = df_risco_ordenado["count"].to_list()
-                cores = [color_map[r] for r in riscos]
-
-                # Gráfico de Pizza (apenas com riscos que têm dados)
-                fig1 = go.Figure(
-                    data=[
-                        go.Pie(
-                            labels=riscos,
-                            values=valores,
-                            marker=dict(colors=cores),
-                            textinfo="value+percent",
-                            texttemplate=[formatar_numero_br(val) + "<br>(" + f"{val/sum(valores)*100:.1f}".replace(".", ",") + "%)" for val in valores],
-                            hole=0.3,  # Donut chart
-                            sort=False,  # Não ordenar automaticamente, manter ordem dos dados
-                        )
-                    ]
-                )
-                fig1.update_layout(
-                    title="Distribuição por Nível de Risco",
-                    height=400,
-                    showlegend=True,
-                    legend=dict(
-                        orientation="v",
-                        yanchor="middle",
-                        y=0.5,
-                        xanchor="right",
-                        x=-0.05,  # Posicionar à esquerda
-                        traceorder="normal",  # Manter ordem da série de dados
-                    ),
-                    margin=dict(l=150),  # Margem esquerda para acomodar a legenda
-                )
-                grafico_risco_html = fig1.to_html(
-                    full_html=False, include_plotlyjs="cdn"
-                )
-
-            # Gráfico 2: Especialidades (limite de 10 principais)
-            df_esp = (
-                df_filtrado.group_by("procedimento_especialidade")
-                .count()
-                .sort("count", descending=True)
-                .head(10)
-            )
-            if len(df_esp) > 0:
-                num_esp = len(df_esp)
-                # Título dinâmico que mostra a quantidade real de especialidades no gráfico
-                if num_esp == 1:
-                    titulo_esp = "Especialidades (1 especialidade)"
-                else:
-                    titulo_esp = f"Especialidades ({num_esp} especialidades)"
-
-                fig2 = go.Figure(
-                    data=[
-                        go.Bar(
-                            y=df_esp["procedimento_especialidade"].to_list(),
-                            x=df_esp["count"].to_list(),
-                            orientation="h",
-                            marker=dict(color="#003087"),
-                        )
-                    ]
-                )
-                fig2.update_layout(
-                    title=titulo_esp,
-                    height=450,
-                    xaxis_title="Número de Solicitações",
-                    yaxis_title="Especialidade",
-                )
-                grafico_especialidade_html = fig2.to_html(
-                    full_html=False, include_plotlyjs="cdn"
-                )
-
-            # Gráfico 3: Pacientes SEM Agendamento - Distribuição por Risco
-            df_sem_agend = df_filtrado.filter(
-                ~pl.col("solicitacao_status").str.contains("AGENDAMENTO")
-            )
-
-            # Análise Preditiva
-            predicao_sem_agendamento = (
-                analisar_predicao_sem_agendamento(df_sem_agend)
-                if len(df_sem_agend) > 0
-                else None
-            )
-
-            if len(df_sem_agend) > 0:
-                df_sem_agend_risco = df_sem_agend.group_by("solicitacao_risco").count()
-
-                # Adicionar coluna de ordem para manter a sequência de criticidade
-                df_sem_agend_ordenado = df_sem_agend_risco.with_columns(
-                    [pl.col("solicitacao_risco").replace(ordem_map).alias("ordem")]
-                ).sort("ordem")
-
-                # Pegar apenas os riscos que EXISTEM nos dados (count > 0)
-                riscos_sem = df_sem_agend_ordenado["solicitacao_risco"].to_list()
-                valores_sem = df_sem_agend_ordenado["count"].to_list()
-                cores_sem = [color_map[r] for r in riscos_sem]
-
-                fig3 = go.Figure(
-                    data=[
-                        go.Bar(
-                            x=riscos_sem,
-                            y=valores_sem,
-                            marker=dict(color=cores_sem),
-                            text=valores_sem,
-                            textposition="auto",
-                            texttemplate=[formatar_numero_br(val) for val in valores_sem],
-                        )
-                    ]
-                )
-                fig3.update_layout(
-                    title=f"Sem Agendamento por Risco ({formatar_numero_br(len(df_sem_agend))} pacientes)",
-                    height=400,
-                    xaxis_title="Nível de Risco",
-                    yaxis_title="Quantidade de Pacientes",
-                    showlegend=False,
-                )
-                grafico_sem_agendamento_html = fig3.to_html(
-                    full_html=False, include_plotlyjs="cdn"
-                )
-
-            # Gráfico 4: Status de Pacientes SEM Agendamento
-            if len(df_sem_agend) > 0:
-                df_status_sem = (
-                    df_sem_agend.group_by("solicitacao_status")
-                    .count()
-                    .sort("count", descending=True)
-                    .head(8)
-                )
-
-                fig4 = go.Figure(
-                    data=[
-                        go.Bar(
-                            x=df_status_sem["solicitacao_status"].to_list(),
-                            y=df_status_sem["count"].to_list(),
-                            marker=dict(
-                                color=df_status_sem["count"].to_list(),
-                                colorscale="Reds",
-                                showscale=False,
-                            ),
-                            text=df_status_sem["count"].to_list(),
-                            textposition="auto",
-                            texttemplate=[formatar_numero_br(val) for val in df_status_sem["count"].to_list()],
-                        )
-                    ]
-                )
-                fig4.update_layout(
-                    title="Top 8 Status - Pacientes SEM Agendamento",
-                    height=450,
-                    xaxis_title="Status",
-                    yaxis_title="Número de Pacientes",
-                    xaxis={"tickangle": -45},
-                )
-                grafico_status_sem_agendamento_html = fig4.to_html(
-                    full_html=False, include_plotlyjs="cdn"
-                )
-
-            # Gráficos detalhados para ESPECIALIDADE ÚNICA
-            if especialidade_unica and total > 0:
-                # Estatísticas da especialidade
-                df_esp_unica = df_filtrado.filter(
-                    pl.col("procedimento_especialidade") == especialidade_unica
-                )
-                total_esp = len(df_esp_unica)
-
-                if total_esp > 0:
-                    # Estatísticas
-                    confirmados_esp = df_esp_unica.filter(
-                        pl.col("solicitacao_status").str.contains("CONFIRMADO")
-                    ).height
-                    taxa_conf_esp = (
-                        (confirmados_esp / total_esp * 100) if total_esp > 0 else 0
-                    )
-
-                    criticos_esp = df_esp_unica.filter(
-                        pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])
-                    ).height
-                    taxa_critico_esp = (
-                        (criticos_esp / total_esp * 100) if total_esp > 0 else 0
-                    )
-
-                    sem_agend_esp = df_esp_unica.filter(
-                        ~pl.col("solicitacao_status").str.contains("AGENDAMENTO")
-                    ).height
-                    taxa_sem_agend_esp = (
-                        (sem_agend_esp / total_esp * 100) if total_esp > 0 else 0
-                    )
-
-                    estatisticas_especialidade = {
-                        "total": total_esp,
-                        "confirmados": confirmados_esp,
-                        "taxa_confirmacao": taxa_conf_esp,
-                        "criticos": criticos_esp,
-                        "taxa_critico": taxa_critico_esp,
-                        "sem_agendamento": sem_agend_esp,
-                        "taxa_sem_agendamento": taxa_sem_agend_esp,
-                    }
-
-                    # Gráfico 1: Distribuição por Risco (especialidade única) - PIZZA
-                    df_esp_risco = df_esp_unica.group_by("solicitacao_risco").count()
-
-                    # Adicionar coluna de ordem para manter a sequência de criticidade
-                    df_esp_risco_ordenado = df_esp_risco.with_columns(
-                        [pl.col("solicitacao_risco").replace(ordem_map).alias("ordem")]
-                    ).sort("ordem")
-
-                    # Pegar apenas os riscos que EXISTEM nos dados (count > 0)
-                    riscos_esp = df_esp_risco_ordenado["solicitacao_risco"].to_list()
-                    valores_esp = df_esp_risco_ordenado["count"].to_list()
-                    cores_esp = [color_map[r] for r in riscos_esp]
-
-                    # Gráfico de Pizza (apenas com riscos que têm dados)
-                    fig_esp1 = go.Figure(
-                        data=[
-                            go.Pie(
-                                labels=riscos_esp,
-                                values=valores_esp,
-                                marker=dict(colors=cores_esp),
-                                textinfo="value+percent",
-                                texttemplate=[formatar_numero_br(val) + "<br>(" + f"{val/sum(valores_esp)*100:.1f}".replace(".", ",") + "%)" for val in valores_esp],
-                                hole=0.3,  # Donut chart
-                                sort=False,  # Não ordenar automaticamente, manter ordem dos dados
-                            )
-                        ]
-                    )
-                    fig_esp1.update_layout(
-                        title=f"Distribuição por Risco - {especialidade_unica}",
-                        height=350,
-                        showlegend=True,
-                        legend=dict(
-                            orientation="v",
-                            yanchor="middle",
-                            y=0.5,
-                            xanchor="right",
-                            x=-0.05,  # Posicionar à esquerda
-                            traceorder="normal",  # Manter ordem da série de dados
-                        ),
-                        margin=dict(l=150),  # Margem esquerda para acomodar a legenda
-                    )
-                    grafico_esp_risco_html = fig_esp1.to_html(
-                        full_html=False, include_plotlyjs="cdn"
-                    )
-
-                    # Gráfico 2: Top 10 Status (especialidade única)
-                    df_esp_status = (
-                        df_esp_unica.group_by("solicitacao_status")
-                        .count()
-                        .sort("count", descending=True)
-                        .head(10)
-                    )
-
-                    if len(df_esp_status) > 0:
-                        fig_esp2 = go.Figure(
-                            data=[
-                                go.Bar(
-                                    x=df_esp_status["solicitacao_status"].to_list(),
-                                    y=df_esp_status["count"].to_list(),
-                                    marker=dict(
-                                        color=df_esp_status["count"].to_list(),
-                                        colorscale="Viridis",
-                                        showscale=False,
-                                    ),
-                                    text=df_esp_status["count"].to_list(),
-                                    textposition="auto",
-                                    texttemplate=[formatar_numero_br(val) for val in df_esp_status["count"].to_list()],
-                                )
-                            ]
-                        )
-                        fig_esp2.update_layout(
-                            title=f"Top 10 Status - {especialidade_unica}",
-                            height=450,
-                            xaxis_title="Status",
-                            yaxis_title="Quantidade de Pacientes",
-                            xaxis={"tickangle": -45},
-                            margin=dict(
-                                b=120
-                            ),  # Margem inferior para labels rotacionados
-                        )
-                        grafico_esp_status_html = fig_esp2.to_html(
-                            full_html=False, include_plotlyjs="cdn"
-                        )
-
-                    # Gráfico 3: Distribuição por Faixa Etária (especialidade única)
-                    if "paciente_faixa_etaria" in df_esp_unica.columns:
-                        df_esp_idade = (
-                            df_esp_unica.group_by("paciente_faixa_etaria")
-                            .count()
-                            .sort("count", descending=True)
-                            .head(10)
-                        )
-
-                        if len(df_esp_idade) > 0:
-                            fig_esp3 = go.Figure(
-                                data=[
-                                    go.Bar(
-                                        x=df_esp_idade[
-                                            "paciente_faixa_etaria"
-                                        ].to_list(),
-                                        y=df_esp_idade["count"].to_list(),
-                                        marker=dict(color="#17a2b8"),
-                                        text=df_esp_idade["count"].to_list(),
-                                        textposition="auto",
-                                        texttemplate=[formatar_numero_br(val) for val in df_esp_idade["count"].to_list()],
-                                    )
-                                ]
-                            )
-                            fig_esp3.update_layout(
-                                title=f"Distribuição por Faixa Etária - {especialidade_unica}",
-                                height=350,
-                                xaxis_title="Faixa Etária",
-                                yaxis_title="Quantidade de Pacientes",
-                            )
-                            grafico_esp_faixa_etaria_html = fig_esp3.to_html(
-                                full_html=False, include_plotlyjs="cdn"
-                            )
+        # Página-esqueleto: KPIs, gráficos, predição e tabelas chegam em
+        # fragmentos que o navegador busca em paralelo (ver FRAGMENTOS).
+        # Roda no pool como eles: numa carga fria ou recarga, a leitura dos
+        # dados não trava o event loop (nem os fragmentos desta página)
+        especialidade_unica = _especialidade_unica(especialidade)
 
         # Opções de filtro
         # Ordem FIXA dos riscos (sempre a mesma ordem)
         riscos_disponiveis = ["VERMELHO", "AMARELO", "VERDE", "AZUL"]
         especialidades_disponiveis = sorted(
-            df_completo["procedimento_especialidade"].unique().drop_nulls().to_list()
+            carregar_dados(["procedimento_especialidade"])["procedimento_especialidade"]
+            .unique()
+            .drop_nulls()
+            .to_list()
         )
 
         # Checkboxes com ordem fixa de risco e indicadores de cor
@@ -756,146 +1063,16 @@ async def dashboard(
                 f'<label class="form-check-label" for="e_{i}">{e}</label></div>'
                 for i, e in enumerate(especialidades_disponiveis)
             ]
-        )
-
-        # Preparar dados para tabelas (TODOS os registros em JSON para paginação)
-        import json
-
-        dados_geral = []
-        dados_confirmados = []
-        dados_criticos = []
-        dados_sem_agendamento = []
-
-        total_geral = 0
-        total_confirmados = 0
-        total_criticos = 0
-        total_sem_agendamento = 0
-
-        if not df_filtrado.is_empty():
-            colunas_exibir = [
-                "solicitacao_id",
-                "paciente_faixa_etaria",
-                "solicitacao_risco",
-                "solicitacao_status",
-                "procedimento_especialidade",
-                "data_solicitacao",
-            ]
-            colunas_disponiveis = [
-                c for c in colunas_exibir if c in df_filtrado.columns
-            ]
-
-            # Função para converter datas para string - solução robusta
-            def preparar_dados_json(df):
-                import datetime
-
-                # Converter TODAS as colunas de data/datetime para string no Polars
-                for col in df.columns:
-                    dtype = df[col].dtype
-                    if dtype in [pl.Date, pl.Datetime, pl.Time]:
-                        df = df.with_columns(pl.col(col).cast(pl.Utf8).alias(col))
-
-                # Converter para pandas (lida melhor com tipos) e depois para dict
-                df_pandas = df.to_pandas()
-
-                # Converter colunas datetime do pandas para string
-                for col in df_pandas.columns:
-                    if df_pandas[col].dtype == "object":
-                        df_pandas[col] = df_pandas[col].apply(
-                            lambda x: (
-                                str(x)
-                                if isinstance(
-                                    x, (datetime.datetime, datetime.date, datetime.time)
-                                )
-                                else x
-                            )
-                        )
-
-                # Converter para lista de dicionários
-                dados = df_pandas.to_dict("records")
-
-                # Última verificação: garantir que TODOS os valores são serializáveis
-                for row in dados:
-                    for key, value in list(row.items()):
-                        if isinstance(
-                            value, (datetime.datetime, datetime.date, datetime.time)
-                        ):
-                            row[key] = str(value)
-                        elif hasattr(value, "__dict__") and not isinstance(
-                            value, (str, int, float, bool, type(None))
-                        ):
-                            row[key] = str(value)
-
-                return dados
-
-            # Limitar dados para performance (máximo 5000 registros por tabela)
-            LIMITE_REGISTROS = 5000
-
-            # Dados gerais - Limitados para performance
-            df_temp = df_filtrado.select(colunas_disponiveis)
-            total_geral = len(df_temp)
-            dados_geral = preparar_dados_json(df_temp.head(LIMITE_REGISTROS))
-
-            # Confirmados - Limitados para performance
-            if confirmados > 0:
-                df_confirmados_temp = df_filtrado.filter(
-                    pl.col("solicitacao_status").str.contains("CONFIRMADO")
-                ).select(colunas_disponiveis)
-                total_confirmados = len(df_confirmados_temp)
-                dados_confirmados = preparar_dados_json(
-                    df_confirmados_temp.head(LIMITE_REGISTROS)
-                )
-
-            # Risco Crítico - Limitados para performance
-            if criticos > 0:
-                df_criticos_temp = df_filtrado.filter(
-                    pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])
-                ).select(colunas_disponiveis)
-                total_criticos = len(df_criticos_temp)
-                dados_criticos = preparar_dados_json(
-                    df_criticos_temp.head(LIMITE_REGISTROS)
-                )
-
-            # Sem Agendamento - Limitados para performance
-            if nao_agendados > 0:
-                df_sem_agend_temp = df_filtrado.filter(
-                    ~pl.col("solicitacao_status").str.contains("AGENDAMENTO")
-                ).select(colunas_disponiveis)
-                total_sem_agendamento = len(df_sem_agend_temp)
-                dados_sem_agendamento = preparar_dados_json(
-                    df_sem_agend_temp.head(LIMITE_REGISTROS)
-                )
-
-        # Converter para JSON (escape para JavaScript) com tratamento de erro
-        try:
-            dados_geral_json = json.dumps(dados_geral, default=str)
-            dados_confirmados_json = json.dumps(dados_confirmados, default=str)
-            dados_criticos_json = json.dumps(dados_criticos, default=str)
-            dados_sem_agendamento_json = json.dumps(dados_sem_agendamento, default=str)
-        except Exception as e:
-            print(f"ERRO ao serializar JSON: {e}")
-            # Fallback: usar default=str para converter qualquer objeto não serializável
-            dados_geral_json = json.dumps(dados_geral, default=str)
-            dados_confirmados_json = json.dumps(dados_confirmados, default=str)
-            dados_criticos_json = json.dumps(dados_criticos, default=str)
-            dados_sem_agendamento_json = json.dumps(dados_sem_agendamento, default=str)
-
-        # Nomes das colunas para o cabeçalho
-        colunas_nomes = {
-            "solicitacao_id": "ID Solicitação",
-            "paciente_faixa_etaria": "Faixa Etária",
-            "solicitacao_risco": "Risco",
-            "solicitacao_status": "Status",
-            "procedimento_especialidade": "Especialidade",
-            "data_solicitacao": "Data Solicitação",
-        }
-
-        if not df_filtrado.is_empty():
-            colunas_disponiveis_nomes = [
-                colunas_nomes.get(c, c) for c in colunas_disponiveis
-            ]
-        else:
-            colunas_disponiveis = []
-            colunas_disponiveis_nomes = []
+        )
+
+        # Tabelas de dados: só os totais vão na página; as linhas são
+        # buscadas sob demanda em /api/tabela/{secao}, uma página por vez
+        # (aqui bastam os nomes das colunas do snapshot publicado)
+        colunas_trabalho = snapshot_atual()[1].columns
+        colunas_disponiveis = [c for c in COLUNAS_TABELA if c in colunas_trabalho]
+        colunas_disponiveis_nomes = [
+            NOMES_COLUNAS.get(c, c) for c in colunas_disponiveis
+        ]
 
         # HTML
         return HTMLResponse(
@@ -1142,422 +1319,83 @@ async def dashboard(
             </span>
             <div>
                 <span class="me-3">
-                    <i class="fas fa-user"></i> {current_user}
-                </span>
-                <a href="/logout" class="btn btn-sm btn-outline-danger">
-                    <i class="fas fa-sign-out-alt"></i> Sair
-                </a>
-            </div>
-        </div>
-    </nav>
-
-    <div class="main-container">
-        <!-- KPIs Clicáveis -->
-        <div class="row mb-4">
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="kpi-card" onclick="toggleDataSection('geral')" data-table="geral">
-                    <i class="fas fa-file-medical kpi-icon"></i>
-                    <div class="kpi-value">{formatar_numero_br(total)}</div>
-                    <div class="kpi-label">Solicitações Filtradas</div>
-                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="kpi-card" onclick="toggleDataSection('confirmados')" data-table="confirmados">
-                    <i class="fas fa-check-circle kpi-icon"></i>
-                    <div class="kpi-value">{formatar_numero_br(taxa_conf)}%</div>
-                    <div class="kpi-label">Taxa Confirmação</div>
-                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="kpi-card" onclick="toggleDataSection('criticos')" data-table="criticos">
-                    <i class="fas fa-exclamation-triangle kpi-icon"></i>
-                    <div class="kpi-value">{formatar_numero_br(risco_critico)}%</div>
-                    <div class="kpi-label">Risco Crítico</div>
-                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="kpi-card" style="background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%);" onclick="toggleDataSection('sem-agendamento')" data-table="sem-agendamento">
-                    <i class="fas fa-calendar-times kpi-icon"></i>
-                    <div class="kpi-value">{formatar_numero_br(sem_agendamento_total)}</div>
-                    <div class="kpi-label">Sem Agendamento ({formatar_numero_br(sem_agendamento)}%)</div>
-                    <small class="text-white-50 mt-2 d-block">Clique para ver dados</small>
-                </div>
-            </div>
-        </div>
-
-        <!-- Filtros -->
-        <div class="filter-card">
-            <h5><i class="fas fa-filter"></i> Filtros</h5>
-            <div class="alert alert-info" style="padding: 10px; font-size: 0.9rem; margin-bottom: 15px;">
-                <i class="fas fa-lightbulb me-2"></i>
-                <strong>Dica:</strong> Selecione apenas <strong>1 especialidade</strong> para ver uma análise detalhada completa com gráficos e estatísticas específicas!
-            </div>
-            <form method="get" action="/dashboard">
-                <div class="row">
-                    <div class="col-md-6">
-                        <label class="form-label fw-bold">Nível de Risco:</label>
-                        <div class="filter-section">
-                            <div class="form-check mb-2" style="background: #e3f2fd; padding: 8px; border-radius: 5px; border-left: 3px solid #2196f3;">
-                                <input class="form-check-input" type="checkbox" id="selecionar-todos-riscos" onchange="toggleTodosRiscos(this)" checked>
-                                <label class="form-check-label fw-bold" for="selecionar-todos-riscos" style="color: #1976d2;">
-                                    <i class="fas fa-check-double"></i> Selecionar Todos
-                                </label>
-                            </div>
-                            {riscos_html}
-                        </div>
-                    </div>
-                    <div class="col-md-6">
-                        <label class="form-label fw-bold">Especialidade:</label>
-                        <div class="filter-section">
-                            <div class="form-check mb-2" style="background: #e8f5e9; padding: 8px; border-radius: 5px; border-left: 3px solid #4caf50;">
-                                <input class="form-check-input" type="checkbox" id="selecionar-todas-especialidades" onchange="toggleTodasEspecialidades(this)" checked>
-                                <label class="form-check-label fw-bold" for="selecionar-todas-especialidades" style="color: #2e7d32;">
-                                    <i class="fas fa-check-double"></i> Selecionar Todas
-                                </label>
-                            </div>
-                            {especialidades_html}
-                        </div>
-                    </div>
-                </div>
-                <div class="text-center mt-3">
-                    <button type="submit" class="btn btn-primary btn-filtrar text-white">
-                        <i class="fas fa-search"></i> Aplicar Filtros
-                    </button>
-                </div>
-            </form>
-        </div>
-
-        <!-- Gráficos Principais -->
-        <h5 class="mb-3"><i class="fas fa-chart-column me-2"></i>Visão Geral</h5>
-        <div class="row mb-4">
-            <div class="col-lg-6 mb-3">
-                <div class="chart-card">
-                    <h6 class="mb-3">Distribuição por Risco</h6>
-                    {grafico_risco_html if grafico_risco_html else '<div class="text-center text-muted p-5"><i class="fas fa-chart-column fa-3x mb-3"></i><p>Nenhum dado disponível</p></div>'}
-                </div>
-            </div>
-            <div class="col-lg-6 mb-3">
-                <div class="chart-card">
-                    <h6 class="mb-3">Especialidades</h6>
-                    {grafico_especialidade_html if grafico_especialidade_html else '<div class="text-center text-muted p-5"><i class="fas fa-chart-bar fa-3x mb-3"></i><p>Nenhum dado disponível</p></div>'}
-                </div>
-            </div>
-        </div>
-
-        <!-- Seção de Detalhamento de Especialidade Única -->
-        {f'''
-        <div class="especialidade-detalhada">
-            <div class="alert alert-primary" role="alert" style="background: linear-gradient(135deg, #003087 0%, #764ba2 100%); border: none; color: white;">
-                <h5 class="alert-heading"><i class="fas fa-microscope me-2"></i>Análise Detalhada: {especialidade_unica}</h5>
-                <p class="mb-0">Detalhamento completo dos dados da especialidade selecionada.</p>
-            </div>
-        
-        <!-- KPIs da Especialidade -->
-        <div class="row mb-4">
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #003087 0%, #764ba2 100%); color: white;">
-                    <i class="fas fa-list-alt" style="font-size: 2rem; margin-bottom: 10px;"></i>
-                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['total'])}</h3>
-                    <p class="mb-0">Total de Solicitações</p>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white;">
-                    <i class="fas fa-check-circle" style="font-size: 2rem; margin-bottom: 10px;"></i>
-                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['taxa_confirmacao'])}%</h3>
-                    <p class="mb-0">Taxa de Confirmação</p>
-                    <small>({formatar_numero_br(estatisticas_especialidade['confirmados'])} confirmados)</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #ffc107 0%, #ff9800 100%); color: white;">
-                    <i class="fas fa-exclamation-triangle" style="font-size: 2rem; margin-bottom: 10px;"></i>
-                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['taxa_critico'])}%</h3>
-                    <p class="mb-0">Risco Crítico</p>
-                    <small>({formatar_numero_br(estatisticas_especialidade['criticos'])} pacientes)</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #dc3545 0%, #c82333 100%); color: white;">
-                    <i class="fas fa-calendar-times" style="font-size: 2rem; margin-bottom: 10px;"></i>
-                    <h3 class="mb-2">{formatar_numero_br(estatisticas_especialidade['sem_agendamento'])}</h3>
-                    <p class="mb-0">Sem Agendamento</p>
-                    <small>({formatar_numero_br(estatisticas_especialidade['taxa_sem_agendamento'])}%)</small>
-                </div>
-            </div>
-        </div>
-        
-        <!-- Gráficos Detalhados da Especialidade -->
-        <!-- Linha 1: Risco e Faixa Etária -->
-        <div class="row mb-4">
-            <div class="col-lg-6 mb-3">
-                <div class="chart-card">
-                    <h6 class="mb-3">Distribuição por Risco</h6>
-                    {grafico_esp_risco_html if grafico_esp_risco_html else '<div class="text-center text-muted p-5"><p>Nenhum dado disponível</p></div>'}
-                </div>
-            </div>
-            <div class="col-lg-6 mb-3">
-                <div class="chart-card">
-                    <h6 class="mb-3">Faixa Etária</h6>
-                    {grafico_esp_faixa_etaria_html if grafico_esp_faixa_etaria_html else '<div class="text-center text-muted p-5"><p>Nenhum dado disponível</p></div>'}
-                </div>
-            </div>
-        </div>
-        
-        <!-- Linha 2: Status dos Pacientes (linha exclusiva) -->
-        <div class="row mb-4">
-            <div class="col-12">
-                <div class="chart-card">
-                    <h6 class="mb-3">Status dos Pacientes</h6>
-                    {grafico_esp_status_html if grafico_esp_status_html else '<div class="text-center text-muted p-5"><p>Nenhum dado disponível</p></div>'}
-                </div>
-            </div>
-        </div>
-        </div>
-        ''' if especialidade_unica and estatisticas_especialidade else ''}
-
-        <!-- Seção de Pacientes SEM Agendamento -->
-        {f'''
-        <div class="alert alert-danger" role="alert">
-            <h5 class="alert-heading"><i class="fas fa-calendar-times me-2"></i>Pacientes SEM Agendamento</h5>
-            <p class="mb-0">Atenção: <strong>{formatar_numero_br(sem_agendamento_total)} pacientes ({formatar_numero_br(sem_agendamento)}%)</strong> não tiveram agendamento marcado.</p>
-        </div>
-        
-        <!-- Análise Preditiva: O que acontece se nada for feito? -->
-        {f"""
-        <div class="alert alert-warning" role="alert" style="background: linear-gradient(135deg, #003087 0%, #764ba2 100%); border: none; color: white; margin-bottom: 30px;">
-            <h5 class="alert-heading">
-                <i class="fas fa-brain me-2"></i>🤖 Análise Preditiva com Machine Learning
-            </h5>
-            <p class="mb-2">
-                <strong>Algoritmo:</strong> {predicao_sem_agendamento.get('algoritmo', 'Random Forest Classifier')} 
-                {f"({predicao_sem_agendamento.get('num_arvores', 100)} árvores de decisão)" if predicao_sem_agendamento.get('usa_ml') else ''}
-            </p>
-            <p class="mb-0">
-                <strong>Projeção:</strong> Impacto estimado se nenhum agendamento for realizado para os {formatar_numero_br(predicao_sem_agendamento['total_sem_agendamento'])} pacientes sem atendimento.
-            </p>
-        </div>
-        
-        <!-- Métricas do Modelo ML -->
-        {f'''
-        <div class="row mb-4">
-            <div class="col-12">
-                <div class="alert alert-info" role="alert">
-                    <h6><i class="fas fa-chart-line me-2"></i>Performance do Modelo de Machine Learning</h6>
-                    <div class="row">
-                        <div class="col-md-3">
-                            <strong>Acurácia:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('acuracia', 0) * 100)}%
-                        </div>
-                        <div class="col-md-3">
-                            <strong>Precisão:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('precisao', 0) * 100)}%
-                        </div>
-                        <div class="col-md-3">
-                            <strong>Recall:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('recall', 0) * 100)}%
-                        </div>
-                        <div class="col-md-3">
-                            <strong>F1-Score:</strong> {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('f1_score', 0) * 100)}%
-                        </div>
-                    </div>
-                    <small class="text-muted mt-2 d-block">
-                        <i class="fas fa-info-circle me-1"></i>
-                        Modelo treinado com {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('total_treino', 0))} amostras | 
-                        Testado com {formatar_numero_br(predicao_sem_agendamento.get('modelo_metricas', {}).get('total_teste', 0))} amostras
-                    </small>
-                </div>
-            </div>
-        </div>
-        ''' if predicao_sem_agendamento.get('usa_ml') and 'modelo_metricas' in predicao_sem_agendamento else ''}
-        
-        
-        <!-- KPIs de Predição -->
-        <div class="row mb-4">
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%); color: white; border-left: 5px solid #c0392b;">
-                    <i class="fas fa-user-injured" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
-                    <h2 class="mb-2">{formatar_numero_br(predicao_sem_agendamento['agravamento_30_dias'])}</h2>
-                    <p class="mb-1"><strong>Agravamentos em 30 dias</strong></p>
-                    <small style="opacity: 0.8;">Baseado em {formatar_numero_br(predicao_sem_agendamento.get('alto_risco_ml', 0))} pacientes de alto risco (ML)</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #f39c12 0%, #e67e22 100%); color: white; border-left: 5px solid #d35400;">
-                    <i class="fas fa-bed" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
-                    <h2 class="mb-2">{formatar_numero_br(predicao_sem_agendamento['internacoes_projetadas'])}</h2>
-                    <p class="mb-1"><strong>Internações Projetadas</strong></p>
-                    <small style="opacity: 0.8;">30% dos agravamentos resultam em internação hospitalar</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%); color: white; border-left: 5px solid #a93226;">
-                    <i class="fas fa-dollar-sign" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
-                    <h2 class="mb-2">{formatar_moeda_br(predicao_sem_agendamento['custo_estimado_30_dias'])}</h2>
-                    <p class="mb-1"><strong>Custo Estimado (30 dias)</strong></p>
-                    <small style="opacity: 0.8;">R$ 5.000/agravamento em média</small>
-                </div>
-            </div>
-            <div class="col-lg-3 col-md-6 mb-3">
-                <div class="chart-card text-center" style="background: linear-gradient(135deg, #8e44ad 0%, #6c3483 100%); color: white; border-left: 5px solid #5b2c6f;">
-                    <i class="fas fa-chart-line" style="font-size: 2.5rem; margin-bottom: 10px; opacity: 0.9;"></i>
-                    <h2 class="mb-2">{formatar_moeda_br(predicao_sem_agendamento['custo_estimado_total'])}</h2>
-                    <p class="mb-1"><strong>Custo Total Projetado</strong></p>
-                    <small style="opacity: 0.8;">Impacto financeiro total estimado em 90 dias</small>
-                </div>
+                    <i class="fas fa-user"></i> {current_user}
+                </span>
+                <a href="/logout" class="btn btn-sm btn-outline-danger">
+                    <i class="fas fa-sign-out-alt"></i> Sair
+                </a>
             </div>
         </div>
-        
-        <!-- Timeline de Agravamento -->
-        <div class="chart-card mb-4">
-            <h5 class="mb-3"><i class="fas fa-clock me-2"></i>Linha do Tempo de Agravamentos Projetados</h5>
-            <div class="row">
-                <div class="col-md-4">
-                    <div class="alert alert-danger">
-                        <h6><i class="fas fa-calendar-day me-2"></i>30 Dias</h6>
-                        <h3>{formatar_numero_br(predicao_sem_agendamento['agravamento_30_dias'])} pacientes</h3>
-                        <p class="mb-0 small">Principalmente riscos <strong>VERMELHO</strong> (80% de chance)</p>
-                    </div>
-                </div>
-                <div class="col-md-4">
-                    <div class="alert alert-warning">
-                        <h6><i class="fas fa-calendar-week me-2"></i>60 Dias</h6>
-                        <h3>{formatar_numero_br(predicao_sem_agendamento['agravamento_60_dias'])} pacientes</h3>
-                        <p class="mb-0 small">Riscos <strong>AMARELO</strong> e <strong>VERDE</strong> (20-50% de chance)</p>
+    </nav>
+
+    <div class="main-container">
+        <!-- KPIs Clicáveis (fragmento: /dashboard/fragmento/kpis) -->
+        <div data-fragmento="kpis">{CARREGANDO_HTML}</div>
+
+        <!-- Filtros -->
+        <div class="filter-card">
+            <h5><i class="fas fa-filter"></i> Filtros</h5>
+            <div class="alert alert-info" style="padding: 10px; font-size: 0.9rem; margin-bottom: 15px;">
+                <i class="fas fa-lightbulb me-2"></i>
+                <strong>Dica:</strong> Selecione apenas <strong>1 especialidade</strong> para ver uma análise detalhada completa com gráficos e estatísticas específicas!
+            </div>
+            <form method="get" action="/dashboard">
+                <div class="row">
+                    <div class="col-md-6">
+                        <label class="form-label fw-bold">Nível de Risco:</label>
+                        <div class="filter-section">
+                            <div class="form-check mb-2" style="background: #e3f2fd; padding: 8px; border-radius: 5px; border-left: 3px solid #2196f3;">
+                                <input class="form-check-input" type="checkbox" id="selecionar-todos-riscos" onchange="toggleTodosRiscos(this)" checked>
+                                <label class="form-check-label fw-bold" for="selecionar-todos-riscos" style="color: #1976d2;">
+                                    <i class="fas fa-check-double"></i> Selecionar Todos
+                                </label>
+                            </div>
+                            {riscos_html}
+                        </div>
                     </div>
-                </div>
-                <div class="col-md-4">
-                    <div class="alert alert-info">
-                        <h6><i class="fas fa-calendar-alt me-2"></i>90 Dias</h6>
-                        <h3>{formatar_numero_br(predicao_sem_agendamento['agravamento_90_dias'])} pacientes</h3>
-                        <p class="mb-0 small">Riscos <strong>AZUL</strong> (5% de chance)</p>
+                    <div class="col-md-6">
+                        <label class="form-label fw-bold">Especialidade:</label>
+                        <div class="filter-section">
+                            <div class="form-check mb-2" style="background: #e8f5e9; padding: 8px; border-radius: 5px; border-left: 3px solid #4caf50;">
+                                <input class="form-check-input" type="checkbox" id="selecionar-todas-especialidades" onchange="toggleTodasEspecialidades(this)" checked>
+                                <label class="form-check-label fw-bold" for="selecionar-todas-especialidades" style="color: #2e7d32;">
+                                    <i class="fas fa-check-double"></i> Selecionar Todas
+                                </label>
+                            </div>
+                            {especialidades_html}
+                        </div>
                     </div>
                 </div>
-            </div>
-        </div>
-        
-        <!-- Top 10 Especialidades Mais Críticas sem Agendamento -->
-        {f'''
-        <div class="chart-card mb-4">
-            <h5 class="mb-3">
-                <i class="fas fa-list-ol me-2"></i>Top 10 Especialidades Mais Críticas sem Agendamento
-                {' <span class="badge bg-primary">🤖 ML</span>' if predicao_sem_agendamento.get('usa_ml') else ''}
-            </h5>
-            <div class="table-responsive">
-                <table class="table table-hover">
-                    <thead class="table-danger">
-                        <tr>
-                            <th>#</th>
-                            <th>Especialidade</th>
-                            <th>Total sem Agendamento</th>
-                            {f'<th>Prob. Média Agravamento (ML)</th>' if predicao_sem_agendamento.get('usa_ml') else '<th>Pacientes Críticos</th>'}
-                            <th>Alto Risco ML</th>
-                            <th>Classificação</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {"".join([
-                            f'''<tr class="{'table-danger' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.6 else 'table-warning' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.4 else ''}">
-                                <td><strong>{idx + 1}</strong></td>
-                                <td><strong>{esp['procedimento_especialidade']}</strong></td>
-                                <td>{formatar_numero_br(esp['total'])}</td>
-                                <td>
-                                    {f"{formatar_numero_br(esp.get('prob_media', 0) * 100)}%" if predicao_sem_agendamento.get('usa_ml') else f"{formatar_numero_br(esp.get('criticos', 0))}"}
-                                </td>
-                                <td>{formatar_numero_br(esp.get('alto_risco_count', esp.get('criticos', 0)))}</td>
-                                <td>
-                                    {('<span class="badge bg-danger">🔴 CRÍTICO</span>' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.6 else 
-                                     '<span class="badge bg-warning text-dark">🟡 ALTO</span>' if esp.get('prob_media', esp.get('criticos', 0) / esp['total']) > 0.4 else 
-                                     '<span class="badge bg-info">🟢 MÉDIO</span>')}
-                                </td>
-                            </tr>'''
-                            for idx, esp in enumerate(predicao_sem_agendamento.get('especialidades_criticas_ml', predicao_sem_agendamento.get('especialidades_criticas', [])))
-                        ])}
-                    </tbody>
-                </table>
-            </div>
-            {f'''<small class="text-muted">
-                <i class="fas fa-lightbulb me-1"></i>
-                <strong>ML:</strong> Probabilidades calculadas pelo modelo Random Forest considerando múltiplas variáveis (risco, tempo espera, idade, especialidade).
-            </small>''' if predicao_sem_agendamento.get('usa_ml') else ''}
-        </div>
-        ''' if len(predicao_sem_agendamento.get('especialidades_criticas_ml', predicao_sem_agendamento.get('especialidades_criticas', []))) > 0 else ''}
-        
-        <!-- Informações sobre o Modelo -->
-        <div class="alert alert-light border" role="alert">
-            {f'''
-            <h6><i class="fas fa-brain me-2"></i>Como Funciona o Machine Learning</h6>
-            <div class="row">
-                <div class="col-md-6">
-                    <h6 class="text-primary mt-2">🎯 Algoritmo</h6>
-                    <ul class="small mb-3">
-                        <li><strong>Random Forest Classifier</strong> com 100 árvores de decisão</li>
-                        <li>Treinado com {formatar_numero_br(predicao_sem_agendamento['modelo_metricas']['total_treino'])} amostras</li>
-                        <li>Validado com {formatar_numero_br(predicao_sem_agendamento['modelo_metricas']['total_teste'])} amostras</li>
-                        <li>Acurácia: {formatar_numero_br(predicao_sem_agendamento['modelo_metricas']['acuracia'] * 100)}%</li>
-                    </ul>
-                    
-                    <h6 class="text-primary">🔍 Features Utilizadas</h6>
-                    <ul class="small mb-0">
-                        <li><strong>Risco do Paciente:</strong> Vermelho, Amarelo, Verde, Azul</li>
-                        <li><strong>Tempo de Espera:</strong> Dias aguardando atendimento</li>
-                        <li><strong>Idade:</strong> Faixa etária do paciente</li>
-                        <li><strong>Especialidade:</strong> Tipo de procedimento solicitado</li>
-                        <li><strong>Status Crítico:</strong> Indicadores de urgência</li>
-                    </ul>
-                </div>
-                <div class="col-md-6">
-                    <h6 class="text-success mt-2">✅ Vantagens do ML</h6>
-                    <ul class="small mb-3">
-                        <li>Aprende padrões complexos dos dados históricos</li>
-                        <li>Predições personalizadas para cada paciente</li>
-                        <li>Considera múltiplas variáveis simultaneamente</li>
-                        <li>Se adapta automaticamente a novos dados</li>
-                    </ul>
-                    
-                    <h6 class="text-info">💰 Premissas Financeiras</h6>
-                    <ul class="small mb-0">
-                        <li><strong>Custo por Agravamento:</strong> R$ 5.000,00 (média hospitalar)</li>
-                        <li><strong>Taxa de Internação:</strong> 30% dos casos graves</li>
-                        <li><strong>Classificação de Risco:</strong>
-                            <ul>
-                                <li>Alto: Probabilidade > 70%</li>
-                                <li>Médio: Probabilidade 40-70%</li>
-                                <li>Baixo: Probabilidade < 40%</li>
-                            </ul>
-                        </li>
-                    </ul>
+                <div class="text-center mt-3">
+                    <button type="submit" class="btn btn-primary btn-filtrar text-white">
+                        <i class="fas fa-search"></i> Aplicar Filtros
+                    </button>
                 </div>
-            </div>
-            ''' if predicao_sem_agendamento.get('usa_ml') else '''
-            <h6><i class="fas fa-info-circle me-2"></i>Premissas do Modelo Baseado em Regras</h6>
-            <ul class="mb-0 small">
-                <li><strong>Risco VERMELHO:</strong> 80% de chance de agravamento em 30 dias</li>
-                <li><strong>Risco AMARELO:</strong> 50% de chance de agravamento em 60 dias</li>
-                <li><strong>Risco VERDE:</strong> 20% de chance de agravamento em 90 dias</li>
-                <li><strong>Risco AZUL:</strong> 5% de chance de agravamento em 120 dias</li>
-                <li><strong>Taxa de Internação:</strong> 30% dos agravamentos resultam em internação hospitalar</li>
-                <li><strong>Custo Médio:</strong> R$ 5.000,00 por agravamento (baseado em custos médios hospitalares)</li>
-            </ul>
-            '''}
+            </form>
         </div>
-        """ if predicao_sem_agendamento else ''}
-        
+
+        <!-- Gráficos Principais -->
+        <h5 class="mb-3"><i class="fas fa-chart-column me-2"></i>Visão Geral</h5>
         <div class="row mb-4">
             <div class="col-lg-6 mb-3">
                 <div class="chart-card">
-                    <h6 class="mb-3">Sem Agendamento - Distribuição por Risco</h6>
-                    {grafico_sem_agendamento_html if grafico_sem_agendamento_html else '<div class="text-center text-muted p-5"><i class="fas fa-chart-column fa-3x mb-3"></i><p>Nenhum paciente sem agendamento</p></div>'}
+                    <h6 class="mb-3">Distribuição por Risco</h6>
+                    {div_grafico("risco", icone="fa-chart-column")}
                 </div>
             </div>
             <div class="col-lg-6 mb-3">
                 <div class="chart-card">
-                    <h6 class="mb-3">Sem Agendamento - Status</h6>
-                    {grafico_status_sem_agendamento_html if grafico_status_sem_agendamento_html else '<div class="text-center text-muted p-5"><i class="fas fa-chart-bar fa-3x mb-3"></i><p>Nenhum paciente sem agendamento</p></div>'}
+                    <h6 class="mb-3">Especialidades</h6>
+                    {div_grafico("especialidade", icone="fa-chart-bar")}
                 </div>
             </div>
         </div>
-        ''' if sem_agendamento_total > 0 else ''}
+
+        <!-- Seção de Detalhamento de Especialidade Única (fragmento) -->
+        {f'<div data-fragmento="especialidade">{CARREGANDO_HTML}</div>' if especialidade_unica else ''}
+
+        <!-- Seção de Pacientes SEM Agendamento (fragmento) -->
+        <div data-fragmento="sem-agendamento"></div>
 
         <!-- Seção de Dados Detalhados -->
         <div id="data-section-container">
@@ -1566,7 +1404,7 @@ async def dashboard(
                 <div class="chart-card">
                     <h5 class="mb-3">
                         <i class="fas fa-table me-2"></i>
-                        Dados Gerais (Exibindo até 5.000 de {formatar_numero_br(total_geral)} registros)
+                        Dados Gerais (<span id="total-geral">...</span> registros)
                     </h5>
                     <div class="alert alert-info alert-dismissible fade show" role="alert" style="padding: 8px 15px; font-size: 0.9rem;">
                         <i class="fas fa-info-circle me-2"></i>
@@ -1605,7 +1443,7 @@ async def dashboard(
                 <div class="chart-card">
                     <h5 class="mb-3">
                         <i class="fas fa-check-circle me-2"></i>
-                        Pacientes Confirmados (Exibindo até 5.000 de {formatar_numero_br(total_confirmados)} registros)
+                        Pacientes Confirmados (<span id="total-confirmados">...</span> registros)
                     </h5>
                     <div class="alert alert-info alert-dismissible fade show" role="alert" style="padding: 8px 15px; font-size: 0.9rem;">
                         <i class="fas fa-info-circle me-2"></i>
@@ -1644,7 +1482,7 @@ async def dashboard(
                 <div class="chart-card">
                     <h5 class="mb-3">
                         <i class="fas fa-exclamation-triangle me-2"></i>
-                        Pacientes com Risco Crítico (Exibindo até 5.000 de {formatar_numero_br(total_criticos)} registros)
+                        Pacientes com Risco Crítico (<span id="total-criticos">...</span> registros)
                     </h5>
                     <div class="alert alert-info alert-dismissible fade show" role="alert" style="padding: 8px 15px; font-size: 0.9rem;">
                         <i class="fas fa-info-circle me-2"></i>
@@ -1683,7 +1521,7 @@ async def dashboard(
                 <div class="chart-card">
                     <h5 class="mb-3">
                         <i class="fas fa-calendar-times me-2"></i>
-                        Pacientes SEM Agendamento (Exibindo até 5.000 de {formatar_numero_br(total_sem_agendamento)} registros)
+                        Pacientes SEM Agendamento (<span id="total-sem-agendamento">...</span> registros)
                     </h5>
                     <div class="alert alert-info alert-dismissible fade show" role="alert" style="padding: 8px 15px; font-size: 0.9rem;">
                         <i class="fas fa-info-circle me-2"></i>
@@ -1720,14 +1558,66 @@ async def dashboard(
     </div>
 
     <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js"></script>
+    <script charset="utf-8" src="{PLOTLY_JS_CDN}"></script>
     <script>
-        // Dados carregados do servidor
-        const tableData = {{
-            'geral': {dados_geral_json},
-            'confirmados': {dados_confirmados_json},
-            'criticos': {dados_criticos_json},
-            'sem-agendamento': {dados_sem_agendamento_json}
-        }};
+        // Carregamento progressivo: cada fragmento e cada gráfico é buscado
+        // em paralelo, com os mesmos filtros da página
+        const PLOTLY_TEMPLATE = {TEMPLATE_GRAFICOS_JSON};
+        const filtrosQuery = window.location.search;
+        
+        function carregarGraficos(raiz) {{
+            raiz.querySelectorAll('[data-grafico]').forEach(async el => {{
+                const nome = el.dataset.grafico;
+                el.removeAttribute('data-grafico');
+                const vazio = `<div class="text-center text-muted p-5">${{el.dataset.icone ? `<i class="fas ${{el.dataset.icone}} fa-3x mb-3"></i>` : ''}}<p>${{el.dataset.vazio}}</p></div>`;
+                try {{
+                    const response = await fetch(`/dashboard/grafico/${{nome}}${{filtrosQuery}}`, {{ credentials: 'same-origin' }});
+                    if (!response.ok) throw new Error(`HTTP ${{response.status}}`);
+                    const fig = await response.json();
+                    if (!fig) {{
+                        el.innerHTML = vazio;
+                        return;
+                    }}
+                    el.innerHTML = '';
+                    el.style.height = fig.layout.height + 'px';
+                    fig.layout.template = PLOTLY_TEMPLATE;
+                    Plotly.newPlot(el, fig.data, fig.layout, {{ responsive: true }});
+                }} catch (e) {{
+                    el.innerHTML = '<div class="text-center text-danger p-5"><p>Erro ao carregar o gráfico</p></div>';
+                }}
+            }});
+        }}
+        
+        function carregarFragmentos(raiz) {{
+            raiz.querySelectorAll('[data-fragmento]').forEach(async el => {{
+                const nome = el.dataset.fragmento;
+                el.removeAttribute('data-fragmento');
+                try {{
+                    const response = await fetch(`/dashboard/fragmento/${{nome}}${{filtrosQuery}}`, {{ credentials: 'same-origin' }});
+                    if (!response.ok) throw new Error(`HTTP ${{response.status}}`);
+                    el.innerHTML = await response.text();
+                    el.querySelectorAll('[data-total]').forEach(t => {{
+                        const alvo = document.getElementById('total-' + t.dataset.total);
+                        if (alvo) alvo.textContent = t.textContent;
+                    }});
+                    // Fragmentos podem trazer gráficos e outros fragmentos
+                    // (gráficos primeiro: a predição é a parte mais lenta)
+                    carregarGraficos(el);
+                    carregarFragmentos(el);
+                }} catch (e) {{
+                    el.innerHTML = '<div class="alert alert-danger">Erro ao carregar esta seção</div>';
+                }}
+            }});
+        }}
+        
+        carregarFragmentos(document);
+        carregarGraficos(document);
+    </script>
+    <script>
+        // Linhas buscadas por página em /api/tabela/{{secao}} (mesmos filtros da página)
+        const tableData = {{}};
+        const tableTotals = {{ 'geral': 0, 'confirmados': 0, 'criticos': 0, 'sem-agendamento': 0 }};
+        const filtrosPagina = new URLSearchParams(window.location.search);
         
         const columnNames = {json.dumps(colunas_disponiveis_nomes)};
         const columnKeys = {json.dumps(colunas_disponiveis)};
@@ -1748,79 +1638,80 @@ async def dashboard(
             'sem-agendamento': {{ column: null, direction: 'asc' }}
         }};
         
+        // Última requisição de cada tabela (respostas antigas são descartadas)
+        const requestSeq = {{}};
+        
         let currentDataSection = null;
         
-        // Função para ordenar dados
+        // Função para ordenar dados (a ordenação é feita no servidor)
         function sortData(tableId, columnIndex) {{
-            const data = tableData[tableId];
             const sort = sortState[tableId];
-            const columnKey = columnKeys[columnIndex];
             
             // Se clicar na mesma coluna, alterna a direção
             if (sort.column === columnIndex) {{
                 if (sort.direction === 'asc') {{
                     sort.direction = 'desc';
                 }} else if (sort.direction === 'desc') {{
+                    // Resetar para ordem original
                     sort.column = null;
                     sort.direction = 'asc';
-                    // Resetar para ordem original
-                    paginationState[tableId].currentPage = 1;
-                    renderTable(tableId);
-                    return;
                 }}
             }} else {{
                 sort.column = columnIndex;
                 sort.direction = 'asc';
             }}
             
-            // Ordenar os dados
-            data.sort((a, b) => {{
-                let valA = a[columnKey];
-                let valB = b[columnKey];
-                
-                // Tratar valores nulos
-                if (valA === null || valA === undefined || valA === 'N/A') valA = '';
-                if (valB === null || valB === undefined || valB === 'N/A') valB = '';
-                
-                // Converter para string para comparação
-                valA = String(valA).toLowerCase();
-                valB = String(valB).toLowerCase();
-                
-                // Tentar converter para número se possível
-                const numA = parseFloat(valA);
-                const numB = parseFloat(valB);
-                
-                if (!isNaN(numA) && !isNaN(numB)) {{
-                    return sort.direction === 'asc' ? numA - numB : numB - numA;
-                }}
-                
-                // Comparação de strings
-                if (valA < valB) return sort.direction === 'asc' ? -1 : 1;
-                if (valA > valB) return sort.direction === 'asc' ? 1 : -1;
-                return 0;
-            }});
-            
             // Resetar para primeira página
             paginationState[tableId].currentPage = 1;
             renderTable(tableId);
         }}
         
-        function renderTable(tableId) {{
-            const data = tableData[tableId];
+        async function fetchPage(tableId) {{
+            const state = paginationState[tableId];
+            const sort = sortState[tableId];
+            const params = new URLSearchParams();
+            filtrosPagina.getAll('risco').forEach(v => params.append('risco', v));
+            filtrosPagina.getAll('especialidade').forEach(v => params.append('especialidade', v));
+            columnKeys.forEach(key => params.append('colunas', key));
+            params.set('pagina', state.currentPage);
+            params.set('tamanho', state.pageSize);
+            if (sort.column !== null) {{
+                params.set('ordenar', columnKeys[sort.column]);
+                params.set('direcao', sort.direction);
+            }}
+            
+            const response = await fetch(`/api/tabela/${{tableId}}?${{params}}`, {{ credentials: 'same-origin' }});
+            if (!response.ok) throw new Error(`HTTP ${{response.status}}`);
+            return response.json();
+        }}
+        
+        async function renderTable(tableId) {{
             const state = paginationState[tableId];
             const sort = sortState[tableId];
+            const seq = (requestSeq[tableId] || 0) + 1;
+            requestSeq[tableId] = seq;
             
-            if (!data || data.length === 0) {{
+            if (columnKeys.length === 0) {{
                 document.getElementById('info-' + tableId).textContent = 'Nenhum dado disponível';
                 return;
             }}
             
-            // Calcular paginação
-            const totalRecords = data.length;
-            const totalPages = Math.ceil(totalRecords / state.pageSize);
-            const startIdx = (state.currentPage - 1) * state.pageSize;
-            const endIdx = Math.min(startIdx + state.pageSize, totalRecords);
-            const pageData = data.slice(startIdx, endIdx);
+            document.getElementById('info-' + tableId).textContent = 'Carregando...';
+            let page;
+            try {{
+                page = await fetchPage(tableId);
+            }} catch (e) {{
+                if (requestSeq[tableId] === seq) {{
+                    document.getElementById('info-' + tableId).textContent = 'Erro ao carregar os dados';
+                }}
+                return;
+            }}
+            if (requestSeq[tableId] !== seq) return;
+            
+            const data = page.dados;
+            tableData[tableId] = data;
+            tableTotals[tableId] = page.total;
+            document.getElementById('total-' + tableId).textContent = page.total.toLocaleString('pt-BR');
             
             // Renderizar cabeçalho com coluna de número e ordenação
             const thead = document.getElementById('thead-' + tableId);
@@ -1832,9 +1723,22 @@ async def dashboard(
                     return `<th class="sortable-header" onclick="sortData('${{tableId}}', ${{idx}})" title="Clique para ordenar">${{name}}${{sortIndicator}}</th>`;
                 }}).join('');
             
-            // Renderizar corpo com numeração
             const tbody = document.getElementById('tbody-' + tableId);
-            tbody.innerHTML = pageData.map((row, idx) => {{
+            if (page.total === 0) {{
+                tbody.innerHTML = '';
+                document.getElementById('info-' + tableId).textContent = 'Nenhum dado disponível';
+                document.getElementById('page-' + tableId).textContent = 'Página 1 de 1';
+                return;
+            }}
+            
+            // Calcular paginação
+            const totalRecords = page.total;
+            const totalPages = page.total_paginas;
+            const startIdx = (page.pagina - 1) * page.tamanho;
+            const endIdx = startIdx + data.length;
+            
+            // Renderizar corpo com numeração
+            tbody.innerHTML = data.map((row, idx) => {{
                 const rowNumber = startIdx + idx + 1;
                 const cells = columnKeys.map(key => {{
                     const value = row[key] ?? 'N/A';
@@ -1860,8 +1764,7 @@ async def dashboard(
         
         function changePage(tableId, action) {{
             const state = paginationState[tableId];
-            const data = tableData[tableId];
-            const totalPages = Math.ceil(data.length / state.pageSize);
+            const totalPages = Math.max(1, Math.ceil(tableTotals[tableId] / state.pageSize));
             
             switch(action) {{
                 case 'first':
@@ -2001,15 +1904,119 @@ async def dashboard(
         )
 
 
+@app.get("/dashboard/fragmento/{nome}", response_class=HTMLResponse)
+@cache_dashboard.em_cache("fragmento")
+@no_pool()
+def fragmento_dashboard(
+    nome: str,
+    risco: Optional[List[str]] = Query(None),
+    especialidade: Optional[List[str]] = Query(None),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Trecho HTML de uma seção do dashboard (ver FRAGMENTOS).
+
+    Roda no pool do executor_cpu: as seções pedidas juntas pelo navegador
+    são calculadas em paralelo, e a predição (ML) não atrasa as demais.
+    """
+    if nome not in FRAGMENTOS:
+        raise HTTPException(status_code=404, detail=f"Fragmento desconhecido: {nome}")
+    try:
+        return HTMLResponse(FRAGMENTOS[nome](risco, especialidade))
+    except Exception as e:
+        return HTMLResponse(
+            f'<div class="alert alert-danger">Erro ao carregar esta seção: {str(e)}</div>',
+            status_code=500,
+        )
+
+
+@app.get("/dashboard/grafico/{nome}")
+@no_pool()
+def grafico_dashboard(
+    nome: str,
+    risco: Optional[List[str]] = Query(None),
+    especialidade: Optional[List[str]] = Query(None),
+    current_user: str = Depends(get_current_user),
+):
+    """Spec JSON de um gráfico (ver GRAFICOS), desenhada com Plotly.newPlot"""
+    if nome not in GRAFICOS:
+        raise HTTPException(status_code=404, detail=f"Gráfico desconhecido: {nome}")
+    return Response(
+        content=grafico_json(nome, risco, especialidade), media_type="application/json"
+    )
+
+
+@app.get("/api/tabela/{secao}")
+@cache_dashboard.em_cache("tabela")
+@no_pool()
+def tabela_secao(
+    secao: str,
+    risco: Optional[List[str]] = Query(None),
+    especialidade: Optional[List[str]] = Query(None),
+    pagina: int = Query(1, ge=1),
+    tamanho: int = Query(50, ge=1, le=TAMANHO_MAXIMO_PAGINA),
+    ordenar: Optional[str] = Query(None),
+    direcao: str = Query("asc", pattern="^(asc|desc)$"),
+    colunas: Optional[List[str]] = Query(None),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Uma página de uma das tabelas de dados detalhados do dashboard.
+
+    Filtro da seção, ordenação e recorte da página rodam em um único plano
+    sobre o conjunto de trabalho; só as linhas da página são serializadas.
+    `colunas` restringe a projeção (dentro de COLUNAS_TABELA).
+    """
+    if secao not in FILTROS_SECAO:
+        raise HTTPException(status_code=404, detail=f"Seção desconhecida: {secao}")
+    if ordenar is not None and ordenar not in COLUNAS_TABELA:
+        raise HTTPException(status_code=400, detail=f"Coluna de ordenação inválida: {ordenar}")
+
+    df = carregar_dados()
+    projecao = [
+        c for c in COLUNAS_TABELA if c in df.columns and (not colunas or c in colunas)
+    ]
+    lf = df.lazy().filter(
+        *montar_filtros(risco, especialidade), *FILTROS_SECAO[secao], pl.lit(True)
+    )
+    if ordenar in df.columns:
+        lf = lf.sort(
+            ordenar, descending=direcao == "desc", nulls_last=True, maintain_order=True
+        )
+
+    contagem, linhas = pl.collect_all(
+        [
+            lf.select(pl.len()),
+            lf.select(projecao).slice((pagina - 1) * tamanho, tamanho),
+        ]
+    )
+    total = contagem.item()
+
+    return resposta_json(
+        {
+            "secao": secao,
+            "total": total,
+            "pagina": pagina,
+            "tamanho": tamanho,
+            "total_paginas": max(1, -(-total // tamanho)),
+            "colunas": projecao,
+            "dados": linhas,
+        },
+        FORMATO_TEXTO,
+    )
+
+
 @app.get("/status")
 async def get_status():
     try:
-        df = carregar_dados()
         return {
             "status": "OK",
-            "total_registros": len(df),
+            "total_registros": total_registros(),
             "versao": "2.0.0",
             "mensagem": "Dashboard funcionando!",
+            "cache_resultados": cache_dashboard.estatisticas(),
+            "cache_graficos": cache_graficos.estatisticas(),
+            "executor": executor_cpu.estatisticas(),
         }
     except Exception as e:
         return {"status": "ERRO", "erro": str(e)}
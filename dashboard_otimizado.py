@@ -14,13 +14,16 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from typing import Optional, List
-import glob
 from datetime import datetime, timedelta
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 import warnings
+import carregador_dados
+from carregador_dados import montar_filtros
+from modelo_ml_saude import CodificadorCategorico, LIMIAR_PADRAO, simular_agravamento
+from formatacao_br import formatar_numero_br, formatar_moeda_br
 warnings.filterwarnings('ignore')
 
 # ===== CONFIGURAÇÃO DA APLICAÇÃO =====
@@ -28,7 +31,6 @@ app = FastAPI(title="Gestão Inteligente de Vagas - GIV", version="2.0")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # ===== CACHE GLOBAL =====
-_dados_cache = None
 _modelo_global = None
 
 # ===== MODELO DE MACHINE LEARNING INTEGRADO =====
@@ -42,9 +44,10 @@ class ModeloPredicaoAgravamento:
         self.metricas = {}
         self.treinado = False
         
-    def preparar_features(self, df):
-        """Feature Engineering otimizado"""
-        df_features = df.clone()
+    def preparar_features(self, df, ajustar=False):
+        """Feature Engineering otimizado (encoders ajustados só no treino)"""
+        # Colunas Categorical (snapshot) viram texto para as transformações abaixo
+        df_features = df.with_columns(pl.col(pl.Categorical).cast(pl.String))
         
         # Feature 1: Risco
         if 'solicitacao_risco' in df_features.columns:
@@ -79,15 +82,22 @@ class ModeloPredicaoAgravamento:
             df_features = df_features.with_columns(
                 pl.col('procedimento_especialidade').fill_null("DESCONHECIDA")
             )
-            especialidades_unicas = df_features['procedimento_especialidade'].unique().to_list()
-            esp_map = {esp: idx for idx, esp in enumerate(especialidades_unicas)}
+            if ajustar:
+                self.encoders['especialidade'] = CodificadorCategorico().ajustar(
+                    df_features['procedimento_especialidade']
+                )
             df_features = df_features.with_columns(
-                pl.col('procedimento_especialidade').replace(esp_map).alias('especialidade_codigo')
+                self.encoders['especialidade']
+                .transformar('procedimento_especialidade')
+                .alias('especialidade_codigo')
             )
-            self.encoders['especialidade'] = esp_map
         
-        # Feature 5: Status crítico
-        if 'solicitacao_status' in df_features.columns:
+        # Feature 5: Status crítico (indicador pronto do carregador, se houver)
+        if 'is_critico' in df_features.columns:
+            df_features = df_features.with_columns(
+                pl.col('is_critico').cast(pl.Int32).alias('status_critico')
+            )
+        elif 'solicitacao_status' in df_features.columns:
             df_features = df_features.with_columns(
                 pl.col('solicitacao_status')
                 .str.contains('CRITICO|URGENTE|GRAVE')
@@ -101,36 +111,8 @@ class ModeloPredicaoAgravamento:
         return df_features
     
     def criar_target(self, df):
-        """Criar variável target baseada em regras de negócio"""
-        df_target = df.clone()
-        np.random.seed(42)
-        
-        prob_agravamento = []
-        for i in range(len(df_target)):
-            row = df_target.row(i, named=True)
-            risco = row.get('solicitacao_risco', 'AZUL')
-            tempo = row.get('tempo_espera_dias', 0)
-            
-            if risco == 'VERMELHO':
-                prob = 0.7 + (tempo / 100) * 0.2
-            elif risco == 'AMARELO':
-                prob = 0.4 + (tempo / 150) * 0.2
-            elif risco == 'VERDE':
-                prob = 0.15 + (tempo / 200) * 0.1
-            elif risco == 'AZUL':
-                prob = 0.05 + (tempo / 250) * 0.05
-            else:  # DESCONHECIDO
-                prob = 0.1 + (tempo / 300) * 0.05
-            
-            prob = min(prob + np.random.normal(0, 0.1), 1.0)
-            prob = max(prob, 0.0)
-            agravou = 1 if np.random.random() < prob else 0
-            prob_agravamento.append(agravou)
-        
-        df_target = df_target.with_columns(
-            pl.Series('agravamento', prob_agravamento)
-        )
-        return df_target
+        """Criar variável target baseada em regras de negócio (vetorizado)"""
+        return simular_agravamento(df, seed=42)
     
     def treinar(self, df):
         """Treinar modelo de ML"""
@@ -139,7 +121,7 @@ class ModeloPredicaoAgravamento:
         
         # Preparar features
         print("📊 Passo 1: Feature Engineering...")
-        df_prep = self.preparar_features(df)
+        df_prep = self.preparar_features(df, ajustar=True)
         df_prep = self.criar_target(df_prep)
         
         feature_cols = ['risco_numerico', 'tempo_espera_dias', 'idade_aproximada', 
@@ -228,8 +210,9 @@ class ModeloPredicaoAgravamento:
         feature_cols_existentes = [col for col in feature_cols if col in df_pred.columns]
         
         X = df_pred.select(feature_cols_existentes).to_numpy()
+        # Uma passada pelas árvores: a classe sai da probabilidade (= predict())
         probabilidades = self.modelo.predict_proba(X)[:, 1]
-        predicoes = self.modelo.predict(X)
+        predicoes = (probabilidades > LIMIAR_PADRAO).astype(np.int64)
         
         df_pred = df_pred.with_columns([
             pl.Series('probabilidade_agravamento', probabilidades),
@@ -284,38 +267,11 @@ class ModeloPredicaoAgravamento:
         }
 
 # ===== FUNÇÕES UTILITÁRIAS =====
-def carregar_dados():
-    """Carrega dados com cache otimizado"""
-    global _dados_cache
-    if _dados_cache is not None:
-        return _dados_cache
-    
+def carregar_dados(colunas=None, filtros=None):
+    """Carrega dados com cache otimizado (conjunto de trabalho do carregador)"""
     try:
-        print("Carregando dados da pasta db...")
-        
-        # Carregar solicitações
-        solicitacao_files = glob.glob('db/solicitacao-*.parquet')
-        if solicitacao_files:
-            df_solicitacao = pl.concat([pl.read_parquet(f) for f in solicitacao_files])
-            print(f"OK: {len(solicitacao_files)} arquivos de solicitacao carregados")
-        else:
-            raise FileNotFoundError("Arquivos de solicitacao nao encontrados")
-        
-        # Carregar procedimentos
-        procedimento_files = glob.glob('db/procedimento-*.parquet')
-        if procedimento_files:
-            df_procedimento = pl.concat([pl.read_parquet(f) for f in procedimento_files])
-            print(f"OK: {len(procedimento_files)} arquivo(s) de procedimento carregados")
-            df_completo = df_solicitacao.join(df_procedimento, on="procedimento_sisreg_id", how="left")
-        else:
-            df_completo = df_solicitacao
-        
-        print(f"OK: Total: {len(df_completo):,} registros")
-        _dados_cache = df_completo
-        return df_completo
-        
-    except Exception as e:
-        print(f"ERRO ao carregar dados: {e}")
+        return carregador_dados.carregar_dados(colunas, filtros)
+    except Exception:
         return None
 
 def analisar_predicao_sem_agendamento(df_sem_agendamento):
@@ -447,17 +403,11 @@ async def dashboard(
     """Dashboard principal otimizado"""
     try:
         # Carregar dados
-        df_completo = carregar_dados()
+        df_completo = carregar_dados(["solicitacao_risco", "procedimento_especialidade"])
         if df_completo is None:
             return "Erro ao carregar dados"
             
-        df_filtrado = df_completo
-        
-        # Aplicar filtros
-        if risco:
-            df_filtrado = df_filtrado.filter(pl.col("solicitacao_risco").is_in(risco))
-        if especialidade:
-            df_filtrado = df_filtrado.filter(pl.col("procedimento_especialidade").is_in(especialidade))
+        df_filtrado = carregar_dados(filtros=montar_filtros(risco, especialidade))
         
         # Métricas básicas
         total = len(df_filtrado)
@@ -470,20 +420,20 @@ async def dashboard(
         sem_agendamento_total = 0
         
         if total > 0:
-            confirmados = df_filtrado.filter(pl.col("solicitacao_status").str.contains("CONFIRMADO")).height
+            confirmados = df_filtrado.filter(pl.col("is_confirmado")).height
             taxa_conf = (confirmados / total * 100)
             
             criticos = df_filtrado.filter(pl.col("solicitacao_risco").is_in(["VERMELHO", "AMARELO"])).height
             risco_critico = (criticos / total * 100)
             
-            nao_agendados = df_filtrado.filter(~pl.col("solicitacao_status").str.contains("AGENDAMENTO")).height
+            nao_agendados = df_filtrado.filter(pl.col("is_sem_agendamento")).height
             sem_agendamento = (nao_agendados / total * 100)
             sem_agendamento_total = nao_agendados
         
         # Análise preditiva
         predicao_sem_agendamento = None
         if sem_agendamento_total > 0:
-            df_sem_agend = df_filtrado.filter(~pl.col("solicitacao_status").str.contains("AGENDAMENTO"))
+            df_sem_agend = df_filtrado.filter(pl.col("is_sem_agendamento"))
             predicao_sem_agendamento = analisar_predicao_sem_agendamento(df_sem_agend) if len(df_sem_agend) > 0 else None
         
         # Dados para filtros
@@ -528,15 +478,15 @@ async def dashboard(
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="kpi-card">
                                 <i class="fas fa-list-alt kpi-icon"></i>
-                                <div class="kpi-value">{total:,}</div>
+                                <div class="kpi-value">{formatar_numero_br(total)}</div>
                                 <div class="kpi-label">Total de Solicitações</div>
-                                <small style="opacity: 0.8;">{total_sistema:,} no sistema completo</small>
+                                <small style="opacity: 0.8;">{formatar_numero_br(total_sistema)} no sistema completo</small>
                             </div>
                         </div>
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="kpi-card">
                                 <i class="fas fa-check-circle kpi-icon"></i>
-                                <div class="kpi-value">{taxa_conf:.1f}%</div>
+                                <div class="kpi-value">{formatar_numero_br(taxa_conf)}%</div>
                                 <div class="kpi-label">Taxa de Confirmação</div>
                                 <small style="opacity: 0.8;">Solicitações confirmadas</small>
                             </div>
@@ -544,7 +494,7 @@ async def dashboard(
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="kpi-card">
                                 <i class="fas fa-exclamation-triangle kpi-icon"></i>
-                                <div class="kpi-value">{risco_critico:.1f}%</div>
+                                <div class="kpi-value">{formatar_numero_br(risco_critico)}%</div>
                                 <div class="kpi-label">Risco Crítico</div>
                                 <small style="opacity: 0.8;">Vermelho + Amarelo</small>
                             </div>
@@ -552,9 +502,9 @@ async def dashboard(
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="kpi-card">
                                 <i class="fas fa-calendar-times kpi-icon"></i>
-                                <div class="kpi-value">{sem_agendamento:.1f}%</div>
+                                <div class="kpi-value">{formatar_numero_br(sem_agendamento)}%</div>
                                 <div class="kpi-label">Sem Agendamento</div>
-                                <small style="opacity: 0.8;">{sem_agendamento_total:,} pacientes</small>
+                                <small style="opacity: 0.8;">{formatar_numero_br(sem_agendamento_total)} pacientes</small>
                             </div>
                         </div>
                     </div>
@@ -591,7 +541,7 @@ async def dashboard(
                         <h6><i class="fas fa-brain"></i> Análise Preditiva com Machine Learning</h6>
                         <strong>Algoritmo:</strong> {predicao_sem_agendamento.get('algoritmo', 'Random Forest Classifier')}
                         <br>
-                        <strong>Projeção:</strong> Impacto estimado para {predicao_sem_agendamento['total_sem_agendamento']:,} pacientes sem atendimento.
+                        <strong>Projeção:</strong> Impacto estimado para {formatar_numero_br(predicao_sem_agendamento['total_sem_agendamento'])} pacientes sem atendimento.
                     </div>
 
                     <!-- Cards de Predição -->
@@ -599,28 +549,28 @@ async def dashboard(
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="prediction-card">
                                 <i class="fas fa-user-injured prediction-icon"></i>
-                                <h2 class="prediction-value">{predicao_sem_agendamento['agravamento_30_dias']:,}</h2>
+                                <h2 class="prediction-value">{formatar_numero_br(predicao_sem_agendamento['agravamento_30_dias'])}</h2>
                                 <p class="prediction-label">Agravamentos em 30 dias</p>
                             </div>
                         </div>
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="prediction-card" style="background: linear-gradient(135deg, #f39c12 0%, #e67e22 100%);">
                                 <i class="fas fa-bed prediction-icon"></i>
-                                <h2 class="prediction-value">{predicao_sem_agendamento['internacoes_projetadas']:,}</h2>
+                                <h2 class="prediction-value">{formatar_numero_br(predicao_sem_agendamento['internacoes_projetadas'])}</h2>
                                 <p class="prediction-label">Internações Projetadas</p>
                             </div>
                         </div>
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="prediction-card" style="background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%);">
                                 <i class="fas fa-dollar-sign prediction-icon"></i>
-                                <h2 class="prediction-value">R$ {predicao_sem_agendamento['custo_estimado_30_dias']:,.0f}</h2>
+                                <h2 class="prediction-value">{formatar_moeda_br(predicao_sem_agendamento['custo_estimado_30_dias'], casas=0)}</h2>
                                 <p class="prediction-label">Custo 30 dias</p>
                             </div>
                         </div>
                         <div class="col-lg-3 col-md-6 mb-3">
                             <div class="prediction-card" style="background: linear-gradient(135deg, #8e44ad 0%, #6c3483 100%);">
                                 <i class="fas fa-chart-line prediction-icon"></i>
-                                <h2 class="prediction-value">R$ {predicao_sem_agendamento['custo_estimado_total']:,.0f}</h2>
+                                <h2 class="prediction-value">{formatar_moeda_br(predicao_sem_agendamento['custo_estimado_total'], casas=0)}</h2>
                                 <p class="prediction-label">Custo Total (90 dias)</p>
                             </div>
                         </div>
@@ -0,0 +1,117 @@
+"""
+Executor de Trabalho Pesado - Gestão Inteligente de Vagas (GIV-Saúde)
+=====================================================================
+
+Pool dedicado para o trabalho síncrono (Polars, NumPy, scikit-learn) dos
+endpoints FastAPI, mantendo o event loop livre para as requisições leves
+(/health, login, status).
+
+Usa threads e não processos: os kernels do Polars, do NumPy e a
+construção das árvores do scikit-learn liberam o GIL, e as threads
+compartilham o cache de dados e o modelo treinado, que em um pool de
+processos teriam de ser serializados a cada chamada.
+
+Configuração:
+- GIV_WORKERS_CPU: tamanho do pool (padrão: número de CPUs);
+- GIV_TIMEOUT_S: tempo máximo de espera por requisição (padrão 30s).
+
+Quando o tempo estoura, a requisição recebe 504; a tarefa já iniciada não
+pode ser interrompida e termina em segundo plano (seus efeitos, como o
+modelo treinado ou caches preenchidos, são aproveitados pelas próximas).
+
+Uso:
+
+    @app.get("/api/v1/dashboard/kpis")
+    @no_pool()
+    def get_dashboard_kpis(...):
+        ...
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+WORKERS_CPU = int(os.getenv("GIV_WORKERS_CPU", str(os.cpu_count() or 4)))
+TIMEOUT_S = float(os.getenv("GIV_TIMEOUT_S", "30"))
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS_CPU, thread_name_prefix="giv-cpu")
+
+_contadores = {"em_execucao": 0, "concluidas": 0, "timeouts": 0}
+_lock_contadores = threading.Lock()
+
+
+def _contar(chave, delta=1):
+    with _lock_contadores:
+        _contadores[chave] += delta
+
+
+def _executar_contando(func, args, kwargs):
+    _contar("em_execucao")
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _contar("em_execucao", -1)
+        _contar("concluidas")
+
+
+async def executar(func, *args, timeout=None, **kwargs):
+    """
+    Executa `func(*args, **kwargs)` no pool e aguarda sem bloquear o loop.
+
+    Levanta HTTPException 504 se o resultado não ficar pronto em `timeout`
+    segundos (padrão GIV_TIMEOUT_S; None ou 0 = sem limite).
+    """
+    timeout = TIMEOUT_S if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    futuro = loop.run_in_executor(_pool, _executar_contando, func, args, kwargs)
+    try:
+        return await asyncio.wait_for(futuro, timeout or None)
+    except asyncio.TimeoutError:
+        _contar("timeouts")
+        raise HTTPException(
+            status_code=504,
+            detail=f"Tempo limite de {timeout:g}s excedido ao processar a requisição",
+        )
+
+
+def _serializado(func):
+    """
+    Executa o endpoint e já devolve a resposta JSON pronta.
+
+    Para endpoints async o FastAPI serializaria o dict retornado no event
+    loop (milhares de linhas em `dados`); aqui isso acontece na thread do pool.
+    """
+    @functools.wraps(func)
+    def envoltorio(*args, **kwargs):
+        resultado = func(*args, **kwargs)
+        if isinstance(resultado, Response):
+            return resultado
+        return JSONResponse(jsonable_encoder(resultado))
+
+    return envoltorio
+
+
+def no_pool(timeout=None):
+    """Decorador: transforma um endpoint síncrono em async executado no pool"""
+    def decorador(func):
+        executar_serializado = _serializado(func)
+
+        @functools.wraps(func)
+        async def envoltorio(*args, **kwargs):
+            return await executar(executar_serializado, *args, timeout=timeout, **kwargs)
+
+        return envoltorio
+
+    return decorador
+
+
+def estatisticas():
+    """Ocupação do pool para /status"""
+    with _lock_contadores:
+        return {"workers": WORKERS_CPU, "timeout_s": TIMEOUT_S, **_contadores}
@@ -0,0 +1,127 @@
+"""
+Inferência Vetorizada da Floresta - Gestão Inteligente de Vagas (GIV-Saúde)
+==========================================================================
+
+Motor alternativo ao `predict_proba` do RandomForestClassifier. As árvores
+treinadas são achatadas em vetores contíguos de nós (feature, limiar,
+filhos, probabilidade da folha) e percorridas todas juntas com indexação
+NumPy, um nível por iteração (profundidade máxima do modelo: 10).
+
+O resultado é bit a bit igual ao do scikit-learn:
+- a comparação é a mesma, `float32(x) <= limiar` em float64, com o desvio
+  de valores ausentes (`missing_go_to_left`) de cada nó;
+- a folha devolve a mesma fração de classes de `tree_.value`;
+- as árvores são somadas na ordem dos estimadores e a soma é dividida por
+  n_estimators, como no predict_proba sequencial.
+
+Para lotes pequenos (ex.: /api/v1/ml/predicao com uma linha) elimina a
+sobrecarga por chamada do scikit-learn (validação, joblib, uma chamada por
+árvore): ~10x mais rápido até 100 linhas. Por volta de LINHAS_VANTAGEM
+linhas o percurso em Cython do scikit-learn volta a ganhar, e o modelo
+escolhe o motor pelo tamanho do lote (ver GIV_MOTOR_ML em modelo_ml_saude).
+Lotes grandes são percorridos em blocos de LINHAS_POR_BLOCO linhas para
+limitar a memória da matriz (árvores x linhas) de nós.
+
+Comparação de latência: benchmarks/benchmark_inferencia_floresta.py
+"""
+
+import numpy as np
+import sklearn
+
+LINHAS_POR_BLOCO = 4096
+
+# Tamanho de lote até o qual este motor supera o predict_proba do scikit-learn
+LINHAS_VANTAGEM = 1000
+
+# Até a 1.3 `tree_.value` guardava contagens e predict_proba normalizava
+_VALOR_EM_CONTAGENS = tuple(int(p) for p in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+
+def _probabilidade_folhas(arvore, n_classes):
+    valor = arvore.value[:, 0, :n_classes].astype(np.float64)
+    if _VALOR_EM_CONTAGENS:
+        normalizador = valor.sum(axis=1, keepdims=True)
+        normalizador[normalizador == 0.0] = 1.0
+        valor = valor / normalizador
+    return valor
+
+
+class FlorestaVetorizada:
+    """Floresta achatada; `predict_proba` compatível com o do scikit-learn"""
+
+    def __init__(self, modelo, linhas_por_bloco=LINHAS_POR_BLOCO):
+        if modelo.n_outputs_ != 1:
+            raise ValueError("Só florestas de uma saída podem ser achatadas")
+
+        n_classes = int(modelo.n_classes_)
+        feature, limiar, esquerda, direita, ausente_esquerda, valor = [], [], [], [], [], []
+        raizes = []
+        deslocamento = 0
+        for estimador in modelo.estimators_:
+            arvore = estimador.tree_
+            nos = np.arange(arvore.node_count)
+            folha = arvore.children_left == -1
+
+            # Folhas apontam para si mesmas: seguem paradas até o fim do laço
+            feature.append(np.where(folha, 0, arvore.feature))
+            limiar.append(arvore.threshold)
+            esquerda.append(np.where(folha, nos, arvore.children_left) + deslocamento)
+            direita.append(np.where(folha, nos, arvore.children_right) + deslocamento)
+            ausente_esquerda.append(arvore.missing_go_to_left.astype(bool))
+            valor.append(_probabilidade_folhas(arvore, n_classes))
+
+            raizes.append(deslocamento)
+            deslocamento += arvore.node_count
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.limiar = np.concatenate(limiar).astype(np.float64)
+        # filhos[2 * no] = esquerdo, filhos[2 * no + 1] = direito: um único gather
+        self.filhos = np.stack(
+            [np.concatenate(esquerda), np.concatenate(direita)], axis=1
+        ).astype(np.intp).ravel()
+        self.ausente_esquerda = np.concatenate(ausente_esquerda)
+        self.valor = np.ascontiguousarray(np.concatenate(valor))
+        self.raizes = np.asarray(raizes, dtype=np.intp)
+
+        self.n_features = int(modelo.n_features_in_)
+        self.n_classes = n_classes
+        self.classes_ = modelo.classes_
+        self.profundidade = max(e.tree_.max_depth for e in modelo.estimators_)
+        self.linhas_por_bloco = linhas_por_bloco
+
+    def _folhas(self, X):
+        """Nó-folha de cada (árvore, linha) para um bloco de linhas"""
+        n = X.shape[0]
+        plano = X.ravel()
+        base = (np.arange(n, dtype=np.intp) * self.n_features)[None, :]
+        nos = np.repeat(self.raizes[:, None], n, axis=1)
+        tem_ausentes = np.isnan(plano).any()
+
+        for _ in range(self.profundidade):
+            x = plano[base + self.feature[nos]]
+            vai_direita = x > self.limiar[nos]
+            if tem_ausentes:
+                vai_direita = np.where(np.isnan(x), ~self.ausente_esquerda[nos], vai_direita)
+            nos = self.filhos[2 * nos + vai_direita]
+        return nos
+
+    def predict_proba(self, X):
+        # Mesma conversão de entrada das árvores do scikit-learn
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Esperado X com {self.n_features} features, recebido {X.shape}")
+
+        proba = np.empty((X.shape[0], self.n_classes), dtype=np.float64)
+        for inicio in range(0, X.shape[0], self.linhas_por_bloco):
+            bloco = X[inicio:inicio + self.linhas_por_bloco]
+            folhas = self._folhas(bloco)
+
+            soma = np.zeros((bloco.shape[0], self.n_classes), dtype=np.float64)
+            for folhas_arvore in folhas:
+                soma += self.valor[folhas_arvore]
+            soma /= len(self.raizes)
+            proba[inicio:inicio + bloco.shape[0]] = soma
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
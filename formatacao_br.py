@@ -0,0 +1,282 @@
+"""
+Formatação de números no padrão brasileiro - Gestão Inteligente de Vagas (GIV-Saúde)
+===================================================================================
+
+Ponto separa os milhares e vírgula separa os decimais ("1.234,5",
+"R$ 1.234,56"). Duas formas, que produzem o mesmo texto:
+
+- por valor: `formatar_numero_br` e `formatar_moeda_br` (KPIs, textos do
+  HTML); inteiros de 0 a LIMITE_INTEIROS - 1 saem prontos de uma tabela
+  pré-formatada;
+- por coluna: `formatar_numeros_br`, `formatar_decimais_br` e
+  `formatar_moedas_br` recebem uma Series do Polars, um array NumPy ou uma
+  lista e devolvem uma Series de texto (rótulos de gráficos, células de
+  tabelas). A partir de LIMITE_POR_VALOR valores, tudo é feito em operações
+  vetorizadas do Polars: cada grupo de 3 dígitos é um `gather` nas mesmas
+  tabelas pré-formatadas.
+
+O arredondamento é o mesmo do `format()` do Python (sobre o valor binário
+exato): 0.25 vira "0,2" e 0.35 vira "0,3".
+
+As tabelas paginadas do dashboard (/api/tabela/{secao}) saem sem formatação:
+a única coluna numérica delas é `solicitacao_id`, um identificador, que não
+leva separador de milhares. Contagens e percentuais de tabelas HTML usam
+estas funções.
+
+Comparação com a formatação valor a valor: benchmarks/benchmark_formatacao.py
+"""
+
+import math
+
+import numpy as np
+import polars as pl
+
+# Inteiros não negativos abaixo deste valor já vêm formatados
+LIMITE_INTEIROS = 10_000
+
+_INTEIROS = tuple(f"{n:,}".replace(",", ".") for n in range(LIMITE_INTEIROS))
+_INTEIROS_SERIE = pl.Series(_INTEIROS, dtype=pl.String)
+
+# Grupos de 3 dígitos depois do primeiro separador ("000" a "999")
+_TRIOS = pl.Series([f"{n:03d}" for n in range(1000)], dtype=pl.String)
+
+# Abaixo deste tamanho as funções por coluna formatam valor a valor: para
+# poucos valores (rótulos de um gráfico) o custo fixo do Polars é maior.
+# Os decimais só passam a ganhar entre 2 e 5 mil valores
+# (benchmarks/benchmark_formatacao.py --lotes 1000 2000 5000)
+LIMITE_POR_VALOR = 5000
+
+
+def formatar_numero_br(numero):
+    """
+    Formata números no padrão brasileiro:
+    - Ponto para separar milhares
+    - Vírgula para separar decimais
+    """
+    # Caminho rápido: contagens pequenas (a maioria dos KPIs e rótulos)
+    if type(numero) is int and 0 <= numero < LIMITE_INTEIROS:
+        return _INTEIROS[numero]
+
+    if numero is None:
+        return "0"
+
+    # Converter para float se for string
+    try:
+        if isinstance(numero, str):
+            numero = float(numero)
+    except (ValueError, TypeError):
+        return str(numero)
+
+    # NaN/inf: sem formatação (int() falharia)
+    if not math.isfinite(numero):
+        return str(numero)
+
+    # Se for inteiro, não mostrar decimais
+    if numero == int(numero):
+        inteiro = int(numero)
+        if 0 <= inteiro < LIMITE_INTEIROS:
+            return _INTEIROS[inteiro]
+        return f"{inteiro:,}".replace(",", ".")
+    else:
+        # Formatar com 1 casa decimal
+        return f"{numero:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def formatar_moeda_br(valor, casas=2):
+    """
+    Formata valores monetários no padrão brasileiro:
+    - R$ 1.000,00
+    - R$ 1.000 (casas=0, valores arredondados em cards de KPI)
+    """
+    if valor is None:
+        valor = 0.0
+
+    try:
+        if isinstance(valor, str):
+            valor = float(valor)
+    except (ValueError, TypeError):
+        return str(valor)
+
+    return f"R$ {valor:,.{casas}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _serie(valores):
+    """Series numérica a partir de Series, array NumPy ou lista (nulos viram 0)"""
+    if not isinstance(valores, pl.Series):
+        valores = pl.Series(valores, strict=False)
+    return valores.fill_null(0)
+
+
+def _milhares(inteiros):
+    """
+    Texto com milhares de uma Series inteira não negativa.
+
+    Cada grupo de 3 dígitos é um `gather` nas tabelas pré-formatadas (o
+    primeiro grupo sem zeros à esquerda, os demais com), unidos por ".".
+    """
+    if inteiros.len() == 0 or inteiros.max() < LIMITE_INTEIROS:
+        return _INTEIROS_SERIE.gather(inteiros)
+
+    grupos = -(-len(str(inteiros.max())) // 3)
+    valor = pl.lit(inteiros)
+    partes = []
+    for k in reversed(range(grupos)):
+        grupo = valor // 1000**k % 1000
+        inicial = pl.lit(_INTEIROS_SERIE).gather(grupo)
+        completo = pl.lit(_TRIOS).gather(grupo)
+        if k == grupos - 1:
+            parte = pl.when(valor >= 1000**k).then(inicial)
+        elif k == 0:
+            parte = pl.when(valor < 1000).then(inicial).otherwise(completo)
+        else:
+            # Grupos acima do primeiro dígito ficam nulos (e sem separador)
+            parte = (
+                pl.when(valor < 1000**k).then(None)
+                .when(valor < 1000 ** (k + 1)).then(inicial)
+                .otherwise(completo)
+            )
+        partes.append(parte)
+    return pl.select(pl.concat_str(partes, separator=".", ignore_nulls=True)).to_series()
+
+
+def _com_sinal(negativos, texto):
+    if not negativos.any():
+        return texto
+    return pl.select(
+        pl.when(pl.lit(negativos))
+        .then(pl.concat_str([pl.lit("-"), pl.lit(texto)]))
+        .otherwise(pl.lit(texto))
+    ).to_series()
+
+
+def _unidades(absoluto, casas):
+    """
+    round(absoluto * 10**casas) como Int64, com o arredondamento do format()
+    (`absoluto * 10**casas` abaixo de 2**53).
+
+    O produto em ponto flutuante pode cair exatamente em um empate (x,5) que o
+    valor exato não tem (0.35 * 10 == 3.5, mas 0.35 é 0.34999...); só essas
+    linhas, raras, são decididas pelo próprio format().
+    """
+    escalado = absoluto * 10**casas
+    unidades = escalado.round(0).cast(pl.Int64)
+    empates = (escalado - escalado.floor() == 0.5).arg_true()
+    if len(empates):
+        unidades = unidades.scatter(
+            empates,
+            [int(f"{a:.{casas}f}".replace(".", "")) for a in absoluto.gather(empates)],
+        )
+    return unidades
+
+
+def _absoluto(inteiros):
+    """|inteiros| como UInt64: o abs() de -2**63 não cabe em Int64"""
+    if not inteiros.dtype.is_signed_integer():
+        return inteiros
+    valor = pl.lit(inteiros.cast(pl.Int64))
+    negativo = valor < 0
+    return pl.select(
+        # -(v + 1) cabe em Int64 para todo negativo; o +1 volta já sem sinal
+        pl.when(negativo).then(-(valor + 1)).otherwise(valor).cast(pl.UInt64)
+        + negativo.cast(pl.UInt64)
+    ).to_series()
+
+
+def _texto_inteiros(serie):
+    """Texto de uma Series inteira (Int*/UInt*), com milhares"""
+    return _com_sinal(serie < 0, _milhares(_absoluto(serie)))
+
+
+def _texto_fixo(serie, casas):
+    """Texto de uma Series Float64 finita com `casas` decimais"""
+    # Acima de 2**53 o valor escalado não é mais exato (nem cabe em Int64,
+    # a partir de ~9e18): essas linhas, raras, vêm do próprio format()
+    grandes = serie.abs() * 10**casas >= 2**53
+    if grandes.any():
+        texto = serie.cast(pl.String)
+        pequenos = ~grandes
+        if pequenos.any():
+            texto = texto.scatter(pequenos.arg_true(), _texto_fixo(serie.filter(pequenos), casas))
+        return texto.scatter(
+            grandes.arg_true(),
+            [_decimal_br(v, casas) for v in serie.filter(grandes).to_list()],
+        )
+
+    unidades = _unidades(serie.abs(), casas)
+    escala = 10**casas
+    texto = _milhares(unidades // escala)
+    if casas:
+        texto = pl.select(
+            pl.concat_str(
+                [
+                    pl.lit(texto),
+                    pl.lit(","),
+                    (pl.lit(unidades) % escala).cast(pl.String).str.zfill(casas),
+                ]
+            )
+        ).to_series()
+    # signbit: o -0.0 também leva sinal, como no format()
+    return _com_sinal(pl.Series(np.signbit(serie.to_numpy())), texto)
+
+
+def _decimal_br(numero, casas):
+    if not math.isfinite(numero):
+        return str(numero)
+    return f"{numero:,.{casas}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _formatar_finitos(serie, formatar):
+    """Aplica `formatar` às linhas finitas; NaN/inf ficam como em str() ("nan", "inf")"""
+    finitos = serie.is_finite()
+    if finitos.all():
+        return formatar(serie)
+    texto = serie.cast(pl.String).str.replace("NaN", "nan", literal=True)
+    return texto.scatter(finitos.arg_true(), formatar(serie.filter(finitos)))
+
+
+def _sem_zero_negativo(serie):
+    """-0.0 vira 0.0 (o int() do formatar_numero_br descarta o sinal do zero)"""
+    return pl.select(
+        pl.when(pl.lit(serie) == 0).then(0.0).otherwise(pl.lit(serie))
+    ).to_series()
+
+
+def formatar_numeros_br(valores):
+    """
+    Versão vetorizada de `formatar_numero_br`: inteiros sem casas decimais,
+    os demais com 1 casa. Retorna uma Series de texto.
+    """
+    serie = _serie(valores)
+    if serie.len() < LIMITE_POR_VALOR:
+        return pl.Series([formatar_numero_br(v) for v in serie.to_list()], dtype=pl.String)
+    if serie.dtype.is_integer():
+        return _texto_inteiros(serie)
+
+    serie = serie.cast(pl.Float64)
+
+    def formatar(finitos):
+        inteiros = finitos == finitos.floor()
+        if inteiros.all():
+            return _texto_fixo(_sem_zero_negativo(finitos), 0)
+        texto = _texto_fixo(finitos, 1)
+        if inteiros.any():
+            texto = texto.scatter(
+                inteiros.arg_true(),
+                _texto_fixo(_sem_zero_negativo(finitos.filter(inteiros)), 0),
+            )
+        return texto
+
+    return _formatar_finitos(serie, formatar)
+
+
+def formatar_decimais_br(valores, casas=1):
+    """Números com exatamente `casas` decimais (ex.: percentuais "12,5")"""
+    serie = _serie(valores).cast(pl.Float64)
+    if serie.len() < LIMITE_POR_VALOR:
+        return pl.Series([_decimal_br(v, casas) for v in serie.to_list()], dtype=pl.String)
+    return _formatar_finitos(serie, lambda finitos: _texto_fixo(finitos, casas))
+
+
+def formatar_moedas_br(valores, casas=2):
+    """Versão vetorizada de `formatar_moeda_br` ("R$ 1.234,56")"""
+    return "R$ " + formatar_decimais_br(valores, casas)
@@ -0,0 +1,198 @@
+"""
+Ingestão dos CSVs de datasets/ em Parquet tipado - GIV-Saúde (app.py)
+=====================================================================
+
+Converte uma única vez `datasets/*.csv` em Parquet com tipos definidos,
+para que o `/task` do app.py não precise inferir o schema do CSV nem
+converter textos a cada leitura:
+
+- colunas `*_id` viram inteiros (Int64) quando todos os valores são números;
+- colunas `data_*` viram Datetime; `data_solicitacao` é mantida como texto,
+  porque o /task a devolve como veio, e ganha a coluna `solicitacao_dt`
+  já convertida;
+- colunas de texto com poucos valores distintos (status, risco,
+  especialidade, ...) viram Categorical.
+
+`solicitacao` é particionada por `solicitacao_status` (diretórios
+`solicitacao_status=<valor>/`, no padrão hive): o /task filtra por status e
+lê só a partição pedida. As demais tabelas viram um arquivo cada.
+
+A saída é montada em `<destino>.tmp` e trocada de uma vez; `manifesto.json`
+guarda a assinatura (mtime, tamanho) de cada CSV de origem. O app.py só usa
+o Parquet enquanto as assinaturas batem; se um CSV mudar, volta a ler o CSV
+até a próxima ingestão.
+
+Uso:
+    python ingerir_datasets.py
+    python ingerir_datasets.py --origem datasets --destino datasets/parquet
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import polars as pl
+
+DIRETORIO_ORIGEM = "datasets"
+DIRETORIO_PARQUET = os.path.join("datasets", "parquet")
+MANIFESTO = "manifesto.json"
+
+# Formato de data_solicitacao no CSV (ex.: "2025-01-10 10:00:00.000 UTC")
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S%.f %Z"
+FORMATOS_DATA = [FORMATO_DATA, "%Y-%m-%d %H:%M:%S%.f", "%Y-%m-%d"]
+
+# Tabela -> coluna de partição
+PARTICOES = {"solicitacao": "solicitacao_status"}
+
+# Colunas de data devolvidas em texto pelo /task -> coluna Datetime acrescentada
+DATAS_EM_TEXTO = {"data_solicitacao": "solicitacao_dt"}
+
+# Texto com até este número de valores distintos (e repetição média >= 2) vira Categorical
+LIMITE_CATEGORIAS = 1000
+
+
+def _assinatura(caminho):
+    info = os.stat(caminho)
+    return {"mtime_ns": info.st_mtime_ns, "tamanho": info.st_size}
+
+
+def _tamanho(caminho):
+    if os.path.isfile(caminho):
+        return os.path.getsize(caminho)
+    return sum(
+        os.path.getsize(os.path.join(raiz, nome))
+        for raiz, _, nomes in os.walk(caminho)
+        for nome in nomes
+    )
+
+
+def _converter_data(serie):
+    """Datetime com o primeiro formato que não perde valores, ou None"""
+    for formato in FORMATOS_DATA:
+        convertida = serie.str.strptime(pl.Datetime, format=formato, strict=False)
+        if convertida.null_count() == serie.null_count():
+            return convertida
+    return None
+
+
+def tipar(df):
+    """Aplica os tipos do Parquet (ids, datas, categorias) às colunas de texto do CSV"""
+    colunas = []
+    for nome, tipo in df.schema.items():
+        serie = df[nome]
+
+        if nome.endswith("_id") and tipo == pl.String:
+            inteiro = serie.cast(pl.Int64, strict=False)
+            if inteiro.null_count() == serie.null_count():
+                serie = inteiro
+
+        elif nome.startswith("data_") and tipo == pl.String:
+            if nome in DATAS_EM_TEXTO:
+                colunas.append(
+                    serie.str.strptime(pl.Datetime, format=FORMATO_DATA, strict=False)
+                    .alias(DATAS_EM_TEXTO[nome])
+                )
+            else:
+                convertida = _converter_data(serie)
+                if convertida is not None:
+                    serie = convertida
+
+        elif tipo == pl.String:
+            distintos = serie.n_unique()
+            if distintos <= LIMITE_CATEGORIAS and distintos * 2 <= len(serie):
+                serie = serie.cast(pl.Categorical)
+
+        colunas.append(serie)
+    return pl.DataFrame(colunas)
+
+
+def converter(origem=None, destino=None):
+    """Converte `origem/*.csv` em Parquet tipado em `destino`; retorna o manifesto"""
+    origem = origem or DIRETORIO_ORIGEM
+    destino = destino or DIRETORIO_PARQUET
+    arquivos = sorted(glob.glob(os.path.join(origem, "*.csv")))
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhum CSV encontrado em {origem}/")
+
+    temporario = destino + ".tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    manifesto = {"gerado_em": datetime.now().isoformat(), "tabelas": {}}
+    for caminho in arquivos:
+        inicio = time.perf_counter()
+        tabela = os.path.splitext(os.path.basename(caminho))[0]
+        assinatura = _assinatura(caminho)
+
+        # Inferência sobre o arquivo inteiro (não só as primeiras linhas)
+        df = tipar(pl.read_csv(caminho, infer_schema_length=None))
+
+        particao = PARTICOES.get(tabela)
+        if particao in df.columns:
+            saida = os.path.join(temporario, tabela)
+            df.write_parquet(saida, partition_by=particao)
+        else:
+            saida = os.path.join(temporario, f"{tabela}.parquet")
+            df.write_parquet(saida)
+
+        manifesto["tabelas"][tabela] = {
+            "csv": os.path.basename(caminho),
+            **assinatura,
+            "linhas": df.height,
+            "particao": particao if particao in df.columns else None,
+            "bytes_parquet": _tamanho(saida),
+            "schema": {nome: str(tipo) for nome, tipo in df.schema.items()},
+        }
+        print(f"OK: {tabela}: {df.height:,} linhas, "
+              f"{assinatura['tamanho'] / 1e6:.1f} MB -> {_tamanho(saida) / 1e6:.1f} MB "
+              f"em {time.perf_counter() - inicio:.2f}s")
+
+    with open(os.path.join(temporario, MANIFESTO), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    # Troca o diretório inteiro: quem lê nunca vê uma conversão pela metade
+    antigo = destino + ".old"
+    shutil.rmtree(antigo, ignore_errors=True)
+    if os.path.exists(destino):
+        os.replace(destino, antigo)
+    os.replace(temporario, destino)
+    shutil.rmtree(antigo, ignore_errors=True)
+    return manifesto
+
+
+def ler_manifesto(destino=None):
+    """Manifesto da última ingestão, ou None se não há Parquet"""
+    caminho = os.path.join(destino or DIRETORIO_PARQUET, MANIFESTO)
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def parquet_atualizado(manifesto, origem=None, tabelas=()):
+    """True se os CSVs de `tabelas` não mudaram desde a ingestão do manifesto"""
+    origem = origem or DIRETORIO_ORIGEM
+    for tabela in tabelas:
+        registro = manifesto["tabelas"].get(tabela)
+        if registro is None:
+            return False
+        caminho = os.path.join(origem, registro["csv"])
+        if os.path.exists(caminho):
+            atual = _assinatura(caminho)
+            if (atual["mtime_ns"], atual["tamanho"]) != (registro["mtime_ns"], registro["tamanho"]):
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte datasets/*.csv em Parquet tipado")
+    parser.add_argument("--origem", default=None, help="diretório dos CSVs (padrão: datasets)")
+    parser.add_argument("--destino", default=None, help="diretório do Parquet (padrão: datasets/parquet)")
+    args = parser.parse_args()
+
+    converter(args.origem, args.destino)
@@ -5,19 +5,189 @@ Módulo de Machine Learning para Predição de Agravamentos em Saúde
 Este módulo implementa um modelo de ML que prediz a probabilidade de 
 agravamento de pacientes sem agendamento, baseado em dados históricos.
 
-Algoritmo: Random Forest Classifier
+Algoritmo: Random Forest Classifier (padrão) ou Histogram Gradient Boosting
 Features: Risco, Especialidade, Faixa Etária, Tempo de Espera, Status
+
+Artefatos:
+O treino roda offline (`python treinar_modelo.py`) e grava um artefato
+versionado em GIV_DIR_MODELOS (padrão `modelos/`) com o modelo, os
+encoders, as métricas, a importância das features e o hash do snapshot de
+dados usado. `modelos/atual.json` aponta para a versão ativa, que a API
+carrega na inicialização com `carregar_modelo_ativo()`.
+
+Troca do modelo em serviço:
+O modelo ativo é um objeto imutável depois de publicado. Um retreino (ver
+retreino.py) monta uma instância nova e a publica com `publicar_modelo()`,
+que só reatribui a referência global. Quem atende uma requisição pega
+`modelo_ativo()` uma vez e usa essa referência do início ao fim, então
+nunca vê encoders de uma versão com a floresta de outra.
+
+Cada processo (worker do uvicorn, dashboard) tem o seu modelo em serviço:
+`modelo_ativo()` confere `atual.json` a cada
+GIV_INTERVALO_VERIFICACAO_MODELO segundos e, se outro processo apontou uma
+versão nova (retreino em outro worker, treinar_modelo.py), a carrega e a
+publica. As funções registradas com `ao_trocar_modelo()` rodam após cada
+publicação (ex.: limpar caches calculados com o modelo anterior).
+
+Configuração do treino:
+- GIV_ALGORITMO_ML: "floresta" (RandomForestClassifier, 100 árvores) ou
+  "hist_gb" (HistGradientBoostingClassifier: features discretizadas em
+  histogramas, treina em segundos sobre milhões de linhas);
+- GIV_LIMITE_TREINO: orçamento de linhas; acima dele o treino usa uma
+  amostra estratificada por risco e especialidade (0 = todas as linhas).
+Comparação de tempo, memória e AUC: benchmarks/benchmark_treino.py
 """
 
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import joblib
 import polars as pl
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 import warnings
+from floresta_numpy import FlorestaVetorizada, LINHAS_VANTAGEM
 warnings.filterwarnings('ignore')
 
+DIRETORIO_MODELOS = os.getenv("GIV_DIR_MODELOS", "modelos")
+PONTEIRO_ATUAL = "atual.json"
+
+# Versão do layout do artefato; artefatos de outro formato são recusados
+FORMATO_ARTEFATO = 3
+
+# Probabilidade acima da qual a predição é "agravamento" (0.5 = predict())
+LIMIAR_PADRAO = float(os.getenv("GIV_LIMIAR_ML", "0.5"))
+
+# Faixas de risco ML sobre a probabilidade de agravamento
+LIMIAR_ALTO_RISCO = 0.7
+LIMIAR_MEDIO_RISCO = 0.4
+
+# Motor de inferência da floresta (resultados bit a bit iguais):
+# "auto" = floresta_numpy até LINHAS_VANTAGEM linhas, scikit-learn acima;
+# "numpy" = sempre floresta_numpy; "sklearn" = sempre predict_proba
+MOTOR_ML = os.getenv("GIV_MOTOR_ML", "auto")
+
+# Estimador do treino (chave -> nome exibido na API e no dashboard)
+ALGORITMOS = {
+    "floresta": "Random Forest Classifier",
+    "hist_gb": "Histogram Gradient Boosting Classifier",
+}
+ALGORITMO_ML = os.getenv("GIV_ALGORITMO_ML", "floresta")
+
+# Linhas usadas no treino (0 = todas); acima disso, amostra estratificada
+LIMITE_LINHAS_TREINO = int(os.getenv("GIV_LIMITE_TREINO", "0"))
+ESTRATOS_AMOSTRA = ["solicitacao_risco", "procedimento_especialidade"]
+
+# Linhas do conjunto de teste usadas na importância por permutação (hist_gb)
+LINHAS_IMPORTANCIA = 20_000
+
+
+def simular_agravamento(df, seed=42):
+    """
+    Acrescenta a coluna `agravamento` (0/1) simulada a partir do risco e do
+    tempo de espera (regras de negócio + ruído).
+
+    Para cada linha:
+        prob = base(risco, tempo) + N(0, 0.1), limitada a [0, 1]
+        agravamento = 1 se U(0, 1) < prob
+
+    Versão vetorizada do antigo laço linha a linha: a probabilidade base é
+    uma expressão Polars e o ruído e o sorteio são gerados em lote por um
+    `RandomState(seed)` próprio (o estado global do NumPy não é alterado).
+    A distribuição por linha é a mesma do laço e o resultado é
+    reprodutível para a mesma semente; os valores individuais diferem do
+    laço porque a ordem dos sorteios não é mais intercalada.
+    """
+    risco = (
+        pl.col('solicitacao_risco').cast(pl.String)
+        if 'solicitacao_risco' in df.columns else pl.lit('AZUL')
+    )
+    tempo = (
+        pl.col('tempo_espera_dias').cast(pl.Float64).fill_null(0)
+        if 'tempo_espera_dias' in df.columns else pl.lit(0.0)
+    )
+
+    prob_base = (
+        pl.when(risco == 'VERMELHO').then(0.7 + (tempo / 100) * 0.2)
+        .when(risco == 'AMARELO').then(0.4 + (tempo / 150) * 0.2)
+        .when(risco == 'VERDE').then(0.15 + (tempo / 200) * 0.1)
+        .when(risco == 'AZUL').then(0.05 + (tempo / 250) * 0.05)
+        .otherwise(0.1 + (tempo / 300) * 0.05)  # DESCONHECIDO ou outros
+    )
+    prob = df.select(prob_base.alias('prob')).to_series().to_numpy()
+
+    rng = np.random.RandomState(seed)
+    ruido = rng.normal(0, 0.1, len(prob))
+    sorteio = rng.random_sample(len(prob))
+
+    prob = np.clip(prob + ruido, 0.0, 1.0)
+    return df.with_columns(
+        pl.Series('agravamento', (sorteio < prob).astype(np.int64))
+    )
+
+
+def amostrar_estratificado(df, limite, estratos=None, seed=42):
+    """
+    Amostra de ~`limite` linhas com a mesma proporção de cada estrato
+    (padrão: risco x especialidade) do DataFrame original.
+
+    Cada estrato contribui com round(tamanho * limite / total) linhas,
+    no mínimo uma, sorteadas sem reposição; estratos raros não somem da
+    amostra. `df` com até `limite` linhas volta inteiro.
+    """
+    if not limite or df.height <= limite:
+        return df
+
+    estratos = [c for c in (estratos or ESTRATOS_AMOSTRA) if c in df.columns]
+    fracao = limite / df.height
+    if not estratos:
+        return df.sample(n=limite, seed=seed)
+
+    ordem = pl.int_range(pl.len()).shuffle(seed=seed).over(estratos)
+    cota = (pl.len().over(estratos) * fracao).round().clip(lower_bound=1)
+    return df.filter(ordem < cota)
+
+
+class CodificadorCategorico:
+    """
+    Codificação estável de uma coluna categórica (ajustar/transformar)
+    
+    O mapeamento valor -> código é congelado no treino (valores ordenados,
+    códigos 0..n-1), salvo junto com o modelo e aplicado com `replace_strict`.
+    Valores que não existiam no treino caem no código DESCONHECIDO.
+    """
+    
+    DESCONHECIDO = -1
+    
+    def __init__(self, valor_nulo="DESCONHECIDA"):
+        self.valor_nulo = valor_nulo
+        self.mapa = None
+    
+    def ajustar(self, serie):
+        """Congela o mapeamento a partir dos valores de `serie`"""
+        valores = serie.cast(pl.String).fill_null(self.valor_nulo).unique().sort()
+        self.mapa = {valor: codigo for codigo, valor in enumerate(valores.to_list())}
+        return self
+    
+    def transformar(self, coluna):
+        """Expressão Polars com o código (Int32) de cada valor de `coluna`"""
+        if self.mapa is None:
+            raise RuntimeError("Codificador não ajustado: chame ajustar() no treino")
+        return (
+            pl.col(coluna)
+            .cast(pl.String)
+            .fill_null(self.valor_nulo)
+            .replace_strict(self.mapa, default=self.DESCONHECIDO, return_dtype=pl.Int32)
+        )
+
+
 class ModeloPredicaoAgravamento:
     """
     Modelo de Machine Learning para predição de agravamentos
@@ -29,11 +199,27 @@ class ModeloPredicaoAgravamento:
         self.feature_importance = None
         self.metricas = {}
         self.treinado = False
-        
-    def preparar_features(self, df):
+        self.floresta = None  # FlorestaVetorizada do modelo (GIV_MOTOR_ML)
+        
+        # Identificação do artefato (preenchida por treinar/carregar)
+        self.features = None
+        self.versao = None
+        self.treinado_em = None
+        self.hash_dados = None
+        self.algoritmo = None
+        self.arquivo = None  # caminho do artefato salvo/carregado
+        # Linhas originais do conjunto de teste (só após treinar; não vão
+        # para o artefato): o retreino avalia candidato e ativo sobre elas
+        self.amostra_teste = None
+        
+    def preparar_features(self, df, ajustar=False):
         """
         Feature Engineering: Extração e transformação de características
         
+        Com `ajustar=True` (treino) os encoders são ajustados aos dados; na
+        predição são apenas aplicados, então o código de cada especialidade
+        não depende do lote avaliado.
+        
         Features utilizadas:
         1. solicitacao_risco (categórica) → Nível de risco do paciente
         2. procedimento_especialidade (categórica) → Especialidade médica
@@ -42,8 +228,9 @@ class ModeloPredicaoAgravamento:
         5. status_critico (binária) → Se status indica situação crítica
         """
         
-        # Criar cópia para não modificar original
-        df_features = df.clone()
+        # Criar cópia para não modificar original; colunas Categorical
+        # (snapshot) viram texto para as transformações abaixo
+        df_features = df.with_columns(pl.col(pl.Categorical).cast(pl.String))
         
         # Feature 1: Risco (já categórica, vamos codificar)
         if 'solicitacao_risco' in df_features.columns:
@@ -57,13 +244,30 @@ class ModeloPredicaoAgravamento:
                 pl.col('solicitacao_risco').replace(risco_map, default=0).alias('risco_numerico')
             )
         
-        # Feature 2: Tempo de espera (simulado se não existir)
-        # Em produção, seria calculado: data_atual - data_solicitacao
-        if 'data_solicitacao' not in df_features.columns:
-            # Simulação baseada no risco (mais crítico = mais urgente)
-            np.random.seed(42)
+        # Feature 2: Tempo de espera: dias desde data_solicitacao até agora
+        # (simulado se a coluna não existir)
+        if 'data_solicitacao' in df_features.columns:
+            tipo = df_features.schema['data_solicitacao']
+            data = pl.col('data_solicitacao')
+            if tipo == pl.String:
+                data = data.str.to_datetime(strict=False)
+            hoje = datetime.now()
+            if isinstance(tipo, pl.Datetime) and tipo.time_zone:
+                # Com fuso: compara em UTC
+                data = data.dt.convert_time_zone('UTC')
+                hoje = datetime.now(timezone.utc)
+            df_features = df_features.with_columns(
+                ((hoje - data).dt.total_seconds() / 86400)
+                .fill_null(0)
+                .alias('tempo_espera_dias')
+            )
+        else:
+            # Simulação baseada no risco (mais crítico = mais urgente); o
+            # RandomState próprio não mexe no estado global do NumPy, usado
+            # por outras threads (retreino, amostragem)
+            rng = np.random.RandomState(42)
             df_features = df_features.with_columns(
-                pl.lit(np.random.randint(1, 120, len(df_features))).alias('tempo_espera_dias')
+                pl.lit(rng.randint(1, 120, len(df_features))).alias('tempo_espera_dias')
             )
         
         # Feature 3: Faixa Etária (codificar categorias)
@@ -78,29 +282,31 @@ class ModeloPredicaoAgravamento:
         else:
             df_features = df_features.with_columns(pl.lit(40).alias('idade_aproximada'))
         
-        # Feature 4: Especialidade (label encoding)
+        # Feature 4: Especialidade (label encoding congelado no treino)
         if 'procedimento_especialidade' in df_features.columns:
             # Primeiro, substituir nulos por "DESCONHECIDA"
             df_features = df_features.with_columns(
                 pl.col('procedimento_especialidade').fill_null("DESCONHECIDA")
             )
             
-            # Agora obter todas as especialidades únicas (incluindo "DESCONHECIDA")
-            especialidades_unicas = df_features['procedimento_especialidade'].unique().to_list()
-            
-            # Criar mapeamento incluindo "DESCONHECIDA"
-            esp_map = {esp: idx for idx, esp in enumerate(especialidades_unicas)}
+            if ajustar:
+                self.encoders['especialidade'] = CodificadorCategorico().ajustar(
+                    df_features['procedimento_especialidade']
+                )
             
             df_features = df_features.with_columns(
-                pl.col('procedimento_especialidade')
-                .replace(esp_map)
+                self.encoders['especialidade']
+                .transformar('procedimento_especialidade')
                 .alias('especialidade_codigo')
             )
-            
-            self.encoders['especialidade'] = esp_map
         
-        # Feature 5: Status crítico (se contém palavras-chave)
-        if 'solicitacao_status' in df_features.columns:
+        # Feature 5: Status crítico (se contém palavras-chave); o carregador
+        # já entrega o indicador pronto em `is_critico`
+        if 'is_critico' in df_features.columns:
+            df_features = df_features.with_columns(
+                pl.col('is_critico').cast(pl.Int32).alias('status_critico')
+            )
+        elif 'solicitacao_status' in df_features.columns:
             df_features = df_features.with_columns(
                 pl.col('solicitacao_status')
                 .str.contains('CRITICO|URGENTE|GRAVE')
@@ -124,62 +330,60 @@ class ModeloPredicaoAgravamento:
         
         Em produção, isso viria de dados históricos reais de outcomes
         """
-        df_target = df.clone()
-        
         # Simulação de agravamento baseada em regras + aleatoriedade
-        np.random.seed(42)
-        
-        # Probabilidades base por risco
-        prob_agravamento = []
-        for i in range(len(df_target)):
-            row = df_target.row(i, named=True)
-            
-            risco = row.get('solicitacao_risco', 'AZUL')
-            tempo = row.get('tempo_espera_dias', 0)
-            
-            # Probabilidade base
-            if risco == 'VERMELHO':
-                prob = 0.7 + (tempo / 100) * 0.2
-            elif risco == 'AMARELO':
-                prob = 0.4 + (tempo / 150) * 0.2
-            elif risco == 'VERDE':
-                prob = 0.15 + (tempo / 200) * 0.1
-            elif risco == 'AZUL':
-                prob = 0.05 + (tempo / 250) * 0.05
-            else:  # DESCONHECIDO ou outros
-                prob = 0.1 + (tempo / 300) * 0.05
-            
-            # Adiciona aleatoriedade
-            prob = min(prob + np.random.normal(0, 0.1), 1.0)
-            prob = max(prob, 0.0)
-            
-            agravou = 1 if np.random.random() < prob else 0
-            prob_agravamento.append(agravou)
-        
-        df_target = df_target.with_columns(
-            pl.Series('agravamento', prob_agravamento)
-        )
-        
-        return df_target
+        return simular_agravamento(df, seed=42)
     
-    def treinar(self, df):
+    @staticmethod
+    def criar_estimador(algoritmo):
+        """Estimador não treinado para a chave `algoritmo` (ver ALGORITMOS)"""
+        if algoritmo == "floresta":
+            return RandomForestClassifier(
+                n_estimators=100,        # 100 árvores de decisão
+                max_depth=10,            # Profundidade máxima
+                min_samples_split=20,    # Mínimo de amostras para split
+                min_samples_leaf=10,     # Mínimo de amostras por folha
+                random_state=42,
+                n_jobs=-1                # Usar todos os cores
+            )
+        if algoritmo == "hist_gb":
+            return HistGradientBoostingClassifier(
+                max_iter=200,            # Iterações de boosting (árvores)
+                learning_rate=0.1,
+                max_leaf_nodes=31,
+                min_samples_leaf=20,
+                early_stopping=True,     # Para quando a validação estabiliza
+                random_state=42
+            )
+        raise ValueError(f"Algoritmo desconhecido: {algoritmo} (use {', '.join(ALGORITMOS)})")
+    
+    def treinar(self, df, algoritmo=None, limite_linhas=None):
         """
         Treina o modelo de Machine Learning
         
         Processo:
+        0. Amostra estratificada por risco/especialidade, se `df` passa de
+           `limite_linhas` (padrão GIV_LIMITE_TREINO; 0 = todas as linhas)
         1. Feature Engineering
         2. Criação do target
         3. Split treino/teste (80/20)
-        4. Treinamento do Random Forest
+        4. Treinamento do estimador `algoritmo` (padrão GIV_ALGORITMO_ML)
         5. Avaliação de métricas
         """
+        algoritmo = algoritmo or ALGORITMO_ML
+        limite_linhas = LIMITE_LINHAS_TREINO if limite_linhas is None else limite_linhas
+        estimador = self.criar_estimador(algoritmo)
         
         print("🤖 INICIANDO TREINAMENTO DO MODELO DE ML")
         print("=" * 60)
         
+        total_disponivel = len(df)
+        df = amostrar_estratificado(df, limite_linhas)
+        if len(df) < total_disponivel:
+            print(f"🎲 Amostra estratificada: {len(df):,} de {total_disponivel:,} linhas")
+        
         # 1. Preparar features
         print("📊 Passo 1: Feature Engineering...")
-        df_prep = self.preparar_features(df)
+        df_prep = self.preparar_features(df, ajustar=True)
         df_prep = self.criar_target(df_prep)
         
         # Selecionar colunas de features
@@ -188,6 +392,7 @@ class ModeloPredicaoAgravamento:
         
         # Verificar se todas as features existem
         feature_cols_existentes = [col for col in feature_cols if col in df_prep.columns]
+        self.features = feature_cols_existentes
         
         # Converter para numpy arrays
         X = df_prep.select(feature_cols_existentes).to_numpy()
@@ -199,25 +404,22 @@ class ModeloPredicaoAgravamento:
         
         # 2. Split treino/teste
         print("\n📊 Passo 2: Divisão Treino/Teste (80/20)...")
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+        X_train, X_test, y_train, y_test, _, indices_teste = train_test_split(
+            X, y, np.arange(len(X)), test_size=0.2, random_state=42, stratify=y
         )
+        self.amostra_teste = df[indices_teste].with_columns(pl.Series('agravamento', y_test))
         print(f"   ✅ Treino: {len(X_train):,} amostras")
         print(f"   ✅ Teste: {len(X_test):,} amostras")
         
         # 3. Treinamento do modelo
-        print("\n🌲 Passo 3: Treinando Random Forest Classifier...")
-        self.modelo = RandomForestClassifier(
-            n_estimators=100,        # 100 árvores de decisão
-            max_depth=10,            # Profundidade máxima
-            min_samples_split=20,    # Mínimo de amostras para split
-            min_samples_leaf=10,     # Mínimo de amostras por folha
-            random_state=42,
-            n_jobs=-1                # Usar todos os cores
-        )
+        print(f"\n🌲 Passo 3: Treinando {ALGORITMOS[algoritmo]}...")
+        self.modelo = estimador
+        self.algoritmo = algoritmo
         
+        inicio = time.perf_counter()
         self.modelo.fit(X_train, y_train)
-        print("   ✅ Modelo treinado com sucesso!")
+        tempo_treino = time.perf_counter() - inicio
+        print(f"   ✅ Modelo treinado com sucesso! ({tempo_treino:.1f}s)")
         
         # 4. Avaliação
         print("\n📈 Passo 4: Avaliação do Modelo...")
@@ -244,7 +446,9 @@ class ModeloPredicaoAgravamento:
             'f1_score': f1,
             'auc_roc': auc_roc,
             'total_treino': len(X_train),
-            'total_teste': len(X_test)
+            'total_teste': len(X_test),
+            'total_disponivel': total_disponivel,
+            'tempo_treino_s': round(tempo_treino, 3)
         }
         
         print(f"   ✅ Acurácia: {acuracia:.1%}")
@@ -253,50 +457,61 @@ class ModeloPredicaoAgravamento:
         print(f"   ✅ F1-Score: {f1:.1%}")
         print(f"   ✅ AUC-ROC: {auc_roc:.3f}")
         
-        # 5. Feature Importance
+        # 5. Feature Importance (o boosting por histogramas não expõe
+        # feature_importances_: usa permutação sobre parte do teste)
+        if hasattr(self.modelo, 'feature_importances_'):
+            importancias = self.modelo.feature_importances_
+        else:
+            n = min(len(X_test), LINHAS_IMPORTANCIA)
+            importancias = permutation_importance(
+                self.modelo, X_test[:n], y_test[:n], scoring='roc_auc',
+                n_repeats=3, random_state=42
+            ).importances_mean
         self.feature_importance = {
             'features': feature_cols_existentes,
-            'importances': self.modelo.feature_importances_.tolist()
+            'importances': importancias.tolist()
         }
         
         print("\n🎯 Importância das Features:")
-        for feat, imp in zip(feature_cols_existentes, self.modelo.feature_importances_):
+        for feat, imp in zip(feature_cols_existentes, importancias):
             print(f"   {feat}: {imp:.3f}")
         
+        self.floresta = self._achatar(self.modelo)
         self.treinado = True
+        self.treinado_em = datetime.now().isoformat()
+        self.versao = datetime.now().strftime("%Y%m%d-%H%M%S")
         print("\n" + "=" * 60)
         print("✅ MODELO TREINADO COM SUCESSO!")
         print("=" * 60)
         
         return self.metricas
     
-    def predizer_agravamentos(self, df_sem_agendamento):
+    def predizer_agravamentos(self, df_sem_agendamento, limiar=None):
         """
         Prediz probabilidade de agravamento para pacientes sem agendamento
         
+        Uma única passada pelas árvores (predict_proba); a predição binária
+        sai da probabilidade com `limiar` (padrão GIV_LIMIAR_ML = 0.5, que
+        reproduz `predict()`).
+        
         Retorna DataFrame com colunas adicionais:
         - probabilidade_agravamento
-        - risco_ml (classificação ML)
+        - predicao_agravamento (probabilidade > limiar)
         """
         
         if not self.treinado:
-            print("⚠️ Modelo não treinado! Treinando agora...")
-            # Se não foi treinado, usa os próprios dados para treinar
-            # (em produção, usaria dados históricos separados)
-            self.treinar(df_sem_agendamento)
+            raise RuntimeError("Modelo não treinado: rode treinar_modelo.py")
         
         # Preparar features
         df_pred = self.preparar_features(df_sem_agendamento)
         
-        feature_cols = ['risco_numerico', 'tempo_espera_dias', 'idade_aproximada', 
-                       'especialidade_codigo', 'status_critico']
-        feature_cols_existentes = [col for col in feature_cols if col in df_pred.columns]
-        
-        X = df_pred.select(feature_cols_existentes).to_numpy()
+        # Mesmas features (e na mesma ordem) usadas no treino
+        X = df_pred.select(self.features).to_numpy()
         
         # Predições
-        probabilidades = self.modelo.predict_proba(X)[:, 1]
-        predicoes = self.modelo.predict(X)
+        limiar = LIMIAR_PADRAO if limiar is None else limiar
+        probabilidades = self.predict_proba(X)[:, 1]
+        predicoes = (probabilidades > limiar).astype(np.int64)
         
         # Adicionar ao DataFrame
         df_pred = df_pred.with_columns([
@@ -306,20 +521,160 @@ class ModeloPredicaoAgravamento:
         
         return df_pred
     
-    def calcular_metricas_predicao(self, df_predicoes):
+    @staticmethod
+    def _achatar(modelo):
+        """Floresta achatada para o motor NumPy, se o motor e o modelo permitem"""
+        if MOTOR_ML == "sklearn" or not isinstance(modelo, RandomForestClassifier):
+            return None
+        return FlorestaVetorizada(modelo)
+    
+    def predict_proba(self, X):
+        """predict_proba pelo motor configurado (GIV_MOTOR_ML)"""
+        if self.floresta is not None and (MOTOR_ML == "numpy" or len(X) <= LINHAS_VANTAGEM):
+            return self.floresta.predict_proba(X)
+        return self.modelo.predict_proba(X)
+    
+    def salvar(self, diretorio=None, hash_dados=None, ativar=True):
+        """
+        Grava o artefato versionado e, se `ativar`, o marca como versão ativa.
+        
+        Retorna o caminho do arquivo `modelo_agravamento_<versao>.joblib`.
+        """
+        if not self.treinado:
+            raise RuntimeError("Modelo não treinado: nada para salvar")
+        
+        diretorio = diretorio or DIRETORIO_MODELOS
+        os.makedirs(diretorio, exist_ok=True)
+        if hash_dados is not None:
+            self.hash_dados = hash_dados
+        
+        artefato = {
+            'formato': FORMATO_ARTEFATO,
+            'versao': self.versao,
+            'treinado_em': self.treinado_em,
+            'hash_dados': self.hash_dados,
+            'algoritmo': self.algoritmo,
+            'modelo': self.modelo,
+            'features': self.features,
+            'encoders': self.encoders,
+            'metricas': self.metricas,
+            'feature_importance': self.feature_importance,
+        }
+        
+        nome = f"modelo_agravamento_{self.versao}.joblib"
+        caminho = os.path.join(diretorio, nome)
+        joblib.dump(artefato, caminho + ".tmp")
+        os.replace(caminho + ".tmp", caminho)
+        self.arquivo = caminho
+        
+        print(f"💾 Artefato salvo: {caminho}")
+        if ativar:
+            self.ativar()
+        return caminho
+    
+    def ativar(self):
+        """Aponta `atual.json` (do diretório do artefato) para esta versão"""
+        if self.arquivo is None:
+            raise RuntimeError("Modelo sem artefato salvo: nada para ativar")
+        
+        # Ponteiro para a versão ativa, trocado atomicamente
+        diretorio, nome = os.path.split(self.arquivo)
+        ponteiro = os.path.join(diretorio, PONTEIRO_ATUAL)
+        with open(ponteiro + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({'arquivo': nome, 'versao': self.versao, 'hash_dados': self.hash_dados}, f, indent=2)
+        os.replace(ponteiro + ".tmp", ponteiro)
+    
+    def carregar(self, caminho=None):
+        """
+        Carrega um artefato (padrão: versão ativa em `atual.json`).
+        
+        Retorna True se carregou; False se não há artefato.
+        """
+        if caminho is None:
+            ponteiro = os.path.join(DIRETORIO_MODELOS, PONTEIRO_ATUAL)
+            if not os.path.exists(ponteiro):
+                return False
+            with open(ponteiro, encoding="utf-8") as f:
+                caminho = os.path.join(DIRETORIO_MODELOS, json.load(f)['arquivo'])
+        
+        artefato = joblib.load(caminho)
+        if artefato.get('formato') != FORMATO_ARTEFATO:
+            raise ValueError(
+                f"Artefato {caminho} no formato {artefato.get('formato')}, "
+                f"esperado {FORMATO_ARTEFATO}: treine novamente"
+            )
+        
+        self.modelo = artefato['modelo']
+        self.features = artefato['features']
+        self.encoders = artefato['encoders']
+        self.metricas = artefato['metricas']
+        self.feature_importance = artefato['feature_importance']
+        self.versao = artefato['versao']
+        self.treinado_em = artefato['treinado_em']
+        self.hash_dados = artefato['hash_dados']
+        self.algoritmo = artefato.get('algoritmo', 'floresta')
+        self.floresta = self._achatar(self.modelo)
+        self.arquivo = caminho
+        self.treinado = True
+        return True
+    
+    def info_artefato(self):
+        """Identificação do modelo ativo (para /status e /modelo/info)"""
+        return {
+            'versao': self.versao,
+            'treinado_em': self.treinado_em,
+            'hash_dados': self.hash_dados,
+            'algoritmo': self.algoritmo,
+            'features': self.features,
+        }
+    
+    def nome_algoritmo(self):
+        """Nome exibido do estimador (padrão: o configurado em GIV_ALGORITMO_ML)"""
+        return ALGORITMOS.get(self.algoritmo or ALGORITMO_ML, self.algoritmo)
+    
+    def parametros(self):
+        """Hiperparâmetros principais do estimador treinado"""
+        if self.modelo is None:
+            return None
+        chaves = {
+            'floresta': ['n_estimators', 'max_depth', 'min_samples_split', 'min_samples_leaf'],
+            'hist_gb': ['max_iter', 'learning_rate', 'max_leaf_nodes', 'min_samples_leaf'],
+        }.get(self.algoritmo, [])
+        parametros = self.modelo.get_params()
+        resultado = {chave: parametros[chave] for chave in chaves}
+        if hasattr(self.modelo, 'n_iter_'):
+            resultado['n_iter'] = int(self.modelo.n_iter_)  # após early stopping
+        return resultado
+    
+    def num_arvores(self):
+        """Árvores do modelo treinado (floresta: n_estimators; boosting: iterações)"""
+        if self.modelo is None:
+            return None
+        if hasattr(self.modelo, 'n_iter_'):
+            return int(self.modelo.n_iter_)
+        return len(self.modelo.estimators_)
+    
+    def calcular_metricas_predicao(self, df_predicoes, limiar=None):
         """
         Calcula métricas de predição para o dashboard
+        
+        Usa só as colunas de `predizer_agravamentos` (nenhuma nova inferência);
+        `limiar` deve ser o mesmo usado na predição.
         """
         
         total = len(df_predicoes)
-        
-        # Agravamentos por faixa de probabilidade
-        alto_risco = df_predicoes.filter(pl.col('probabilidade_agravamento') > 0.7).height
-        medio_risco = df_predicoes.filter(
-            (pl.col('probabilidade_agravamento') > 0.4) & 
-            (pl.col('probabilidade_agravamento') <= 0.7)
-        ).height
-        baixo_risco = df_predicoes.filter(pl.col('probabilidade_agravamento') <= 0.4).height
+        probabilidade = pl.col('probabilidade_agravamento')
+        
+        # Agravamentos por faixa de probabilidade (uma passada pelos dados)
+        faixas = df_predicoes.select(
+            (probabilidade > LIMIAR_ALTO_RISCO).sum().alias('alto'),
+            ((probabilidade > LIMIAR_MEDIO_RISCO) & (probabilidade <= LIMIAR_ALTO_RISCO)).sum().alias('medio'),
+            (probabilidade <= LIMIAR_MEDIO_RISCO).sum().alias('baixo'),
+            pl.col('predicao_agravamento').sum().alias('previstos'),
+        ).row(0, named=True)
+        alto_risco = faixas['alto']
+        medio_risco = faixas['medio']
+        baixo_risco = faixas['baixo']
         
         # Projeções
         agravamentos_30_dias = int(alto_risco * 0.9)  # 90% dos alto risco
@@ -338,7 +693,7 @@ class ModeloPredicaoAgravamento:
         df_esp = df_predicoes.group_by('procedimento_especialidade').agg([
             pl.count().alias('total'),
             pl.col('probabilidade_agravamento').mean().alias('prob_media'),
-            (pl.col('probabilidade_agravamento') > 0.7).sum().alias('alto_risco_count')
+            (pl.col('probabilidade_agravamento') > LIMIAR_ALTO_RISCO).sum().alias('alto_risco_count')
         ]).sort('prob_media', descending=True).head(10)
         
         especialidades_criticas = df_esp.to_dicts() if len(df_esp) > 0 else []
@@ -348,6 +703,8 @@ class ModeloPredicaoAgravamento:
             'alto_risco_ml': alto_risco,
             'medio_risco_ml': medio_risco,
             'baixo_risco_ml': baixo_risco,
+            'agravamentos_previstos': faixas['previstos'],
+            'limiar': LIMIAR_PADRAO if limiar is None else limiar,
             'agravamento_30_dias': agravamentos_30_dias,
             'agravamento_60_dias': agravamentos_60_dias,
             'agravamento_90_dias': agravamentos_90_dias,
@@ -359,7 +716,106 @@ class ModeloPredicaoAgravamento:
             'modelo_metricas': self.metricas
         }
 
-# Instância global do modelo
+# Intervalo mínimo (s) entre verificações de atual.json em modelo_ativo()
+INTERVALO_VERIFICACAO_MODELO = float(os.getenv("GIV_INTERVALO_VERIFICACAO_MODELO", "5"))
+
+# Instância global do modelo (versão ativa; trocada por publicar_modelo)
 modelo_global = ModeloPredicaoAgravamento()
 
+_ao_trocar = []            # funções chamadas após cada publicação
+_seguir_ponteiro = True    # False se o modelo veio de um caminho explícito
+_ponteiro_visto = None     # (mtime_ns, tamanho) de atual.json na última verificação
+_verificado_em = 0.0       # time.monotonic() da última verificação
+_lock_ponteiro = threading.Lock()
+
+
+def _assinatura_ponteiro():
+    try:
+        info = os.stat(os.path.join(DIRETORIO_MODELOS, PONTEIRO_ATUAL))
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _recarregar_se_mudou():
+    """Carrega e publica a versão de atual.json, se outro processo a trocou"""
+    global _ponteiro_visto, _verificado_em
+
+    agora = time.monotonic()
+    if not _seguir_ponteiro or agora - _verificado_em < INTERVALO_VERIFICACAO_MODELO:
+        return
+    # Uma thread verifica; as demais seguem com o modelo atual
+    if not _lock_ponteiro.acquire(blocking=False):
+        return
+    try:
+        _verificado_em = agora
+        assinatura = _assinatura_ponteiro()
+        if assinatura is None or assinatura == _ponteiro_visto:
+            return
+        _ponteiro_visto = assinatura
+
+        with open(os.path.join(DIRETORIO_MODELOS, PONTEIRO_ATUAL), encoding="utf-8") as f:
+            if json.load(f)['versao'] == modelo_global.versao:
+                return
+        novo = ModeloPredicaoAgravamento()
+        novo.carregar()
+        publicar_modelo(novo)
+        print(f"🔄 Modelo {novo.versao} carregado de {PONTEIRO_ATUAL} (trocado por outro processo)")
+    except Exception as e:
+        # Segue com o modelo atual; tenta de novo na próxima troca do ponteiro
+        print(f"ERRO ao recarregar o modelo de {PONTEIRO_ATUAL}: {e}")
+    finally:
+        _lock_ponteiro.release()
+
+
+def modelo_ativo():
+    """Modelo em serviço; pegue uma vez por requisição e use essa referência"""
+    _recarregar_se_mudou()
+    return modelo_global
+
+
+def ao_trocar_modelo(funcao):
+    """Registra `funcao()` para rodar após cada publicação de modelo"""
+    _ao_trocar.append(funcao)
+    return funcao
+
+
+def publicar_modelo(novo):
+    """Troca atômica do modelo em serviço (só reatribui a referência)"""
+    global modelo_global
+    if not novo.treinado:
+        raise RuntimeError("Só modelos treinados podem ser publicados")
+    modelo_global = novo
+    for funcao in _ao_trocar:
+        funcao()
+
+
+def ativar_e_publicar(novo):
+    """
+    Aponta `atual.json` para `novo` e o publica neste processo; os demais o
+    carregam na próxima verificação do ponteiro.
+    """
+    global _ponteiro_visto
+    with _lock_ponteiro:
+        novo.ativar()
+        publicar_modelo(novo)
+        _ponteiro_visto = _assinatura_ponteiro()
+
+
+def carregar_modelo_ativo(caminho=None):
+    """
+    Carrega o artefato ativo em uma instância nova e a publica.
+
+    Com `caminho` explícito, o processo deixa de acompanhar `atual.json`.
+    """
+    global _seguir_ponteiro, _ponteiro_visto
+    with _lock_ponteiro:
+        _seguir_ponteiro = caminho is None
+        _ponteiro_visto = _assinatura_ponteiro()
+        modelo = ModeloPredicaoAgravamento()
+        if not modelo.carregar(caminho):
+            return False
+        publicar_modelo(modelo)
+    return True
+
 
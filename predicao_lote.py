@@ -0,0 +1,218 @@
+"""
+Predição em Lote - Gestão Inteligente de Vagas (GIV-Saúde)
+==========================================================
+
+Pontua filas inteiras de regulação em uma única chamada. O corpo da
+requisição (array JSON, NDJSON ou Arrow IPC) vira um DataFrame, as linhas
+válidas passam por uma única chamada vetorizada do modelo e o resultado
+volta em NDJSON, uma linha por paciente, na ordem de entrada.
+
+Linhas inválidas não derrubam o lote: saem com `erro` preenchido e a
+predição nula. Só erros do lote inteiro (corpo ilegível, formato não
+suportado, mais de GIV_LIMITE_LOTE linhas) viram 400/413/415.
+
+Cada linha de entrada tem os campos do endpoint unitário:
+
+    {"risco": "VERMELHO", "especialidade": "CARDIOLOGIA", "faixa_etaria": "60 a 69"}
+
+Cada linha de saída:
+
+    {"indice": 0, "probabilidade_agravamento": 0.73, "predicao_agravamento": 1,
+     "classificacao": "Alto Risco", "erro": null}
+"""
+
+import io
+import json
+import os
+
+import polars as pl
+from fastapi import HTTPException
+
+from modelo_ml_saude import LIMIAR_ALTO_RISCO, LIMIAR_MEDIO_RISCO, modelo_ativo
+
+LIMITE_LINHAS = int(os.getenv("GIV_LIMITE_LOTE", "100000"))
+
+# Linhas serializadas por bloco da resposta em streaming
+LINHAS_POR_BLOCO = 5000
+
+# Campo de entrada -> coluna esperada pelo modelo
+CAMPOS = {
+    "risco": "solicitacao_risco",
+    "especialidade": "procedimento_especialidade",
+    "faixa_etaria": "paciente_faixa_etaria",
+}
+RISCOS_VALIDOS = ["VERMELHO", "AMARELO", "VERDE", "AZUL"]
+
+TIPOS_JSON = ("application/json",)
+TIPOS_NDJSON = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+TIPOS_ARROW = (
+    "application/vnd.apache.arrow.stream",
+    "application/vnd.apache.arrow.file",
+)
+
+
+def _verificar_limite(linhas):
+    if linhas > LIMITE_LINHAS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {linhas:,} linhas excede o limite de {LIMITE_LINHAS:,}",
+        )
+
+
+def _de_registros(registros, erros):
+    """Monta o DataFrame de entrada a partir de objetos JSON já decodificados"""
+    colunas = {campo: [None] * len(registros) for campo in CAMPOS}
+    for i, registro in enumerate(registros):
+        if erros[i] is not None:
+            continue
+        if not isinstance(registro, dict):
+            erros[i] = "Linha não é um objeto JSON"
+            continue
+        for campo in CAMPOS:
+            valor = registro.get(campo)
+            if valor is not None and not isinstance(valor, str):
+                erros[i] = f"Campo '{campo}' deve ser texto"
+                break
+            colunas[campo][i] = valor
+
+    return pl.DataFrame(
+        {**colunas, "erro": erros},
+        schema={**{campo: pl.String for campo in CAMPOS}, "erro": pl.String},
+    )
+
+
+def _ler_json(corpo):
+    try:
+        registros = json.loads(corpo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"JSON inválido: {e}")
+    if not isinstance(registros, list):
+        raise HTTPException(status_code=400, detail="O corpo deve ser um array JSON de objetos")
+    _verificar_limite(len(registros))
+    return _de_registros(registros, [None] * len(registros))
+
+
+def _ler_ndjson(corpo):
+    # Linha JSON malformada é erro só daquela linha
+    linhas = [linha for linha in corpo.splitlines() if linha.strip()]
+    _verificar_limite(len(linhas))
+    registros, erros = [], []
+    for linha in linhas:
+        try:
+            registros.append(json.loads(linha))
+            erros.append(None)
+        except ValueError:
+            registros.append(None)
+            erros.append("Linha não é um JSON válido")
+    return _de_registros(registros, erros)
+
+
+def _ler_arrow(corpo):
+    try:
+        if corpo[:6] == b"ARROW1":
+            df = pl.read_ipc(io.BytesIO(corpo))
+        else:
+            df = pl.read_ipc_stream(io.BytesIO(corpo))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Arrow IPC inválido: {e}")
+    _verificar_limite(df.height)
+
+    # Coluna ausente vira nula: cada linha sai com o erro de campo ausente
+    return df.select(
+        [
+            pl.col(campo).cast(pl.String, strict=False) if campo in df.columns
+            else pl.lit(None, dtype=pl.String).alias(campo)
+            for campo in CAMPOS
+        ]
+    ).with_columns(pl.lit(None, dtype=pl.String).alias("erro"))
+
+
+def ler_lote(corpo, tipo_conteudo):
+    """Decodifica o corpo conforme o Content-Type em um DataFrame de entrada"""
+    tipo = (tipo_conteudo or "application/json").split(";")[0].strip().lower()
+    if tipo in TIPOS_JSON:
+        return _ler_json(corpo)
+    if tipo in TIPOS_NDJSON:
+        return _ler_ndjson(corpo)
+    if tipo in TIPOS_ARROW:
+        return _ler_arrow(corpo)
+    raise HTTPException(
+        status_code=415,
+        detail=f"Content-Type não suportado: {tipo} "
+        f"(use {', '.join(TIPOS_JSON + TIPOS_NDJSON + TIPOS_ARROW)})",
+    )
+
+
+def validar(df):
+    """Preenche `erro` das linhas com campos ausentes ou risco desconhecido"""
+    df = df.with_columns(pl.col("risco").str.strip_chars().str.to_uppercase())
+
+    erro = pl.col("erro")
+    for campo in CAMPOS:
+        ausente = pl.col(campo).is_null() | (pl.col(campo).str.strip_chars() == "")
+        erro = pl.coalesce(
+            erro, pl.when(ausente).then(pl.lit(f"Campo obrigatório ausente: {campo}"))
+        )
+    erro = pl.coalesce(
+        erro,
+        pl.when(~pl.col("risco").is_in(RISCOS_VALIDOS)).then(
+            pl.format("Risco inválido: {}", pl.col("risco"))
+        ),
+    )
+
+    return df.with_row_index("indice").with_columns(erro.alias("erro"))
+
+
+def pontuar(df, limiar=None, modelo=None):
+    """
+    Pontua as linhas válidas em uma única passada do modelo
+    (`predicao_agravamento` = probabilidade > `limiar`; padrão: modelo ativo).
+
+    Retorna um DataFrame com uma linha por entrada, na ordem original.
+    """
+    validos = df.filter(pl.col("erro").is_null())
+
+    if validos.height:
+        entrada = validos.select(
+            [pl.col(campo).alias(coluna) for campo, coluna in CAMPOS.items()]
+        )
+        df_pred = (modelo or modelo_ativo()).predizer_agravamentos(entrada, limiar)
+        predicoes = validos.select("indice").with_columns(
+            df_pred["probabilidade_agravamento"].alias("probabilidade_agravamento"),
+            df_pred["predicao_agravamento"].cast(pl.Int8).alias("predicao_agravamento"),
+        )
+    else:
+        predicoes = pl.DataFrame(
+            schema={
+                "indice": pl.UInt32,
+                "probabilidade_agravamento": pl.Float64,
+                "predicao_agravamento": pl.Int8,
+            }
+        )
+
+    probabilidade = pl.col("probabilidade_agravamento")
+    return (
+        df.select("indice", "erro")
+        .join(predicoes, on="indice", how="left", maintain_order="left")
+        .with_columns(
+            pl.when(probabilidade > LIMIAR_ALTO_RISCO).then(pl.lit("Alto Risco"))
+            .when(probabilidade > LIMIAR_MEDIO_RISCO).then(pl.lit("Médio Risco"))
+            .when(probabilidade.is_not_null()).then(pl.lit("Baixo Risco"))
+            .alias("classificacao")
+        )
+        .select(
+            "indice", "probabilidade_agravamento", "predicao_agravamento",
+            "classificacao", "erro",
+        )
+    )
+
+
+def processar_lote(corpo, tipo_conteudo, limiar=None, modelo=None):
+    """Corpo da requisição -> DataFrame de resultados (roda no pool de CPU)"""
+    return pontuar(validar(ler_lote(corpo, tipo_conteudo)), limiar, modelo)
+
+
+def gerar_ndjson(resultado, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Serializa o resultado em blocos NDJSON, preservando a ordem"""
+    for inicio in range(0, resultado.height, linhas_por_bloco):
+        yield resultado.slice(inicio, linhas_por_bloco).write_ndjson().encode("utf-8")
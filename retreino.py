@@ -0,0 +1,250 @@
+"""
+Retreino em Segundo Plano - Gestão Inteligente de Vagas (GIV-Saúde)
+===================================================================
+
+Retreina o modelo de agravamento sem parar a API. O treino
+(`treinar_modelo.treinar(ativar=False)`) roda em um processo separado, sem
+disputar o GIL com as requisições, sobre o snapshot mais recente de db/ e
+grava um artefato candidato sem tocar em `atual.json`.
+
+De volta ao processo da API, uma thread supervisora:
+1. carrega o candidato em uma instância nova de ModeloPredicaoAgravamento;
+2. valida: AUC do candidato >= AUC do modelo ativo - GIV_TOLERANCIA_AUC,
+   os dois medidos nas mesmas linhas, o conjunto de teste do candidato (até
+   GIV_LINHAS_VALIDACAO); sem modelo ativo, qualquer candidato é aceito;
+3. pontua o snapshot com o candidato (scores_ml), para que a troca não
+   deixe requisições esperando a pontuação;
+4. aponta `atual.json` para o candidato e o publica (`ativar_e_publicar`);
+   as funções registradas em `ao_publicar` rodam após cada troca (ex.:
+   limpar caches de respostas calculadas com o modelo anterior).
+
+O modelo em serviço só muda no passo 4, por troca de referência: as
+requisições em andamento terminam com o modelo que pegaram no início.
+
+Com vários workers (uvicorn --workers N), cada um é um processo com o seu
+modelo e o seu agendamento. Um lock de arquivo em GIV_DIR_MODELOS
+(`retreino.lock`) garante um retreino por vez entre todos eles, e só o
+worker que detém `agendamento.lock` dispara o retreino periódico. Os demais
+carregam a versão nova quando `modelo_ativo()` percebe a troca de
+`atual.json` (ver modelo_ml_saude).
+
+Disparo:
+- POST /api/v1/ml/modelo/retreinar (usuário admin);
+- agendamento a cada GIV_INTERVALO_RETREINO segundos (0 desliga).
+
+Só um retreino roda por vez; o estado (ocioso, treinando, publicado,
+rejeitado, erro) e o último candidato do worker aparecem em
+/api/v1/ml/modelo/info.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sklearn.metrics import roc_auc_score
+
+import scores_ml
+import treinar_modelo
+from modelo_ml_saude import (
+    DIRETORIO_MODELOS,
+    ModeloPredicaoAgravamento,
+    ao_trocar_modelo,
+    ativar_e_publicar,
+    modelo_ativo,
+)
+
+INTERVALO_RETREINO = float(os.getenv("GIV_INTERVALO_RETREINO", "86400"))
+TOLERANCIA_AUC = float(os.getenv("GIV_TOLERANCIA_AUC", "0.01"))
+LINHAS_VALIDACAO = int(os.getenv("GIV_LINHAS_VALIDACAO", "100000"))
+
+_estado = {
+    "status": "ocioso",
+    "motivo": None,
+    "iniciado_em": None,
+    "concluido_em": None,
+    "candidato": None,
+    "erro": None,
+}
+_lock_estado = threading.Lock()
+
+_agendador = None
+_parar_agendador = threading.Event()
+
+# Locks de arquivo entre processos (workers): retreino em andamento e dono
+# do agendamento
+LOCK_RETREINO = os.path.join(DIRETORIO_MODELOS, "retreino.lock")
+LOCK_AGENDAMENTO = os.path.join(DIRETORIO_MODELOS, "agendamento.lock")
+
+
+def _atualizar(**campos):
+    with _lock_estado:
+        _estado.update(campos)
+
+
+def ao_publicar(funcao):
+    """
+    Registra `funcao()` para rodar após cada troca de modelo neste processo
+    (retreino aqui ou versão publicada por outro worker)
+    """
+    return ao_trocar_modelo(funcao)
+
+
+def _travar_arquivo(caminho):
+    """
+    Lock exclusivo, sem esperar, em `caminho`; retorna o arquivo aberto
+    (fechá-lo libera o lock) ou None se outro processo o detém. O sistema
+    libera o lock se o processo morrer.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    arquivo = open(caminho, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        arquivo.close()
+        return None
+    return arquivo
+
+
+def _treinar_em_processo(todos, diretorio):
+    """
+    Treina o candidato em um processo novo (spawn: sem herdar threads);
+    retorna (caminho do artefato, linhas de teste do candidato).
+    """
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+        return pool.submit(
+            treinar_modelo.treinar, todos, diretorio, ativar=False, linhas_teste=LINHAS_VALIDACAO
+        ).result()
+
+
+def auc_na_amostra(modelo, amostra):
+    """AUC de `modelo` nas linhas de `amostra` (coluna `agravamento` como alvo)"""
+    X = modelo.preparar_features(amostra).select(modelo.features).to_numpy()
+    try:
+        return roc_auc_score(amostra["agravamento"].to_numpy(), modelo.predict_proba(X)[:, 1])
+    except ValueError:
+        return 0.0  # uma classe só na amostra
+
+
+def validar_candidato(candidato, ativo, amostra):
+    """
+    (aprovado, motivo) comparando o AUC dos dois modelos nas mesmas linhas
+    (`amostra`, o teste do candidato): o AUC gravado no treino de cada um
+    vem de outra divisão treino/teste e de outros dados.
+    """
+    if not ativo.treinado:
+        return True, "sem modelo ativo"
+
+    auc_candidato = auc_na_amostra(candidato, amostra)
+    auc_ativo = auc_na_amostra(ativo, amostra)
+    if auc_candidato < auc_ativo - TOLERANCIA_AUC:
+        return False, f"AUC {auc_candidato:.4f} < {auc_ativo:.4f} - {TOLERANCIA_AUC:g}"
+    return True, f"AUC {auc_candidato:.4f} (ativo: {auc_ativo:.4f}, {amostra.height:,} linhas)"
+
+
+def _retreinar(todos, diretorio, trava):
+    inicio = time.perf_counter()
+    try:
+        caminho, amostra = _treinar_em_processo(todos, diretorio)
+
+        candidato = ModeloPredicaoAgravamento()
+        candidato.carregar(caminho)
+        aprovado, motivo = validar_candidato(candidato, modelo_ativo(), amostra)
+        _atualizar(candidato={**candidato.info_artefato(), "metricas": candidato.metricas})
+
+        if not aprovado:
+            print(f"⚠️ Candidato {candidato.versao} rejeitado: {motivo}")
+            _atualizar(status="rejeitado", erro=motivo)
+            return
+
+        # Pontua antes de publicar: a primeira requisição já acha o cache pronto
+        scores_ml.obter_pontuado(candidato)
+        ativar_e_publicar(candidato)
+        print(f"✅ Modelo {candidato.versao} publicado ({motivo}) "
+              f"em {time.perf_counter() - inicio:.1f}s")
+        _atualizar(status="publicado", erro=None)
+    except Exception as e:
+        # O modelo ativo segue em serviço
+        print(f"ERRO no retreino: {e}")
+        _atualizar(status="erro", erro=str(e))
+    finally:
+        _atualizar(concluido_em=datetime.now().isoformat())
+        trava.close()
+
+
+def solicitar_retreino(motivo="manual", todos=False, diretorio=None):
+    """
+    Dispara um retreino em segundo plano e retorna imediatamente.
+
+    Retorna False se já há um retreino em andamento (neste ou em outro
+    worker).
+    """
+    with _lock_estado:
+        if _estado["status"] == "treinando":
+            return False
+        trava = _travar_arquivo(LOCK_RETREINO)
+        if trava is None:
+            return False
+        _estado.update(
+            status="treinando",
+            motivo=motivo,
+            iniciado_em=datetime.now().isoformat(),
+            concluido_em=None,
+            erro=None,
+        )
+
+    print(f"🔄 Retreino iniciado ({motivo})")
+    threading.Thread(
+        target=_retreinar, args=(todos, diretorio, trava), name="giv-retreino", daemon=True
+    ).start()
+    return True
+
+
+def _agendar(intervalo):
+    # Só o dono de LOCK_AGENDAMENTO dispara; os demais workers tentam a cada
+    # intervalo (assumem se o dono encerrar)
+    dono = None
+    try:
+        while not _parar_agendador.wait(intervalo):
+            dono = dono or _travar_arquivo(LOCK_AGENDAMENTO)
+            if dono is not None:
+                solicitar_retreino("agendado")
+    finally:
+        if dono is not None:
+            dono.close()
+
+
+def iniciar_agendamento(intervalo=None):
+    """Inicia (uma vez) a thread que dispara o retreino periódico"""
+    global _agendador
+
+    intervalo = INTERVALO_RETREINO if intervalo is None else intervalo
+    if intervalo <= 0 or (_agendador is not None and _agendador.is_alive()):
+        return
+
+    _parar_agendador.clear()
+    _agendador = threading.Thread(
+        target=_agendar, args=(intervalo,), name="giv-agenda-retreino", daemon=True
+    )
+    _agendador.start()
+    print(f"Retreino agendado (a cada {intervalo:g}s)")
+
+
+def parar_agendamento():
+    """Sinaliza a thread do agendamento para encerrar"""
+    _parar_agendador.set()
+
+
+def estado():
+    """Cópia do estado do retreino (para /modelo/info)"""
+    with _lock_estado:
+        return dict(_estado)
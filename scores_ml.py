@@ -0,0 +1,144 @@
+"""
+Scores de Agravamento Pré-calculados - Gestão Inteligente de Vagas (GIV-Saúde)
+=============================================================================
+
+Estágio de pontuação que roda uma vez por (versão do snapshot de dados,
+versão do modelo, dia): todos os pacientes sem agendamento do conjunto de
+trabalho passam por uma única inferência, e a probabilidade vira a coluna
+`probabilidade_agravamento` de uma cópia rasa da tabela em cache (as demais
+colunas são compartilhadas, sem cópia; linhas já agendadas ficam nulas).
+
+A análise preditiva da API e do dashboard passa a ser filtro + agregação
+sobre essa tabela, sem `preparar_features` nem floresta por requisição.
+`predicao_agravamento` é derivada na consulta (probabilidade > limiar).
+
+Enquanto não há modelo carregado, `carregar_pontuados` devolve o recorte
+sem as colunas de score, e os chamadores caem nas regras estatísticas.
+
+O dia entra na chave porque `preparar_features` conta o tempo de espera
+até agora: com o mesmo snapshot, as probabilidades mudam de um dia para o
+outro.
+
+O cache guarda até CHAVES_EM_CACHE tabelas do snapshot e do dia atuais: a
+do modelo ativo e a de um candidato do retreino (retreino.py), pontuada
+antes de ser publicado para que a troca de modelo não deixe requisições
+esperando a pontuação. Tabelas de snapshots ou dias anteriores são
+descartadas antes de pontuar a nova versão (não ficam duas tabelas
+inteiras em memória após uma recarga).
+"""
+
+import threading
+from datetime import date
+
+import numpy as np
+import polars as pl
+
+from carregador_dados import carregar_dados, snapshot_atual
+from modelo_ml_saude import LIMIAR_PADRAO, modelo_ativo
+
+# Colunas que o modelo lê em preparar_features
+COLUNAS_MODELO = [
+    "solicitacao_risco",
+    "procedimento_especialidade",
+    "paciente_faixa_etaria",
+    "data_solicitacao",
+    "solicitacao_status",
+    "is_critico",
+]
+
+# ===== CACHE POR (VERSÃO DO SNAPSHOT, VERSÃO DO MODELO, DIA) =====
+# Tupla de (chave, tabela pontuada), mais recente primeiro; substituída por
+# inteiro a cada nova chave
+CHAVES_EM_CACHE = 2
+_pontuados = ()
+_lock_pontuacao = threading.Lock()
+
+
+def _buscar(chave):
+    for chave_cache, df in _pontuados:
+        if chave_cache == chave:
+            return df
+    return None
+
+
+def pontuar(df, modelo):
+    """Tabela `df` com a coluna `probabilidade_agravamento` (nula se agendado)"""
+    mascara = df["is_sem_agendamento"].fill_null(False).to_numpy()
+    probabilidades = np.full(df.height, np.nan)
+
+    if mascara.any():
+        colunas = [c for c in COLUNAS_MODELO if c in df.columns]
+        df_pred = modelo.predizer_agravamentos(
+            df.filter(pl.col("is_sem_agendamento")).select(colunas)
+        )
+        probabilidades[mascara] = df_pred["probabilidade_agravamento"].to_numpy()
+
+    return df.with_columns(
+        pl.Series("probabilidade_agravamento", probabilidades).fill_nan(None)
+    )
+
+
+def obter_pontuado(modelo=None):
+    """
+    Tabela pontuada da versão atual do snapshot com `modelo` (padrão: o
+    modelo ativo), no dia de hoje, ou None se não há modelo carregado. Só
+    uma thread pontua cada versão.
+    """
+    global _pontuados
+
+    modelo = modelo or modelo_ativo()
+    if not modelo.treinado:
+        return None
+
+    versao, df = snapshot_atual()
+    chave = (versao, modelo.versao, date.today())
+    pontuado = _buscar(chave)
+    if pontuado is not None:
+        return pontuado
+
+    with _lock_pontuacao:
+        pontuado = _buscar(chave)
+        if pontuado is None:
+            # Solta as tabelas de snapshots/dias anteriores antes de pontuar
+            _pontuados = tuple(
+                (c, df_cache) for c, df_cache in _pontuados
+                if c[0] == versao and c[2] == chave[2]
+            )
+            print(f"🤖 Pontuando snapshot {versao} com o modelo {modelo.versao}...")
+            pontuado = pontuar(df, modelo)
+            _pontuados = ((chave, pontuado),) + _pontuados[:CHAVES_EM_CACHE - 1]
+        return pontuado
+
+
+def carregar_pontuados(colunas=None, filtros=None, limiar=None, modelo=None):
+    """
+    Como `carregar_dados`, acrescentando `probabilidade_agravamento` e
+    `predicao_agravamento` (probabilidade > `limiar`) quando há modelo.
+    """
+    df = obter_pontuado(modelo)
+    if df is None:
+        return carregar_dados(colunas, filtros)
+
+    limiar = LIMIAR_PADRAO if limiar is None else limiar
+    lf = df.lazy()
+    if filtros:
+        lf = lf.filter(*filtros)
+    if colunas:
+        lf = lf.select(list(colunas) + ["probabilidade_agravamento"])
+    return lf.with_columns(
+        (pl.col("probabilidade_agravamento") > limiar)
+        .cast(pl.Int64)
+        .alias("predicao_agravamento")
+    ).collect()
+
+
+def info():
+    """Chave da tabela pontuada mais recente em cache (para /status)"""
+    if not _pontuados:
+        return {"versao_snapshot": None, "versao_modelo": None, "pontuados": 0}
+    chave, df = _pontuados[0]
+    return {
+        "versao_snapshot": chave[0],
+        "versao_modelo": chave[1],
+        "pontuados": df.height - df["probabilidade_agravamento"].null_count(),
+    }
@@ -0,0 +1,110 @@
+"""
+Serialização JSON direto do Polars - Gestão Inteligente de Vagas (GIV-Saúde)
+===========================================================================
+
+Caminho único para devolver linhas de um DataFrame em JSON, usado pela API
+(/api/v1/dashboard/dados, /api/v1/solicitacoes) e pelas tabelas do
+dashboard (/api/tabela/{secao}).
+
+Antes cada linha passava por objetos Python uma ou mais vezes (`to_dicts`
++ `jsonable_encoder`, ou pandas + `.apply` + varredura dos dicts) antes do
+`json.dumps`. Aqui:
+
+1. as colunas de data/hora viram texto em uma operação vetorizada por
+   coluna (`formatar_datas`), no formato pedido;
+2. `DataFrame.write_json` gera o array de objetos direto do Rust;
+3. o envelope da resposta (status, totais, timestamp...) é serializado à
+   parte e as linhas são encaixadas já em bytes (`montar_json`).
+
+NaN/inf viram null (o `JSONResponse` recusaria o valor).
+
+Comparação com os caminhos anteriores: benchmarks/benchmark_serializacao.py
+"""
+
+import json
+
+import polars as pl
+from fastapi.responses import Response
+
+# Mesmo texto de datetime.isoformat() (fração de segundo só quando há)
+FORMATO_ISO = "iso"
+
+# Texto do cast de Datetime para String (ex.: "2025-01-10 10:00:00.000000")
+FORMATO_TEXTO = "texto"
+
+_DATA = "%Y-%m-%d"
+_HORA_ISO = "%H:%M:%S"
+_FRACAO = "%.6f"
+_FUSO = "%:z"
+
+
+def _datetime_iso(coluna, com_fuso=False):
+    # isoformat() omite os microssegundos quando são zero e, com fuso,
+    # termina com o deslocamento ("+00:00")
+    fuso = _FUSO if com_fuso else ""
+    return (
+        pl.when(coluna.dt.microsecond() == 0)
+        .then(coluna.dt.strftime(f"{_DATA}T{_HORA_ISO}{fuso}"))
+        .otherwise(coluna.dt.strftime(f"{_DATA}T{_HORA_ISO}{_FRACAO}{fuso}"))
+    )
+
+
+def _time_iso(coluna):
+    return (
+        pl.when(coluna.dt.microsecond() == 0)
+        .then(coluna.dt.strftime(_HORA_ISO))
+        .otherwise(coluna.dt.strftime(f"{_HORA_ISO}{_FRACAO}"))
+    )
+
+
+def formatar_datas(df, formato=FORMATO_ISO):
+    """Converte as colunas Date/Datetime/Time de `df` em texto (vetorizado)"""
+    expressoes = []
+    for nome, tipo in df.schema.items():
+        coluna = pl.col(nome)
+        if tipo == pl.Date:
+            expressoes.append(coluna.dt.strftime(_DATA))
+        elif isinstance(tipo, pl.Datetime):
+            if formato == FORMATO_ISO:
+                expressoes.append(
+                    _datetime_iso(coluna, tipo.time_zone is not None).alias(nome)
+                )
+            else:
+                expressoes.append(coluna.cast(pl.String))
+        elif tipo == pl.Time:
+            if formato == FORMATO_ISO:
+                expressoes.append(_time_iso(coluna).alias(nome))
+            else:
+                expressoes.append(coluna.cast(pl.String))
+    return df.with_columns(expressoes) if expressoes else df
+
+
+def linhas_json(df, formato=FORMATO_ISO):
+    """Array JSON (bytes) com um objeto por linha de `df`"""
+    return formatar_datas(df, formato).write_json().encode("utf-8")
+
+
+def montar_json(conteudo, formato=FORMATO_ISO):
+    """
+    Serializa o dict `conteudo` em bytes; valores DataFrame viram arrays de
+    linhas (via `linhas_json`), os demais passam por `json.dumps`.
+    """
+    partes = []
+    for chave, valor in conteudo.items():
+        if isinstance(valor, pl.DataFrame):
+            corpo = linhas_json(valor, formato)
+        else:
+            corpo = json.dumps(
+                valor, ensure_ascii=False, separators=(",", ":"), default=str
+            ).encode("utf-8")
+        partes.append(json.dumps(chave, ensure_ascii=False).encode("utf-8") + b":" + corpo)
+    return b"{" + b",".join(partes) + b"}"
+
+
+def resposta_json(conteudo, formato=FORMATO_ISO, status_code=200):
+    """`Response` application/json com o corpo de `montar_json`"""
+    return Response(
+        content=montar_json(conteudo, formato),
+        media_type="application/json",
+        status_code=status_code,
+    )
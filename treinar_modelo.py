@@ -0,0 +1,101 @@
+"""
+Treinamento offline do modelo de agravamento - GIV-Saúde
+=========================================================
+
+Treina `ModeloPredicaoAgravamento` sobre o snapshot atual de db/ e grava um
+artefato versionado (modelo, encoders, métricas, importância das features e
+hash do snapshot de dados) em GIV_DIR_MODELOS, marcando-o como versão ativa.
+A API e o dashboard apenas carregam esse artefato na inicialização.
+
+`treinar(ativar=False)` grava só o candidato, sem mexer em `atual.json`: é
+o que o retreino em segundo plano da API (retreino.py) roda em um processo
+separado antes de validar e publicar a nova versão (com `linhas_teste`,
+devolve também as linhas de teste do candidato, sobre as quais a validação
+compara o candidato e o modelo ativo).
+
+Uso:
+    python treinar_modelo.py                  # pacientes sem agendamento
+    python treinar_modelo.py --todos          # todas as solicitações
+    python treinar_modelo.py --diretorio modelos_teste
+    python treinar_modelo.py --algoritmo hist_gb --limite-linhas 500000
+"""
+
+import argparse
+import time
+
+import polars as pl
+
+from carregador_dados import carregar_dados, hash_snapshot
+from modelo_ml_saude import ALGORITMOS, ModeloPredicaoAgravamento
+
+# Colunas usadas por preparar_features/criar_target
+COLUNAS_TREINO = [
+    "solicitacao_risco",
+    "procedimento_especialidade",
+    "solicitacao_status",
+    "paciente_faixa_etaria",
+    "data_solicitacao",
+    "is_critico",
+]
+
+
+def treinar(todos=False, diretorio=None, ativar=True, algoritmo=None, limite_linhas=None,
+            linhas_teste=0):
+    """
+    Treina sobre o snapshot atual e salva o artefato; retorna o caminho.
+
+    `algoritmo` e `limite_linhas` sobrepõem GIV_ALGORITMO_ML e GIV_LIMITE_TREINO.
+    Com `linhas_teste` > 0 retorna (caminho, até `linhas_teste` linhas do
+    conjunto de teste, com a coluna `agravamento`).
+    """
+    filtros = None if todos else [pl.col("is_sem_agendamento")]
+
+    inicio = time.perf_counter()
+    df = carregar_dados(COLUNAS_TREINO, filtros)
+    hash_dados = hash_snapshot()
+    print(f"📊 {len(df):,} registros carregados (snapshot {hash_dados})")
+
+    modelo = ModeloPredicaoAgravamento()
+    modelo.treinar(df, algoritmo=algoritmo, limite_linhas=limite_linhas)
+    caminho = modelo.salvar(diretorio, hash_dados=hash_dados, ativar=ativar)
+
+    print(f"✅ Versão {'ativa' if ativar else 'candidata'}: {modelo.versao}")
+    print(f"⏱️ Tempo total: {time.perf_counter() - inicio:.1f}s")
+    if linhas_teste:
+        return caminho, modelo.amostra_teste.head(linhas_teste)
+    return caminho
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treinamento offline do modelo de ML GIV")
+    parser.add_argument(
+        "--todos",
+        action="store_true",
+        help="treina com todas as solicitações (padrão: só as sem agendamento)",
+    )
+    parser.add_argument(
+        "--diretorio",
+        default=None,
+        help="diretório dos artefatos (padrão: GIV_DIR_MODELOS ou modelos/)",
+    )
+    parser.add_argument(
+        "--algoritmo",
+        choices=list(ALGORITMOS),
+        default=None,
+        help="estimador (padrão: GIV_ALGORITMO_ML ou floresta)",
+    )
+    parser.add_argument(
+        "--limite-linhas",
+        type=int,
+        default=None,
+        help="amostra estratificada por risco/especialidade com até N linhas "
+        "(padrão: GIV_LIMITE_TREINO; 0 = todas)",
+    )
+    args = parser.parse_args()
+
+    treinar(
+        todos=args.todos,
+        diretorio=args.diretorio,
+        algoritmo=args.algoritmo,
+        limite_linhas=args.limite_linhas,
+    )